@@ -1,4 +1,5 @@
 import os
+import click
 from flask import Flask
 from dotenv import load_dotenv
 from flask_wtf.csrf import generate_csrf
@@ -19,6 +20,10 @@ def create_app(config_name: str | None = None) -> Flask:
     # Ensure folders
     os.makedirs(app.config.get("UPLOAD_FOLDER", "uploads"), exist_ok=True)
 
+    # Pool sizing, pre-ping and timeouts for PostgreSQL (an explicit SQLALCHEMY_ENGINE_OPTIONS wins)
+    from .pool import engine_options, init_pool
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+
     # Init extensions
     db.init_app(app)
     migrate.init_app(app, db)
@@ -26,17 +31,35 @@ def create_app(config_name: str | None = None) -> Flask:
     csrf.init_app(app)
 
     # Login settings
-    from .models import Usuario
+    from .utils import saldos, resumen, pdf, attachments  # noqa: F401  (register the saldo, resumen, PDF cache and blob ORM events)
+    from .utils import principals
 
     @login_manager.user_loader
     def load_user(user_id: str):
-        return db.session.get(Usuario, int(user_id))
+        return principals.load(int(user_id))
 
     login_manager.login_view = "usuarios.login"
 
     # Register blueprints
     register_blueprints(app)
 
+    # N+1 guard (enabled by SQL_QUERY_LIMIT, e.g. in TestingConfig)
+    from .queries import init_query_guard
+    init_query_guard(app)
+
+    # Server-Timing headers, /metrics and the slow-request log
+    from .instrumentation import init_instrumentation
+    init_instrumentation(app)
+    init_pool(app)
+
+    # Buffered audit trail of clientes, vendedores, ordenes, pagos and usuarios
+    from .audit import init_audit
+    init_audit(app)
+
+    # Content-hashed static URLs with precompressed variants and immutable caching
+    from .assets import init_assets
+    init_assets(app)
+
     # Register CLI commands
     register_cli(app)
 
@@ -61,6 +84,11 @@ def register_blueprints(app: Flask) -> None:
     from .modules.configuraciones.routes import bp as configuraciones_bp
     from .modules.dashboard.routes import bp as dashboard_bp
     from .modules.calendario.routes import bp as calendario_bp
+    from .modules.lookup.routes import bp as lookup_bp
+    from .modules.adjuntos.routes import bp as adjuntos_bp
+    from .modules.auditoria.routes import bp as auditoria_bp
+    from .modules.reportes.routes import bp as reportes_bp
+    from .modules.cuentas.routes import bp as cuentas_bp
 
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(clientes_bp)
@@ -70,6 +98,11 @@ def register_blueprints(app: Flask) -> None:
     app.register_blueprint(usuarios_bp)
     app.register_blueprint(configuraciones_bp)
     app.register_blueprint(calendario_bp)
+    app.register_blueprint(lookup_bp)
+    app.register_blueprint(adjuntos_bp)
+    app.register_blueprint(auditoria_bp)
+    app.register_blueprint(reportes_bp)
+    app.register_blueprint(cuentas_bp)
 
 
 def register_cli(app: Flask) -> None:
@@ -93,4 +126,235 @@ def register_cli(app: Flask) -> None:
                 db.session.commit()
                 print(f"Created admin user: {admin_email}")
             else:
-                print("Admin user creation skipped; users already exist.")
\ No newline at end of file
+                print("Admin user creation skipped; users already exist.")
+
+    @app.cli.command("wait-db")
+    @click.option("--timeout", default=60, show_default=True, help="Seconds to keep retrying.")
+    def wait_db(timeout: int):
+        """Block until the database accepts connections; print the connection budget."""
+        import time
+        from sqlalchemy import text
+        from .pool import pool_sizes
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with db.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                break
+            except Exception as exc:  # any driver error means "not yet"
+                if time.monotonic() > deadline:
+                    raise click.ClickException(f"database not reachable: {exc}")
+                print(f"DB not ready yet: {exc}")
+                time.sleep(2)
+        print("DB is ready")
+        if db.engine.dialect.name == "postgresql" and not app.config["DB_PGBOUNCER"]:
+            pool_size, max_overflow = pool_sizes(app.config)
+            workers = app.config["WEB_WORKERS"]
+            print(f"Pool: {pool_size} + {max_overflow} overflow per worker; "
+                  f"{workers} workers may open up to {workers * (pool_size + max_overflow)} connections.")
+
+    @app.cli.command("reconcile-saldos")
+    @click.option("--chunk-size", default=5000, show_default=True, help="Orders per UPDATE batch.")
+    def reconcile_saldos(chunk_size: int):
+        """Recompute Orden.abono/saldo/estado_pago from pagos (backfill or repair)."""
+        from .utils.saldos import reconcile
+        changed = reconcile(chunk_size=chunk_size)
+        print(f"Reconciled {changed} orders.")
+
+    @app.cli.command("recompute-totales")
+    @click.option("--chunk-size", default=5000, show_default=True, help="Orders per UPDATE batch.")
+    def recompute_totales(chunk_size: int):
+        """Re-derive subtotals, neto, IVA and total of every order with line items."""
+        from .utils.totales import recompute_all
+        dias = recompute_all(chunk_size=chunk_size, echo=print)
+        print(f"Recomputed totals; refreshed resumen_diario for {dias} days.")
+
+    @app.cli.command("rebuild-resumen")
+    def rebuild_resumen():
+        """Rebuild the resumen_diario dashboard aggregates from ordenes and pagos."""
+        from .utils.resumen import rebuild
+        filas = rebuild()
+        print(f"Rebuilt resumen_diario: {filas} rows.")
+
+    @app.cli.command("refresh-reportes")
+    @click.option("--loop", is_flag=True, help="Keep refreshing every REPORTES_REFRESH_SECONDS instead of once.")
+    def refresh_reportes(loop: bool):
+        """Refresh the sales report materialized views (CONCURRENTLY on PostgreSQL)."""
+        import time
+        from .utils.reportes import refresh
+        while True:
+            started = time.monotonic()
+            if refresh():
+                print(f"Refreshed report views in {time.monotonic() - started:.1f}s.")
+            else:
+                print("Another refresh is running; skipped.")
+            if not loop:
+                break
+            time.sleep(max(0.0, app.config["REPORTES_REFRESH_SECONDS"] - (time.monotonic() - started)))
+
+    @app.cli.command("build-assets")
+    def build_assets():
+        """Write fingerprinted, gzip/brotli-compressed copies of the static files to static/dist."""
+        from .assets import build
+        archivos = build(app.static_folder, echo=print)
+        print(f"Built {archivos} static files.")
+
+    @app.cli.command("notifications-worker")
+    @click.option("--threads", type=int, default=None, help="Concurrent senders (default NOTIFY_WORKER_THREADS).")
+    @click.option("--batch-size", type=int, default=None, help="Rows claimed per batch (default NOTIFY_BATCH_SIZE).")
+    @click.option("--once", is_flag=True, help="Exit once the outbox is empty instead of polling.")
+    def notifications_worker(threads: int | None, batch_size: int | None, once: bool):
+        """Deliver queued NotificationLog emails over pooled SMTP connections."""
+        import logging
+        from .utils.notifications import run_worker
+        logging.basicConfig(level=logging.INFO)
+        run_worker(
+            app,
+            threads=threads or app.config["NOTIFY_WORKER_THREADS"],
+            batch_size=batch_size or app.config["NOTIFY_BATCH_SIZE"],
+            poll_interval=app.config["NOTIFY_POLL_INTERVAL"],
+            once=once,
+        )
+
+    @app.cli.command("export-pdfs")
+    @click.option("--formato", type=click.Choice(["zip", "pdf"]), default="zip", show_default=True)
+    @click.option("--salida", required=True, type=click.File("wb"), help="Output file ('-' for stdout).")
+    @click.option("--estado-trabajo")
+    @click.option("--estado-despacho")
+    @click.option("--estado-pago")
+    @click.option("--cliente-id")
+    @click.option("--vendedor-id")
+    @click.option("--desde", help="Orden.fecha from (YYYY-MM-DD).")
+    @click.option("--hasta", help="Orden.fecha to (YYYY-MM-DD).")
+    @click.option("--limite", type=int, default=None, help="Max orders (default PDF_BATCH_MAX).")
+    def export_pdfs(formato, salida, limite, **filtros_args):
+        """Write the work-order PDFs matching the filters as one ZIP or merged PDF."""
+        import time
+        from .queries import parse_orden_filters
+        from .utils import pdf
+        limite = limite or app.config["PDF_BATCH_MAX"]
+        ordenes = pdf.batch(parse_orden_filters(filtros_args), limite)
+        if len(ordenes) > limite:
+            raise click.ClickException(f"more than {limite} orders match; narrow the filters or raise --limite")
+        started = time.perf_counter()
+        rendered = pdf.render_all(ordenes)
+        stream = pdf.stream_file(pdf.merge(rendered), remove=True) if formato == "pdf" else pdf.stream_zip(rendered)
+        for chunk in stream:
+            salida.write(chunk)
+        # stderr, so `--salida -` can be piped
+        click.echo(f"Exported {len(ordenes)} orders in {time.perf_counter() - started:.2f}s.", err=True)
+
+    @app.cli.command("export")
+    @click.argument("dataset", type=click.Choice(["ordenes", "pagos", "clientes"]))
+    @click.option("--formato", type=click.Choice(["csv", "xlsx"]), default="csv", show_default=True)
+    @click.option("--salida", required=True, type=click.File("wb"), help="Output file ('-' for stdout).")
+    @click.option("--estado-trabajo")
+    @click.option("--estado-despacho")
+    @click.option("--estado-pago")
+    @click.option("--cliente-id")
+    @click.option("--vendedor-id")
+    @click.option("--orden-id", help="pagos only.")
+    @click.option("--q", help="clientes only: search text.")
+    @click.option("--desde", help="From date (YYYY-MM-DD); Orden.fecha or Pago.fecha.")
+    @click.option("--hasta", help="To date (YYYY-MM-DD).")
+    def export_cmd(dataset, formato, salida, **filtros_args):
+        """Stream a full export of ordenes, pagos or clientes, with the list-view filters."""
+        import time
+        from .utils import export
+        started = time.perf_counter()
+        written = 0
+        for chunk in export.stream(dataset, formato, filtros_args):
+            salida.write(chunk)
+            written += len(chunk)
+        click.echo(f"Wrote {written / 1024:.0f} KiB in {time.perf_counter() - started:.2f}s.", err=True)
+
+    @app.cli.command("import-data")
+    @click.option("--clientes", type=click.File(encoding="utf-8-sig"))
+    @click.option("--vendedores", type=click.File(encoding="utf-8-sig"))
+    @click.option("--ordenes", type=click.File(encoding="utf-8-sig"))
+    @click.option("--descripciones", type=click.File(encoding="utf-8-sig"))
+    @click.option("--pagos", type=click.File(encoding="utf-8-sig"))
+    @click.option("--usuario", required=True, help="Email of the user recorded on imported rows without one.")
+    @click.option("--rechazos", type=click.File("w", encoding="utf-8"), help="CSV file for rejected rows.")
+    @click.option("--chunk-size", default=1000, show_default=True, help="Rows per INSERT/COPY and commit.")
+    @click.option("--dry-run", is_flag=True, help="Validate and resolve references without writing.")
+    def import_data(usuario, rechazos, chunk_size, dry_run, **archivos):
+        """Bulk-load legacy CSV files (see app/utils/importer.py for the columns)."""
+        import csv
+        from .models import Usuario
+        from .utils.importer import Importer
+        user = Usuario.query.filter_by(email=usuario).first()
+        if user is None:
+            raise click.ClickException(f"no user with email {usuario}")
+        importer = Importer(chunk_size=chunk_size, usuario_id=user.id, rechazos=rechazos, dry_run=dry_run)
+        reportes = importer.importar({k: csv.DictReader(f) for k, f in archivos.items() if f is not None})
+        for reporte in reportes:
+            print(reporte)
+
+    @app.cli.command("seed-synthetic")
+    @click.option("--clientes", default=50_000, show_default=True)
+    @click.option("--ordenes", default=500_000, show_default=True)
+    @click.option("--lineas-por-orden", default=2.0, show_default=True, help="Mean descripciones per order.")
+    @click.option("--vendedores", default=25, show_default=True)
+    @click.option("--usuarios", type=click.IntRange(min=1), default=10, show_default=True)
+    @click.option("--years", default=3, show_default=True, help="Order dates span this many years back from today.")
+    @click.option("--seed", default=1, show_default=True)
+    @click.option("--chunk-size", default=5000, show_default=True, help="Orders (with their rows) per COPY and commit.")
+    @click.option("--yes", is_flag=True, help="Do not ask for confirmation.")
+    def seed_synthetic(seed, years, chunk_size, yes, **volumes):
+        """Fill a throwaway database with realistic fake data for benchmarks."""
+        from .utils.synthetic import generate
+        if not yes:
+            click.confirm(f"Add synthetic rows to {db.engine.url.render_as_string()}?", abort=True)
+        counts = generate(seed=seed, years=years, chunk_size=chunk_size, **volumes)
+        print(", ".join(f"{k}: {v}" for k, v in counts.items()))
+
+    @app.cli.command("bench")
+    @click.option("--repeticiones", default=20, show_default=True, help="Timed requests per scenario.")
+    @click.option("--solo", multiple=True, help="Scenario to run (repeatable); default all.")
+    @click.option("--seed", default=1, show_default=True)
+    @click.option("--json", "salida", type=click.File("w"), help="Also write the results as JSON.")
+    @click.option("--comparar", type=click.File(), help="JSON of a previous run to compare against.")
+    def bench(repeticiones, solo, seed, salida, comparar):
+        """Measure p50/p95 latency, queries and peak memory of the main pages."""
+        import json
+        from .utils import bench as bench_util
+        unknown = set(solo) - set(bench_util.SCENARIOS)
+        if unknown:
+            raise click.BadParameter(f"unknown scenario(s): {', '.join(sorted(unknown))}", param_hint="--solo")
+        print(bench_util.HEADER)
+        resultados = bench_util.run(app, repeticiones=repeticiones, solo=list(solo), seed=seed)
+        if salida is not None:
+            json.dump(resultados, salida, indent=2)
+        if comparar is not None:
+            for linea in bench_util.compare(resultados, json.load(comparar)):
+                print(linea)
+
+    @app.cli.command("notify-campaign")
+    @click.option("--asunto", required=True, help="Subject template (Jinja, e.g. 'Orden #{{ orden.id }} lista').")
+    @click.option("--plantilla", required=True, type=click.File(encoding="utf-8"), help="Body template file.")
+    @click.option("--estado-trabajo")
+    @click.option("--estado-despacho")
+    @click.option("--estado-pago")
+    @click.option("--cliente-id")
+    @click.option("--vendedor-id")
+    @click.option("--desde", help="Orden.fecha from (YYYY-MM-DD).")
+    @click.option("--hasta", help="Orden.fecha to (YYYY-MM-DD).")
+    @click.option("--connections", type=int, default=None, help="SMTP connections (default CAMPAIGN_CONNECTIONS).")
+    @click.option("--encolar", is_flag=True, help="Only queue in the outbox for the notification worker.")
+    def notify_campaign(asunto, plantilla, connections, encolar, **filtros_args):
+        """Email each client with an order matching the filters, once."""
+        from .queries import parse_orden_filters
+        from .utils import campaigns
+        filtros = parse_orden_filters(filtros_args)
+        if not filtros:
+            raise click.UsageError("Give at least one order filter; a campaign never goes to every client.")
+        cuerpo = plantilla.read()
+        if encolar:
+            print(f"Queued {campaigns.enqueue(asunto, cuerpo, filtros)} messages.")
+            return
+        r = campaigns.send(asunto, cuerpo, filtros, connections=connections)
+        print(
+            f"{r['enviados']}/{r['total']} sent, {r['reintentar']} queued for retry, {r['errores']} rejected "
+            f"in {r['segundos']:.2f}s ({r['mensajes_por_segundo']:.1f} msg/s)"
+        )
\ No newline at end of file
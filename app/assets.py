@@ -0,0 +1,135 @@
+"""Fingerprinted, precompressed static files.
+
+Everything under static/ (Bootstrap is vendored in static/vendor) is
+addressed by content: url_for("static", filename="main.css") builds
+/static/main.<hash>.css, where <hash> is the start of the file's sha256. A
+changed file gets a new URL, so those URLs are served with a one-year
+``immutable`` Cache-Control and browsers never revalidate them.
+
+``flask build-assets`` writes a copy of each file under static/dist with its
+hashed name, plus .gz and .br variants (.br needs the brotli package). It runs
+at image build and again in the entrypoint. A request for a hashed name gets
+the brotli or gzip copy when its Accept-Encoding allows it. Files are hashed
+again at startup, so a missing or stale dist/ only means the original file is
+served uncompressed. Unhashed /static/ URLs keep Flask's default handling. Debug
+mode (``flask run --debug``) turns fingerprinting off so edits show up on
+reload.
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+from typing import Callable, Optional
+
+from flask import Flask, Response, current_app, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+DIST = "dist"
+HASH_LENGTH = 12
+MAX_AGE = 365 * 24 * 3600
+# Preferred first; the original file is the fallback
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+SKIP = (".map", ".gz", ".br")
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+
+def _hashed(filename: str, digest: str) -> str:
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+
+def _sources(static_folder: str) -> dict[str, str]:
+    """{logical name: content hash} of every static file outside dist/."""
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != os.path.join(static_folder, DIST))
+        for name in sorted(files):
+            if name.startswith(".") or name.endswith(SKIP):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as fh:
+                digest = hashlib.sha256(fh.read()).hexdigest()[:HASH_LENGTH]
+            manifest[os.path.relpath(path, static_folder).replace(os.sep, "/")] = digest
+    return manifest
+
+
+def build(static_folder: str, echo: Optional[Callable[[str], None]] = None) -> int:
+    """Write hashed copies and their compressed variants to static/dist; returns the files written."""
+    dist = os.path.join(static_folder, DIST)
+    shutil.rmtree(dist, ignore_errors=True)  # hashes of older builds are not kept
+    sources = _sources(static_folder)
+    for logical, digest in sources.items():
+        target = os.path.join(dist, _hashed(logical, digest))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(os.path.join(static_folder, logical), "rb") as fh:
+            data = fh.read()
+        with open(target, "wb") as fh:
+            fh.write(data)
+        variantes = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variantes[".br"] = brotli.compress(data, quality=11)
+        sizes = []
+        for suffix, body in variantes.items():
+            if len(body) < len(data):  # tiny files can grow when compressed
+                with open(target + suffix, "wb") as fh:
+                    fh.write(body)
+                sizes.append(f"{suffix[1:]} {len(body)}")
+        if echo:
+            echo(f"  {_hashed(logical, digest)}: {len(data)} bytes" + "".join(f", {s}" for s in sizes))
+    if brotli is None and echo:
+        echo("  brotli is not installed; built gzip variants only")
+    return len(sources)
+
+
+def _send(static_folder: str, hashed: str, logical: str) -> Response:
+    built = os.path.join(static_folder, DIST, hashed)
+    encoding, path = None, None
+    if os.path.isfile(built):
+        for name, suffix in ENCODINGS:
+            if request.accept_encodings[name] and os.path.isfile(built + suffix):
+                encoding, path = name, f"{DIST}/{hashed}{suffix}"
+                break
+        path = path or f"{DIST}/{hashed}"
+    else:
+        path = logical  # not built: the original, uncompressed
+    mimetype = mimetypes.guess_type(logical)[0] or "application/octet-stream"
+    response = send_from_directory(static_folder, path, mimetype=mimetype, max_age=MAX_AGE)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app: Flask) -> None:
+    if app.debug or not app.static_folder:
+        return
+    manifest = {logical: _hashed(logical, digest) for logical, digest in _sources(app.static_folder).items()}
+    logical_of = {hashed: logical for logical, hashed in manifest.items()}
+    dist = os.path.join(app.static_folder, DIST)
+    if not all(os.path.isfile(os.path.join(dist, hashed)) for hashed in logical_of):
+        logger.warning("static/dist is missing or stale; serving uncompressed assets (run flask build-assets)")
+
+    @app.url_defaults
+    def fingerprint(endpoint: str, values: dict) -> None:
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    serve_plain = app.view_functions["static"]
+
+    def static(filename: str) -> Response:
+        logical = logical_of.get(filename)
+        if logical is None:
+            return serve_plain(filename=filename)
+        return _send(current_app.static_folder, filename, logical)
+
+    app.view_functions["static"] = static
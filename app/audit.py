@@ -0,0 +1,254 @@
+"""Audit trail in the logs table, written in batches.
+
+Every flush that inserts, updates or deletes a Cliente, Vendedor, Orden, Pago
+or Usuario yields one Log row per object: accion crear/editar/eliminar, the
+table and id, the changed columns (old → new) and the user of the request.
+Rows wait in session.info until the transaction commits, so rolled-back
+changes leave no trace. Committed rows then go to a per-worker buffer instead
+of the database:
+
+* a background thread writes the buffer every AUDIT_FLUSH_SECONDS, or as soon
+  as AUDIT_BATCH_SIZE rows are waiting, with one bulk insert (COPY on
+  PostgreSQL, see importer.bulk_insert);
+* each batch is committed on its own. When a batch is rejected its rows are
+  retried one by one: a row the database refuses (say, its usuario was deleted
+  meanwhile) is logged as JSON and dropped, while any other error, such as a
+  lost connection, puts the unwritten rows back in the buffer for the next
+  attempt. Beyond AUDIT_BUFFER_MAX the oldest are logged and dropped;
+* an atexit hook writes what is left when the worker or CLI command exits
+  (gunicorn's graceful shutdown runs it; a SIGKILL does not).
+
+created_at is the commit time, not the time the row reached the database.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from flask import Flask, current_app, g, has_request_context
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.exc import DataError, IntegrityError
+
+from .extensions import db
+from .instrumentation import registry
+from .models import Cliente, Log, Orden, Pago, Usuario, Vendedor
+
+logger = logging.getLogger(__name__)
+
+# Columns named in the message of crear/eliminar rows
+AUDITADOS: dict[type, tuple[str, ...]] = {
+    Cliente: ("nombre", "rut"),
+    Vendedor: ("nombre", "rut"),
+    Orden: ("cliente_id", "precio_total"),
+    Pago: ("orden_id", "monto"),
+    Usuario: ("nombre", "email", "rol"),
+}
+IGNORADAS = {"created_at", "updated_at"}
+SECRETAS = {"password_hash"}
+MAX_VALOR = 120
+
+_buffer: list[dict] = []
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_state: dict = {"app": None, "pid": None}
+
+
+def _valor(value) -> str:
+    texto = repr(value) if isinstance(value, str) else str(value)
+    return texto if len(texto) <= MAX_VALOR else texto[:MAX_VALOR - 1] + "…"
+
+
+def _describe(obj) -> str:
+    return ", ".join(f"{col}={_valor(getattr(obj, col))}" for col in AUDITADOS[type(obj)])
+
+
+def _changes(obj) -> str | None:
+    state = inspect(obj)
+    cambios = []
+    for attr in state.mapper.column_attrs:
+        if attr.key in IGNORADAS:
+            continue
+        hist = state.attrs[attr.key].history
+        if not hist.has_changes():
+            continue
+        if attr.key in SECRETAS:
+            cambios.append(f"{attr.key} cambiada")
+            continue
+        old = hist.deleted[0] if hist.deleted else None
+        new = hist.added[0] if hist.added else getattr(obj, attr.key)
+        cambios.append(f"{attr.key}: {_valor(old)} → {_valor(new)}")
+    return "; ".join(cambios) or None
+
+
+def _usuario_id() -> int | None:
+    # Only a user the request already loaded: loading one here would query mid-flush
+    user = g.get("_login_user") if has_request_context() else None
+    return getattr(user, "id", None)
+
+
+@event.listens_for(db.session, "after_flush")
+def _capture(session, flush_context):
+    if not current_app.config["AUDIT_ENABLED"]:
+        return
+    entradas = []
+    for accion, objs in (
+        ("crear", session.new),
+        ("editar", [o for o in session.dirty if session.is_modified(o)]),
+        ("eliminar", session.deleted),
+    ):
+        for obj in objs:
+            if type(obj) not in AUDITADOS:
+                continue
+            mensaje = _changes(obj) if accion == "editar" else _describe(obj)
+            entradas.append({"accion": accion, "entidad": obj.__tablename__, "entidad_id": obj.id, "mensaje": mensaje})
+    if entradas:
+        usuario_id = _usuario_id()
+        for entrada in entradas:
+            entrada["usuario_id"] = usuario_id
+        session.info.setdefault("audit_pending", []).extend(entradas)
+
+
+def record(session, accion: str, entidad: str, entidad_id: int | None, mensaje: str | None = None) -> None:
+    """Audit a change made with Core statements, which the flush events do not see."""
+    if current_app.config["AUDIT_ENABLED"]:
+        session.info.setdefault("audit_pending", []).append({
+            "accion": accion, "entidad": entidad, "entidad_id": entidad_id, "mensaje": mensaje,
+            "usuario_id": _usuario_id(),
+        })
+
+
+@event.listens_for(db.session, "after_commit")
+def _enqueue_committed(session):
+    entradas = session.info.pop("audit_pending", None)
+    if entradas:
+        now = datetime.utcnow()
+        for entrada in entradas:
+            entrada["created_at"] = entrada["updated_at"] = now
+        enqueue(entradas)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    session.info.pop("audit_pending", None)
+
+
+# -- buffer -------------------------------------------------------------------------------------
+
+def enqueue(rows: list[dict]) -> None:
+    cfg = current_app.config
+    _ensure_flusher()
+    with _lock:
+        _buffer.extend(rows)
+        overflow = len(_buffer) - cfg["AUDIT_BUFFER_MAX"]
+        dropped = _buffer[:overflow] if overflow > 0 else []
+        del _buffer[:len(dropped)]
+        full = len(_buffer) >= cfg["AUDIT_BATCH_SIZE"]
+    if dropped:
+        _lost("audit buffer full", dropped)
+    if full:
+        _wake.set()
+
+
+def _lost(reason: str, rows: list[dict]) -> None:
+    registry.inc("printshop_audit_dropped_total", (), len(rows))
+    logger.error("%s, %d audit rows not written: %s", reason, len(rows), json.dumps(rows, default=str))
+
+
+def pending() -> int:
+    with _lock:
+        return len(_buffer)
+
+
+def _write_rows(rows: list[dict]) -> tuple[int, list[dict]]:
+    """Insert rows one at a time; returns (written, rows left unwritten by a non-row error)."""
+    written = 0
+    for i, row in enumerate(rows):
+        try:
+            db.session.execute(insert(Log), [row])
+            db.session.commit()
+        except (IntegrityError, DataError):
+            db.session.rollback()
+            _lost("audit row rejected by the database", [row])
+            continue
+        except Exception:
+            db.session.rollback()
+            logger.exception("writing audit rows failed; %d stay buffered", len(rows) - i)
+            return written, rows[i:]
+        written += 1
+    return written, []
+
+
+def flush() -> int:
+    """Write everything buffered so far; returns the rows written."""
+    from .utils.importer import bulk_insert
+
+    with _flush_lock:
+        with _lock:
+            rows = _buffer[:]
+            del _buffer[:]
+        if not rows:
+            return 0
+        app = _state["app"]
+        written, unwritten = 0, []
+        with app.app_context():
+            batch = app.config["AUDIT_BATCH_SIZE"]
+            for start in range(0, len(rows), batch):
+                chunk = rows[start:start + batch]
+                try:
+                    bulk_insert(Log, chunk)
+                    db.session.commit()
+                    written += len(chunk)
+                    continue
+                except Exception:
+                    db.session.rollback()
+                done, unwritten = _write_rows(chunk)
+                written += done
+                if unwritten:
+                    unwritten += rows[start + batch:]
+                    break
+        if unwritten:
+            with _lock:
+                _buffer[:0] = unwritten
+    registry.inc("printshop_audit_rows_total", (), written)
+    return written
+
+
+def _run(interval: float) -> None:
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        flush()
+
+
+def _ensure_flusher() -> None:
+    pid = os.getpid()
+    if _state["pid"] == pid:
+        return
+    with _lock:
+        if _state["pid"] == pid:
+            return
+        if _state["pid"] is not None:
+            del _buffer[:]  # a forked child: the parent writes its own copy
+        _state["pid"] = pid
+        interval = _state["app"].config["AUDIT_FLUSH_SECONDS"]
+        threading.Thread(target=_run, args=(interval,), name="audit-flusher", daemon=True).start()
+
+
+def _flush_at_exit() -> None:
+    if pending():
+        flush()
+    if pending():
+        with _lock:
+            rows = _buffer[:]
+            del _buffer[:]
+        _lost("audit flush at exit failed", rows)
+
+
+def init_audit(app: Flask) -> None:
+    if _state["app"] is None:
+        atexit.register(_flush_at_exit)
+    _state["app"] = app
@@ -2,6 +2,11 @@ import os
 from datetime import timedelta
 
 
+def parse_timeouts(value: str) -> dict[str, int]:
+    pares = (item.split("=", 1) for item in value.split(",") if "=" in item)
+    return {nombre.strip(): int(ms) for nombre, ms in pares}
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "change-me")
     SQLALCHEMY_DATABASE_URI = os.getenv(
@@ -9,17 +14,99 @@ class Config:
         f"postgresql+psycopg2://{os.getenv('POSTGRES_USER','postgres')}:{os.getenv('POSTGRES_PASSWORD','postgres')}@{os.getenv('DB_HOST','db')}:{os.getenv('DB_PORT','5432')}/{os.getenv('POSTGRES_DB','printshop')}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool (app.pool); sizes default from the gunicorn threads per worker
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "3"))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "1"))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))  # 0 = WEB_THREADS + 1
+    DB_MAX_OVERFLOW = int(os.environ["DB_MAX_OVERFLOW"]) if os.getenv("DB_MAX_OVERFLOW") else None  # None = WEB_THREADS
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"  # transaction-mode PgBouncer in front
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    # endpoint or blueprint=ms, e.g. "ordenes.export=300000,lookup=2000"
+    DB_STATEMENT_TIMEOUTS = parse_timeouts(os.getenv(
+        "DB_STATEMENT_TIMEOUTS",
+        "ordenes.export=0,pagos.export=0,clientes.export=0,ordenes.lote=0,lookup=2000,clientes.autocomplete=2000",
+    ))
+    DB_BACKGROUND_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_BACKGROUND_STATEMENT_TIMEOUT_MS", "0"))
     REMEMBER_COOKIE_DURATION = timedelta(days=14)
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
-    MAX_CONTENT_LENGTH = 32 * 1024 * 1024  # 32 MB
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(64 * 1024 * 1024)))  # 64 MB
+
+    # Logged-in user cache (app.utils.principals)
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))  # seconds; 0 loads the user on every request
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+    USER_CACHE_CHECK_SECONDS = float(os.getenv("USER_CACHE_CHECK_SECONDS", "5"))  # how stale other workers may be
+
+    # Audit trail (app.audit): rows are buffered per worker and written in batches
+    AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))  # a full batch is written right away
+    AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "5"))
+    AUDIT_BUFFER_MAX = int(os.getenv("AUDIT_BUFFER_MAX", "20000"))  # while the database is unreachable
+
+    # Rendered clientes/vendedores/usuarios lists (app.utils.fragments)
+    FRAGMENT_CACHE_MAX_BYTES = int(os.getenv("FRAGMENT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # per worker; 0 disables
+
+    # Attachments (app.utils.attachments)
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "320"))  # longest side, px
+
+    # Work-order PDFs (app.utils.pdf)
+    PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", "2"))
+    PDF_RENDER_WAIT = float(os.getenv("PDF_RENDER_WAIT", "0"))  # seconds a request may wait for a fresh render
+    PDF_BATCH_MAX = int(os.getenv("PDF_BATCH_MAX", "200"))  # orders per batch export
+    PDF_MERGE_MAX = int(os.getenv("PDF_MERGE_MAX", "50"))  # orders per merged PDF (pypdf holds them all in memory)
+    PDF_BATCH_TIMEOUT = float(os.getenv("PDF_BATCH_TIMEOUT", "120"))  # seconds to render a batch before giving up
 
-    # SMTP
+    # Order totals derived from line items (app.utils.totales)
+    IVA_RATE = os.getenv("IVA_RATE", "0.19")
+    DESCRIPCIONES_MAX = int(os.getenv("DESCRIPCIONES_MAX", "500"))  # line items accepted per batch
+
+    # Sales reports on materialized views (app.utils.reportes)
+    COMISION_RATE = os.getenv("COMISION_RATE", "0.05")  # share of cobrado paid as commission
+    REPORTES_REFRESH_SECONDS = int(os.getenv("REPORTES_REFRESH_SECONDS", "900"))  # refresh-reportes --loop interval
+
+    # Listings
+    PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+    SEARCH_MIN_CHARS = int(os.getenv("SEARCH_MIN_CHARS", "2"))
+    AUTOCOMPLETE_LIMIT = int(os.getenv("AUTOCOMPLETE_LIMIT", "10"))
+    AUTOCOMPLETE_TIMEOUT_MS = int(os.getenv("AUTOCOMPLETE_TIMEOUT_MS", "200"))
+    EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))  # rows fetched and encoded per chunk
+    CALENDAR_MAX_DAYS = int(os.getenv("CALENDAR_MAX_DAYS", "62"))  # widest range one feed request may ask for
+
+    # Request instrumentation (app.instrumentation)
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() == "true"
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # bearer token for /metrics; unset = logged-in users only
+    METRICS_DIR = os.getenv("METRICS_DIR", "")  # shared by gunicorn workers so /metrics sums all of them
+
+    # Settings edited in Configuraciones (app.utils.settings)
+    SETTINGS_CHECK_SECONDS = float(os.getenv("SETTINGS_CHECK_SECONDS", "5"))  # how stale other workers may be
+
+    # SMTP (defaults; values saved in Configuraciones take precedence)
     SMTP_HOST = os.getenv("SMTP_HOST", "mailhog")
     SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
     SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "false").lower() == "true"
     SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
     SMTP_FROM = os.getenv("SMTP_FROM", "no-reply@example.com")
+    SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+
+    # Notification outbox worker
+    NOTIFY_WORKER_THREADS = int(os.getenv("NOTIFY_WORKER_THREADS", "2"))
+    NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+    NOTIFY_POLL_INTERVAL = float(os.getenv("NOTIFY_POLL_INTERVAL", "2"))
+    NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+    NOTIFY_RETRY_BASE_SECONDS = int(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "30"))
+    NOTIFY_RETRY_MAX_SECONDS = int(os.getenv("NOTIFY_RETRY_MAX_SECONDS", "3600"))
+    NOTIFY_CLAIM_SECONDS = int(os.getenv("NOTIFY_CLAIM_SECONDS", "300"))  # claimed rows stay hidden from other workers
+    CAMPAIGN_CONNECTIONS = int(os.getenv("CAMPAIGN_CONNECTIONS", "3"))
 
 
 class DevelopmentConfig(Config):
@@ -30,8 +117,15 @@ class ProductionConfig(Config):
     DEBUG = False
 
 
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    # Requests issuing more statements than this fail (see app.queries.init_query_guard)
+    SQL_QUERY_LIMIT = int(os.getenv("SQL_QUERY_LIMIT", "20"))
+
+
 def get_config(name: str | None):
     if not name:
         env = os.getenv("FLASK_ENV", "development").lower()
-        name = "production" if env == "production" else "development"
-    return DevelopmentConfig if name == "development" else ProductionConfig
\ No newline at end of file
+        name = env if env in ("production", "testing") else "development"
+    return {"production": ProductionConfig, "testing": TestingConfig}.get(name, DevelopmentConfig)
\ No newline at end of file
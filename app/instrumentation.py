@@ -0,0 +1,278 @@
+"""Per-request timing and SQL counters.
+
+Engine events time every cursor execution. The time, the statement count and
+the rows returned (``cursor.rowcount`` for statements that return rows; the
+SQLite driver always reports -1, so rows stay at 0 there) add up on ``g``.
+When the request is torn down, including after an unhandled exception, which
+counts as a 500, the totals are:
+
+* added to per-endpoint counters and a latency histogram, served at
+  ``/metrics`` in the Prometheus text format;
+* logged as a warning when the request took longer than SLOW_REQUEST_MS.
+
+The ``Server-Timing`` header (browser devtools show it) is added in
+after_request with the figures up to then.
+
+Each gunicorn worker keeps its own counters. With METRICS_DIR set, every
+worker writes a snapshot there at most once a second and ``/metrics`` adds
+up all of them. A body streamed with stream_with_context (exports, PDF
+batches) keeps the request open, so its time counts in full.
+"""
+from __future__ import annotations
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable
+
+from flask import Flask, Response, abort, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+
+from .extensions import csrf, db
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    "printshop_http_requests_total": ("counter", "Requests served, by endpoint, method and status."),
+    "printshop_http_request_duration_seconds": ("histogram", "Wall time until the request was torn down."),
+    "printshop_sql_statements_total": ("counter", "SQL statements executed while serving requests."),
+    "printshop_sql_duration_seconds_total": ("counter", "Time spent in cursor.execute while serving requests."),
+    "printshop_sql_rows_total": ("counter", "Rows returned by SELECT/RETURNING statements."),
+    "printshop_db_pool_wait_seconds": ("histogram", "Time spent waiting for a pooled connection."),
+    "printshop_db_pool_timeouts_total": ("counter", "Checkouts that gave up after DB_POOL_TIMEOUT."),
+    "printshop_db_pool_checked_out": ("gauge", "Connections currently in use."),
+    "printshop_db_pool_size": ("gauge", "Configured pool_size plus max_overflow."),
+    "printshop_fragment_cache_total": ("counter", "List page renders, by fragment and hit, miss or not_modified."),
+    "printshop_audit_rows_total": ("counter", "Audit rows written to the logs table."),
+    "printshop_audit_dropped_total": ("counter", "Audit rows logged and discarded instead of written."),
+}
+
+# a worker that stopped writing snapshots this long ago no longer holds connections
+GAUGE_MAX_AGE = 60
+
+
+class Registry:
+    """Thread-safe samples keyed by (metric name, sorted label pairs).
+
+    Gauges are kept apart from counters: they are replaced, not added to, and
+    collectors (callables taking the registry) refresh them before every
+    snapshot.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: dict[tuple, float] = defaultdict(float)
+        self.gauges: dict[tuple, float] = {}
+        self.collectors: list[Callable[["Registry"], None]] = []
+        self.flushed = 0.0
+
+    def _histogram(self, name: str, labels: tuple, value: float, buckets: tuple) -> None:
+        s = self.samples
+        for le in buckets:  # cumulative, and every bucket present even at 0
+            s[(f"{name}_bucket", labels + (("le", repr(le)),))] += value <= le
+        s[(f"{name}_bucket", labels + (("le", "+Inf"),))] += 1
+        s[(f"{name}_sum", labels)] += value
+        s[(f"{name}_count", labels)] += 1
+
+    def histogram(self, name: str, labels: tuple, value: float, buckets: tuple = BUCKETS) -> None:
+        with self.lock:
+            self._histogram(name, labels, value, buckets)
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1.0) -> None:
+        with self.lock:
+            self.samples[(name, labels)] += value
+
+    def set(self, name: str, labels: tuple, value: float) -> None:
+        with self.lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, endpoint: str, method: str, status: int, wall: float, stats: "RequestStats") -> None:
+        ep = (("endpoint", endpoint),)
+        with self.lock:
+            s = self.samples
+            s[("printshop_http_requests_total", ep + (("method", method), ("status", str(status))))] += 1
+            self._histogram("printshop_http_request_duration_seconds", ep, wall, BUCKETS)
+            s[("printshop_sql_statements_total", ep)] += stats.statements
+            s[("printshop_sql_duration_seconds_total", ep)] += stats.seconds
+            s[("printshop_sql_rows_total", ep)] += stats.rows
+
+    def snapshot(self) -> list:
+        for collect in self.collectors:
+            collect(self)
+        with self.lock:
+            items = list(self.samples.items()) + list(self.gauges.items())
+        return [[name, list(labels), value] for (name, labels), value in items]
+
+    def flush(self, directory: str) -> None:
+        """Write this worker's samples to METRICS_DIR, at most once a second."""
+        now = time.monotonic()
+        if now - self.flushed < 1.0:
+            return
+        self.flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", "w") as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(f"{path}.tmp", path)
+
+
+registry = Registry()
+
+
+class RequestStats:
+    __slots__ = ("statements", "seconds", "rows", "slowest", "slowest_sql")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slowest = 0.0
+        self.slowest_sql = ""
+
+
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    conn.info["instrumentation_t0"] = time.perf_counter()
+
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("instrumentation_t0", time.perf_counter())
+    if not has_request_context():
+        return
+    stats = g.get("request_stats")
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.seconds += elapsed
+    if cursor.description is not None and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if elapsed > stats.slowest:
+        stats.slowest, stats.slowest_sql = elapsed, statement
+
+
+def _aggregate(directory: str) -> list:
+    """Samples of every worker that has written a snapshot."""
+    totals: dict[tuple, float] = defaultdict(float)
+    now = time.time()
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            fresh = now - os.path.getmtime(path) < GAUGE_MAX_AGE
+            with open(path) as fh:
+                samples = json.load(fh)
+        except (OSError, ValueError):
+            continue  # a worker is replacing it right now
+        for metric, labels, value in samples:
+            if not fresh and METRICS.get(metric, ("counter",))[0] == "gauge":
+                continue
+            totals[(metric, tuple(tuple(pair) for pair in labels))] += value
+    return [[name, labels, value] for (name, labels), value in totals.items()]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(samples: list) -> str:
+    by_metric: dict[str, list] = defaultdict(list)
+    for name, labels, value in samples:
+        base = name.removesuffix("_bucket").removesuffix("_sum").removesuffix("_count")
+        by_metric[base].append((name, tuple(tuple(pair) for pair in labels), value))
+    lines = []
+    for base, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {base} {help_text}")
+        lines.append(f"# TYPE {base} {kind}")
+        for name, labels, value in sorted(by_metric.get(base, []), key=_sort_key):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {value:.6g}" if labels else f"{name} {value:.6g}")
+    return "\n".join(lines) + "\n"
+
+
+def _sort_key(sample) -> tuple:
+    name, labels, _ = sample
+    # buckets in ascending `le` order, +Inf last
+    le = dict(labels).get("le")
+    return name, tuple(p for p in labels if p[0] != "le"), float(le) if le else 0.0
+
+
+def _metrics_view():
+    token = current_app.config["METRICS_TOKEN"]
+    if token:
+        sent = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(sent.encode(), token.encode()):
+            abort(401)
+    elif not current_user.is_authenticated:
+        abort(401)
+    directory = current_app.config["METRICS_DIR"]
+    if directory:
+        registry.flush(directory)
+        samples = _aggregate(directory)
+    else:
+        samples = registry.snapshot()
+    return Response(render(samples), mimetype="text/plain; version=0.0.4")
+
+
+def init_instrumentation(app: Flask) -> None:
+    """Time every request and its SQL; serve the totals at /metrics."""
+    if not app.config.get("INSTRUMENTATION_ENABLED"):
+        return
+    slow_ms = app.config["SLOW_REQUEST_MS"]
+    server_timing = app.config["SERVER_TIMING"]
+    directory = app.config["METRICS_DIR"]
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor)
+            event.listen(engine, "after_cursor_execute", _after_cursor)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def server_timing_header(response):
+        # the last status wins: an error raised by a later after_request hook turns it into a 500
+        g.response_status = response.status_code
+        started = g.get("request_started")
+        if server_timing and started is not None:
+            stats = g.request_stats
+            response.headers.add(
+                "Server-Timing",
+                f'app;dur={(time.perf_counter() - started) * 1000:.1f}, '
+                f'db;dur={stats.seconds * 1000:.1f};desc="{stats.statements} queries"',
+            )
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        # teardown runs whether or not the view raised, so failed requests are counted too
+        started = g.get("request_started")
+        if started is None:
+            return
+        wall = time.perf_counter() - started
+        stats = g.request_stats
+        status = 500 if exc is not None else g.get("response_status", 500)
+        endpoint = request.endpoint or "<unmatched>"
+        if endpoint == "metrics":
+            return
+        registry.observe(endpoint, request.method, status, wall, stats)
+        if directory:
+            registry.flush(directory)
+        if wall * 1000 >= slow_ms:
+            logger.warning(
+                "slow request %s %s -> %s in %.0fms (%d SQL, %.0fms in SQL, %d rows); slowest %.0fms: %s",
+                request.method, request.path, status, wall * 1000,
+                stats.statements, stats.seconds * 1000, stats.rows, stats.slowest * 1000,
+                " ".join(stats.slowest_sql.split())[:300],
+            )
+
+    app.add_url_rule("/metrics", "metrics", _metrics_view)
+    csrf.exempt(_metrics_view)
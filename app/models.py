@@ -1,7 +1,7 @@
 from __future__ import annotations
 from datetime import datetime, date
 from decimal import Decimal
-from sqlalchemy import func, CheckConstraint, UniqueConstraint, ForeignKey
+from sqlalchemy import func, text, CheckConstraint, UniqueConstraint, ForeignKey, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -16,6 +16,14 @@ class TimestampMixin:
 
 class Cliente(db.Model, TimestampMixin):
     __tablename__ = "clientes"
+    # trigram GIN indexes serve app.utils.search on PostgreSQL (plain indexes elsewhere)
+    __table_args__ = (
+        Index("ix_clientes_created_at_id", "created_at", "id"),
+        *(
+            Index(f"ix_clientes_{col}_trgm", col, postgresql_using="gin", postgresql_ops={col: "gin_trgm_ops"})
+            for col in ("nombre", "correo", "rut", "telefono")
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     nombre: Mapped[str] = mapped_column(db.String(255), nullable=False)
@@ -92,18 +100,37 @@ class Vendedor(db.Model, TimestampMixin):
 
 class Orden(db.Model, TimestampMixin):
     __tablename__ = "ordenes"
+    # Keyset pagination walks (created_at, id) newest-first; each list filter gets its own prefix.
+    __table_args__ = (
+        Index("ix_ordenes_created_at_id", "created_at", "id"),
+        Index("ix_ordenes_estado_trabajo_created_at_id", "estado_trabajo", "created_at", "id"),
+        Index("ix_ordenes_estado_despacho_created_at_id", "estado_despacho", "created_at", "id"),
+        Index("ix_ordenes_estado_pago_created_at_id", "estado_pago", "created_at", "id"),
+        Index("ix_ordenes_cliente_id_created_at_id", "cliente_id", "created_at", "id"),
+        Index("ix_ordenes_vendedor_id_created_at_id", "vendedor_id", "created_at", "id"),
+        # Date-range reads (dashboard summary, calendar feed) seek on fecha and filter estado_trabajo in the index
+        Index("ix_ordenes_fecha_estado_trabajo", "fecha", "estado_trabajo"),
+        # "Orders with balance due" stays an index lookup however large the history gets
+        Index("ix_ordenes_con_saldo", "fecha", "id", postgresql_where=text("saldo > 0"), sqlite_where=text("saldo > 0")),
+        Index("ix_ordenes_cliente_con_saldo", "cliente_id", "fecha", "id",
+              postgresql_where=text("saldo > 0"), sqlite_where=text("saldo > 0")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     cliente_id: Mapped[int] = mapped_column(ForeignKey("clientes.id"), nullable=False)
     usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"), nullable=False)
     vendedor_id: Mapped[int | None] = mapped_column(ForeignKey("vendedores.id"))
 
-    fecha: Mapped[date] = mapped_column(default=date.today, nullable=False)
+    fecha: Mapped[date] = mapped_column(default=date.today, nullable=False, active_history=True)
 
     precio_neto: Mapped[Decimal] = mapped_column(db.Numeric(12, 2), default=0)
     iva: Mapped[Decimal] = mapped_column(db.Numeric(12, 2), default=0)
     precio_total: Mapped[Decimal] = mapped_column(db.Numeric(12, 2), default=0)
 
+    # Persisted totals, maintained on every Pago flush by app.utils.saldos
+    abono: Mapped[Decimal] = mapped_column(db.Numeric(12, 2), default=0, server_default="0")
+    saldo: Mapped[Decimal] = mapped_column(db.Numeric(12, 2), default=0, server_default="0")
+
     estado_trabajo: Mapped[str] = mapped_column(db.String(50), default="pendiente")  # pendiente, en_proceso, listo
     estado_despacho: Mapped[str] = mapped_column(db.String(50), default="pendiente")  # pendiente, despachado
     estado_pago: Mapped[str] = mapped_column(db.String(50), default="pendiente")  # pendiente, abonado, pagado
@@ -153,11 +180,13 @@ class Orden(db.Model, TimestampMixin):
 
 class Pago(db.Model, TimestampMixin):
     __tablename__ = "pagos"
+    __table_args__ = (Index("ix_pagos_fecha", "fecha"), Index("ix_pagos_created_at_id", "created_at", "id"))
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    orden_id: Mapped[int] = mapped_column(ForeignKey("ordenes.id"), nullable=False)
-    monto: Mapped[Decimal] = mapped_column(db.Numeric(12, 2), nullable=False)
-    fecha: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
+    # active_history: app.utils.saldos / app.utils.resumen need the previous values
+    orden_id: Mapped[int] = mapped_column(ForeignKey("ordenes.id"), nullable=False, active_history=True)
+    monto: Mapped[Decimal] = mapped_column(db.Numeric(12, 2), nullable=False, active_history=True)
+    fecha: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False, active_history=True)
     metodo: Mapped[str] = mapped_column(db.String(50), default="transferencia")
     usuario_id: Mapped[int | None] = mapped_column(ForeignKey("usuarios.id"))
 
@@ -166,30 +195,49 @@ class Pago(db.Model, TimestampMixin):
 
 
 class Attachment(db.Model, TimestampMixin):
+    """An uploaded file; the bytes live once per SHA-256 under UPLOAD_FOLDER (see app.utils.attachments)."""
     __tablename__ = "attachments"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    orden_id: Mapped[int] = mapped_column(ForeignKey("ordenes.id"), nullable=False)
+    orden_id: Mapped[int] = mapped_column(ForeignKey("ordenes.id"), nullable=False, index=True)
     filename: Mapped[str] = mapped_column(db.String(255), nullable=False)
     path: Mapped[str] = mapped_column(db.String(512), nullable=False)
+    sha256: Mapped[str | None] = mapped_column(db.String(64), index=True)
+    size: Mapped[int | None] = mapped_column(db.BigInteger)
+    content_type: Mapped[str | None] = mapped_column(db.String(255))
     uploaded_by_id: Mapped[int | None] = mapped_column(ForeignKey("usuarios.id"))
 
     orden: Mapped[Orden] = relationship("Orden", back_populates="attachments")
 
 
 class Log(db.Model, TimestampMixin):
+    """Audit row, written in batches by app.audit."""
     __tablename__ = "logs"
+    # the viewer pages newest-first, optionally narrowed to one record or one user
+    __table_args__ = (
+        Index("ix_logs_created_at_id", "created_at", "id"),
+        Index("ix_logs_entidad_entidad_id_created_at_id", "entidad", "entidad_id", "created_at", "id"),
+        Index("ix_logs_usuario_id_created_at_id", "usuario_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     accion: Mapped[str] = mapped_column(db.String(100), nullable=False)
     entidad: Mapped[str] = mapped_column(db.String(100), nullable=False)
     entidad_id: Mapped[int | None]
     mensaje: Mapped[str | None] = mapped_column(db.Text())
-    usuario_id: Mapped[int | None] = mapped_column(ForeignKey("usuarios.id"))
+    # the trail outlives the user: deleting one keeps its rows, without the author
+    usuario_id: Mapped[int | None] = mapped_column(ForeignKey("usuarios.id", ondelete="SET NULL"))
+
+    usuario: Mapped[Usuario | None] = relationship("Usuario")
 
 
 class NotificationLog(db.Model, TimestampMixin):
+    """Outbox row: web requests insert it, `flask notifications-worker` sends it."""
     __tablename__ = "notification_logs"
+    __table_args__ = (
+        Index("ix_notification_logs_pendientes", "proximo_intento", "id",
+              postgresql_where=text("estado = 'pendiente'"), sqlite_where=text("estado = 'pendiente'")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     orden_id: Mapped[int | None] = mapped_column(ForeignKey("ordenes.id"))
@@ -197,8 +245,12 @@ class NotificationLog(db.Model, TimestampMixin):
     canal: Mapped[str] = mapped_column(db.String(50), nullable=False)  # email, whatsapp
     asunto: Mapped[str | None] = mapped_column(db.String(255))
     mensaje: Mapped[str | None] = mapped_column(db.Text())
-    estado: Mapped[str] = mapped_column(db.String(50), default="pendiente")
+    estado: Mapped[str] = mapped_column(db.String(50), default="pendiente")  # pendiente, enviado, error, simulado
     respuesta: Mapped[str | None] = mapped_column(db.Text())
+    intentos: Mapped[int] = mapped_column(db.Integer, default=0, server_default="0")
+    proximo_intento: Mapped[datetime] = mapped_column(default=datetime.utcnow, server_default=func.now())
+    enviado_at: Mapped[datetime | None]
+    latencia_ms: Mapped[int | None]
 
 
 class Setting(db.Model, TimestampMixin):
@@ -233,4 +285,28 @@ class Descripcion(db.Model, TimestampMixin):
     orden: Mapped[Orden] = relationship("Orden", back_populates="descripciones")
 
     def recompute(self):
-        self.subtotal = Decimal(self.cantidad or 0) * Decimal(self.precio_unitario or 0)
\ No newline at end of file
+        self.subtotal = Decimal(self.cantidad or 0) * Decimal(self.precio_unitario or 0)
+
+
+class ResumenDiario(db.Model, TimestampMixin):
+    """Per-day totals by vendedor and estado_trabajo, refreshed by app.utils.resumen."""
+    __tablename__ = "resumen_diario"
+    __table_args__ = (Index("ix_resumen_diario_fecha_vendedor_estado", "fecha", "vendedor_id", "estado_trabajo"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    fecha: Mapped[date] = mapped_column(nullable=False)
+    vendedor_id: Mapped[int | None]
+    estado_trabajo: Mapped[str] = mapped_column(db.String(50), nullable=False)
+    ordenes: Mapped[int] = mapped_column(db.Integer, default=0)
+    ventas: Mapped[Decimal] = mapped_column(db.Numeric(14, 2), default=0)
+    pagos: Mapped[Decimal] = mapped_column(db.Numeric(14, 2), default=0)
+    pendientes: Mapped[int] = mapped_column(db.Integer, default=0)
+
+
+class CacheVersion(db.Model, TimestampMixin):
+    """Counters bumped on writes so every worker can tell its in-process caches are stale."""
+    __tablename__ = "cache_versions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    nombre: Mapped[str] = mapped_column(db.String(100), unique=True, nullable=False)
+    version: Mapped[int] = mapped_column(db.Integer, nullable=False, default=1, server_default="1")
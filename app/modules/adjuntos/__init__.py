@@ -0,0 +1 @@
+# adjuntos module
\ No newline at end of file
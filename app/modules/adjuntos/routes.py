@@ -0,0 +1,73 @@
+from flask import Blueprint, request, redirect, url_for, flash, send_file, jsonify, abort
+from flask_login import login_required, current_user
+
+from ...extensions import db
+from ...models import Attachment, Orden
+from ...utils import attachments
+
+bp = Blueprint("adjuntos", __name__, url_prefix="/adjuntos")
+
+# content_type comes from the uploader, so only types that cannot run script are shown in the browser
+INLINE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "application/pdf"}
+
+
+@bp.route("/orden/<int:orden_id>", methods=["POST"])
+@login_required
+def upload(orden_id: int):
+    # Multipart from the order form, or the raw file as the body (?filename=...) from scripts/fetch
+    orden = db.session.get(Orden, orden_id) or abort(404)
+    if request.mimetype == "multipart/form-data":
+        archivo = request.files.get("archivo")
+        if archivo is None or not archivo.filename:
+            flash("Seleccione un archivo", "warning")
+            return redirect(url_for("ordenes.index"))
+        attachments.create(orden.id, archivo.stream, archivo.filename, archivo.mimetype, current_user.id)
+        flash("Archivo adjuntado", "success")
+        return redirect(url_for("ordenes.index"))
+    filename = request.args.get("filename") or request.headers.get("X-Filename") or "archivo"
+    att = attachments.create(orden.id, request.stream, filename, request.mimetype, current_user.id)
+    return jsonify(id=att.id, sha256=att.sha256, size=att.size, url=url_for("adjuntos.download", adjunto_id=att.id)), 201
+
+
+@bp.route("/<int:adjunto_id>")
+@login_required
+def download(adjunto_id: int):
+    att = db.session.get(Attachment, adjunto_id) or abort(404)
+    inline = request.args.get("inline") is not None and att.content_type in INLINE_TYPES
+    # conditional=True gives ETag/If-None-Match and Range (206) support
+    response = send_file(
+        attachments.abspath(att),
+        mimetype=att.content_type,
+        as_attachment=not inline,
+        download_name=att.filename,
+        etag=att.sha256 or True,
+        conditional=True,
+        max_age=0,
+    )
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+@bp.route("/<int:adjunto_id>/miniatura")
+@login_required
+def thumbnail(adjunto_id: int):
+    att = db.session.get(Attachment, adjunto_id) or abort(404)
+    path = attachments.request_thumbnail(att)
+    if path is None and attachments.thumbnail_failed(att):
+        return jsonify(pendiente=False), 415  # not an image PIL can read; polling again will not help
+    if path is None:
+        response = jsonify(pendiente=attachments.has_preview(att))
+        response.status_code = 202 if attachments.has_preview(att) else 404
+        response.headers["Retry-After"] = "2"
+        return response
+    # same bytes forever for a given sha
+    return send_file(path, mimetype="image/jpeg", etag=att.sha256, conditional=True, max_age=31536000)
+
+
+@bp.route("/<int:adjunto_id>/delete", methods=["POST"])
+@login_required
+def delete(adjunto_id: int):
+    att = db.session.get(Attachment, adjunto_id) or abort(404)
+    attachments.delete(att)
+    flash("Adjunto eliminado", "success")
+    return redirect(url_for("ordenes.index"))
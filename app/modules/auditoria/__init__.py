@@ -0,0 +1 @@
+# auditoria module
\ No newline at end of file
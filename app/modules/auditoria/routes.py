@@ -0,0 +1,27 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from ...models import Log
+from ...queries import ACCIONES_LOG, ENTIDADES_LOG, logs_list, parse_log_filters, usuarios_list
+from ...utils.pagination import keyset_paginate, parse_per_page
+
+bp = Blueprint("auditoria", __name__, url_prefix="/auditoria", template_folder="templates")
+
+
+@bp.route("/")
+@login_required
+def index():
+    if current_user.rol != "admin":
+        flash("Solo admin", "warning")
+        return redirect(url_for("dashboard.index"))
+    filtros = parse_log_filters(request.args)
+    page = keyset_paginate(logs_list(filtros), Log, request.args.get("cursor"), parse_per_page(request.args))
+    return render_template(
+        "auditoria/index.html",
+        logs=page.items,
+        page=page,
+        filtros=filtros,
+        usuarios=usuarios_list().all(),
+        entidades=ENTIDADES_LOG,
+        acciones=ACCIONES_LOG,
+    )
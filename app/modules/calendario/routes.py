@@ -1,10 +1,31 @@
-from flask import Blueprint, render_template
+from datetime import timedelta
+
+from flask import Blueprint, render_template, request, jsonify, abort, current_app
 from flask_login import login_required
 
+from ...queries import ESTADOS_TRABAJO, ESTADOS_DESPACHO, parse_date, parse_orden_filters, calendario_eventos
+
 bp = Blueprint("calendario", __name__, url_prefix="/calendario", template_folder="templates")
 
 
 @bp.route("/")
 @login_required
 def index():
-    return render_template("calendario/index.html")
\ No newline at end of file
+    return render_template("calendario/index.html", estados_trabajo=ESTADOS_TRABAJO, estados_despacho=ESTADOS_DESPACHO)
+
+
+@bp.route("/eventos")
+@login_required
+def eventos():
+    desde = parse_date(request.args.get("desde"))
+    hasta = parse_date(request.args.get("hasta"))
+    if desde is None or hasta is None or hasta < desde:
+        abort(400)
+    if hasta - desde > timedelta(days=current_app.config["CALENDAR_MAX_DAYS"]):
+        abort(400)
+    response = jsonify(calendario_eventos(desde, hasta, parse_orden_filters(request.args)))
+    # the body is small, so hashing it is cheaper than a second query for a version stamp
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, request, redirect, url_for, flash, jsonify
 from flask_login import login_required
 
 from ...extensions import db
 from ...models import Cliente
+from ...queries import clientes_list
+from ...utils import export as export_util
+from ...utils import fragments
+from ...utils import search
+from ...utils.pagination import keyset_paginate, parse_per_page
 from .forms import ClienteForm
 
 bp = Blueprint("clientes", __name__, url_prefix="/clientes", template_folder="templates")
@@ -11,14 +16,22 @@ bp = Blueprint("clientes", __name__, url_prefix="/clientes", template_folder="te
 @bp.route("/")
 @login_required
 def index():
-    q = request.args.get("q", "").strip()
-    query = Cliente.query
-    if q:
-        like = f"%{q}%"
-        query = query.filter((Cliente.nombre.ilike(like)) | (Cliente.correo.ilike(like)))
-    clientes = query.order_by(Cliente.created_at.desc()).all()
-    form = ClienteForm()
-    return render_template("clientes/index.html", clientes=clientes, form=form, q=q)
+    def contexto():
+        q = request.args.get("q", "").strip()
+        per_page = parse_per_page(request.args)
+        if q:
+            page = search.search_clientes(q, request.args.get("page", 1, type=int), per_page)
+        else:
+            page = keyset_paginate(clientes_list(), Cliente, request.args.get("cursor"), per_page)
+        return dict(clientes=page.items, page=page, form=ClienteForm(), q=q)
+
+    return fragments.render("clientes/index.html", "clientes/_lista.html", ("clientes",), contexto)
+
+
+@bp.route("/autocomplete")
+@login_required
+def autocomplete():
+    return jsonify(search.autocomplete(request.args.get("q", ""), request.args.get("limit", type=int)))
 
 
 @bp.route("/create", methods=["POST"]) 
@@ -64,4 +77,10 @@ def delete(cliente_id: int):
     db.session.delete(cliente)
     db.session.commit()
     flash("Cliente eliminado", "success")
-    return redirect(url_for("clientes.index"))
\ No newline at end of file
+    return redirect(url_for("clientes.index"))
+
+
+@bp.route("/export.<any(csv, xlsx):formato>")
+@login_required
+def export(formato: str):
+    return export_util.response("clientes", formato, request.args)
@@ -1,13 +1,22 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField
-from wtforms.validators import Optional
+from wtforms import BooleanField, IntegerField, PasswordField, StringField, SubmitField
+from wtforms.validators import DataRequired, Email, NumberRange, Optional
 
 
 class SMTPForm(FlaskForm):
-    host = StringField("SMTP Host", validators=[Optional()])
-    port = StringField("SMTP Port", validators=[Optional()])
+    host = StringField("SMTP Host", validators=[DataRequired()])
+    port = IntegerField("SMTP Port", validators=[DataRequired(), NumberRange(min=1, max=65535)])
     username = StringField("SMTP Username", validators=[Optional()])
-    password = StringField("SMTP Password", validators=[Optional()])
-    use_tls = StringField("SMTP Use TLS (true/false)", validators=[Optional()])
-    from_addr = StringField("From", validators=[Optional()])
-    submit = SubmitField("Guardar")
\ No newline at end of file
+    password = PasswordField("SMTP Password", validators=[Optional()])  # blank keeps the stored one
+    use_tls = BooleanField("SMTP Use TLS")
+    from_addr = StringField("From", validators=[DataRequired(), Email()])
+    submit = SubmitField("Guardar")
+
+
+class EmpresaForm(FlaskForm):
+    nombre = StringField("Nombre", validators=[DataRequired()])
+    rut = StringField("RUT", validators=[Optional()])
+    direccion = StringField("Dirección", validators=[Optional()])
+    telefono = StringField("Teléfono", validators=[Optional()])
+    email = StringField("Email", validators=[Optional(), Email()])
+    submit = SubmitField("Guardar")
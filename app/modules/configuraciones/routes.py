@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
 
+from ...utils import settings
+from .forms import EmpresaForm, SMTPForm
+
 bp = Blueprint("configuraciones", __name__, url_prefix="/configuraciones", template_folder="templates")
 
 
@@ -10,8 +13,16 @@ def index():
     if current_user.rol != "admin":
         flash("Solo admin", "warning")
         return redirect(url_for("dashboard.index"))
-    cfg = current_app.config
-    return render_template("configuraciones/index.html", cfg=cfg)
+    smtp = settings.smtp()
+    smtp_form = SMTPForm(data={
+        "host": smtp["SMTP_HOST"], "port": smtp["SMTP_PORT"], "username": smtp["SMTP_USERNAME"],
+        "use_tls": smtp["SMTP_USE_TLS"], "from_addr": smtp["SMTP_FROM"],
+    })
+    empresa_form = EmpresaForm(data=settings.empresa() or {})
+    return render_template(
+        "configuraciones/index.html", smtp_form=smtp_form, empresa_form=empresa_form,
+        password_guardada=bool(smtp["SMTP_PASSWORD"]),
+    )
 
 
 @bp.route("/smtp", methods=["POST"]) 
@@ -20,14 +31,34 @@ def smtp_save():
     if current_user.rol != "admin":
         flash("Solo admin", "warning")
         return redirect(url_for("configuraciones.index"))
-    form = request.form
-    current_app.config.update(
-        SMTP_HOST=form.get("host") or current_app.config.get("SMTP_HOST"),
-        SMTP_PORT=int(form.get("port") or current_app.config.get("SMTP_PORT")),
-        SMTP_USERNAME=form.get("username") or "",
-        SMTP_PASSWORD=form.get("password") or "",
-        SMTP_USE_TLS=(form.get("use_tls") or "false").lower() == "true",
-        SMTP_FROM=form.get("from_addr") or current_app.config.get("SMTP_FROM"),
-    )
-    flash("SMTP actualizado (solo en runtime)", "success")
-    return redirect(url_for("configuraciones.index"))
\ No newline at end of file
+    form = SMTPForm()
+    if form.validate_on_submit():
+        valores = {
+            "SMTP_HOST": form.host.data,
+            "SMTP_PORT": form.port.data,
+            "SMTP_USERNAME": form.username.data or "",
+            "SMTP_USE_TLS": form.use_tls.data,
+            "SMTP_FROM": form.from_addr.data,
+        }
+        if form.password.data:
+            valores["SMTP_PASSWORD"] = form.password.data
+        settings.save(valores)
+        flash("SMTP actualizado", "success")
+    else:
+        flash("Errores en el formulario", "danger")
+    return redirect(url_for("configuraciones.index"))
+
+
+@bp.route("/empresa", methods=["POST"])
+@login_required
+def empresa_save():
+    if current_user.rol != "admin":
+        flash("Solo admin", "warning")
+        return redirect(url_for("configuraciones.index"))
+    form = EmpresaForm()
+    if form.validate_on_submit():
+        settings.save_empresa(form.data)
+        flash("Datos de la empresa actualizados", "success")
+    else:
+        flash("Errores en el formulario", "danger")
+    return redirect(url_for("configuraciones.index"))
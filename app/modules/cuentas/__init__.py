@@ -0,0 +1 @@
+# cuentas module
\ No newline at end of file
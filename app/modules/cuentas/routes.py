@@ -0,0 +1,59 @@
+from datetime import date
+
+from flask import Blueprint, render_template, request
+from flask_login import login_required
+
+from ...extensions import db
+from ...models import Cliente
+from ...queries import parse_date
+from ...utils import cuentas
+from ...utils import export as export_util
+from ...utils.pagination import parse_per_page
+
+bp = Blueprint("cuentas", __name__, url_prefix="/cuentas", template_folder="templates")
+
+
+@bp.route("/")
+@login_required
+def index():
+    corte = parse_date(request.args.get("corte")) or date.today()
+    page, totales = cuentas.aging_page(db.session, corte, request.args.get("cursor"), parse_per_page(request.args))
+    return render_template(
+        "cuentas/index.html",
+        clientes=page.items,
+        page=page,
+        totales=totales,
+        corte=corte,
+        tramos=cuentas.TRAMOS,
+    )
+
+
+@bp.route("/<int:cliente_id>")
+@login_required
+def estado(cliente_id: int):
+    cliente = Cliente.query.get_or_404(cliente_id)
+    corte = parse_date(request.args.get("corte")) or date.today()
+    resumen = db.session.execute(cuentas.aging(corte, cliente_id, totales=False)[0]).first()
+    page = cuentas.estado_cuenta_page(db.session, cliente_id, request.args.get("cursor"), parse_per_page(request.args))
+    return render_template(
+        "cuentas/estado.html",
+        cliente=cliente,
+        resumen=resumen,
+        ordenes=page.items,
+        page=page,
+        corte=corte,
+        tramos=cuentas.TRAMOS,
+        tramo=cuentas.tramo,
+    )
+
+
+@bp.route("/export.<any(csv, xlsx):formato>")
+@login_required
+def export(formato: str):
+    return export_util.response("cartera", formato, request.args)
+
+
+@bp.route("/<int:cliente_id>/export.<any(csv, xlsx):formato>")
+@login_required
+def estado_export(cliente_id: int, formato: str):
+    return export_util.response("estado_cuenta", formato, {**request.args, "cliente_id": cliente_id})
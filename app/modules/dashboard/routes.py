@@ -1,11 +1,9 @@
 from datetime import date
-from decimal import Decimal
 from flask import Blueprint, render_template
 from flask_login import login_required
-from sqlalchemy import func
 
-from ...extensions import db
-from ...models import Orden, Pago, NotificationLog
+from ...models import NotificationLog
+from ...utils import resumen
 
 bp = Blueprint("dashboard", __name__, url_prefix="/", template_folder="templates")
 
@@ -14,8 +12,16 @@ bp = Blueprint("dashboard", __name__, url_prefix="/", template_folder="templates
 @login_required
 def index():
     today = date.today()
-    total_ventas = db.session.query(func.coalesce(func.sum(Orden.precio_total), 0)).scalar() or Decimal(0)
-    total_pagos = db.session.query(func.coalesce(func.sum(Pago.monto), 0)).scalar() or Decimal(0)
-    pendientes = db.session.query(func.count(Orden.id)).filter((Orden.precio_total - Orden.abono_calc) > 0).scalar() or 0
+    totales = resumen.totales()
+    periodos = resumen.periodos(today)
+    vendedores_mes = resumen.por_vendedor(desde=today.replace(day=1))
     notificaciones = NotificationLog.query.order_by(NotificationLog.created_at.desc()).limit(10).all()
-    return render_template("dashboard/index.html", total_ventas=total_ventas, total_pagos=total_pagos, pendientes=pendientes, notificaciones=notificaciones)
\ No newline at end of file
+    return render_template(
+        "dashboard/index.html",
+        total_ventas=totales["ventas"],
+        total_pagos=totales["pagos"],
+        pendientes=totales["pendientes"],
+        periodos=periodos,
+        vendedores_mes=vendedores_mes,
+        notificaciones=notificaciones,
+    )
\ No newline at end of file
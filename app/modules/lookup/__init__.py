@@ -0,0 +1 @@
+# lookup module
\ No newline at end of file
@@ -0,0 +1,17 @@
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import login_required
+
+from ...utils import lookup
+
+bp = Blueprint("lookup", __name__, url_prefix="/lookup")
+
+
+@bp.route("/<entidad>")
+@login_required
+def search(entidad: str):
+    buscar = lookup.ENTIDADES.get(entidad)
+    if buscar is None:
+        abort(404)
+    limit = current_app.config["AUTOCOMPLETE_LIMIT"]
+    limit = max(1, min(request.args.get("limit", limit, type=int), limit))
+    return jsonify(buscar(request.args.get("q", "").strip(), limit))
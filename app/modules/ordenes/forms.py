@@ -1,15 +1,25 @@
 from flask_wtf import FlaskForm
-from wtforms import SelectField, TextAreaField, DecimalField, DateField, SubmitField
-from wtforms.validators import DataRequired, Optional
+from wtforms import TextAreaField, DecimalField, DateField, IntegerField, StringField, SubmitField
+from wtforms.validators import DataRequired, Optional, Length, NumberRange
+
+from ...models import Cliente, Usuario, Vendedor
+from ...utils.lookup import LookupField
 
 
 class OrdenForm(FlaskForm):
-    cliente_id = SelectField("Cliente", coerce=int, validators=[DataRequired()])
-    vendedor_id = SelectField("Vendedor", coerce=int, validators=[Optional()])
-    usuario_id = SelectField("Usuario", coerce=int, validators=[DataRequired()])
+    cliente_id = LookupField("Cliente", model=Cliente, validators=[DataRequired()])
+    vendedor_id = LookupField("Vendedor", model=Vendedor, validators=[Optional()])
+    usuario_id = LookupField("Usuario", model=Usuario, validators=[DataRequired()])
     fecha = DateField("Fecha", validators=[DataRequired()])
     precio_neto = DecimalField("Precio Neto", places=2, validators=[DataRequired()])
     iva = DecimalField("IVA", places=2, validators=[DataRequired()])
     precio_total = DecimalField("Precio Total", places=2, validators=[DataRequired()])
     observaciones = TextAreaField("Observaciones", validators=[Optional()])
-    submit = SubmitField("Guardar")
\ No newline at end of file
+    submit = SubmitField("Guardar")
+
+
+class DescripcionForm(FlaskForm):
+    texto = StringField("Descripción", validators=[DataRequired(), Length(max=500)])
+    cantidad = IntegerField("Cantidad", default=1, validators=[DataRequired(), NumberRange(min=1)])
+    precio_unitario = DecimalField("Precio Unitario", places=2, validators=[Optional(), NumberRange(min=0)])
+    submit = SubmitField("Agregar")
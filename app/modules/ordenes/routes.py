@@ -1,12 +1,24 @@
+import os
+from concurrent.futures import TimeoutError as FuturesTimeout
 from decimal import Decimal
-from io import BytesIO
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, send_file, make_response, current_app,
+    Response, stream_with_context, jsonify,
+)
 from flask_login import login_required, current_user
+from jinja2 import TemplateError
+from werkzeug.datastructures import MultiDict
 
+from ... import audit
 from ...extensions import db
-from ...models import Orden, Cliente, Vendedor, Usuario
-from .forms import OrdenForm
+from ...models import Orden, Cliente, Descripcion, Vendedor
+from ...queries import ESTADOS_TRABAJO, ESTADOS_DESPACHO, ESTADOS_PAGO, parse_orden_filters, ordenes_list, orden_detail
+from ...utils import campaigns, settings, totales
+from ...utils import export as export_util
+from ...utils import pdf as pdf_cache
+from ...utils.pagination import keyset_paginate, parse_per_page
+from .forms import DescripcionForm, OrdenForm
 
 bp = Blueprint("ordenes", __name__, url_prefix="/ordenes", template_folder="templates")
 
@@ -14,17 +26,83 @@ bp = Blueprint("ordenes", __name__, url_prefix="/ordenes", template_folder="temp
 @bp.route("/")
 @login_required
 def index():
-    ordenes = Orden.query.order_by(Orden.created_at.desc()).all()
-    clientes = Cliente.query.order_by(Cliente.nombre).all()
-    vendedores = Vendedor.query.order_by(Vendedor.nombre).all()
-    usuarios = Usuario.query.order_by(Usuario.nombre).all()
+    filtros = parse_orden_filters(request.args)
+    page = keyset_paginate(ordenes_list(filtros), Orden, request.args.get("cursor"), parse_per_page(request.args))
+    # clientes, vendedores and usuarios are picked through /lookup; only the active filters need a label
+    cliente_filtro = db.session.get(Cliente, filtros["cliente_id"]) if "cliente_id" in filtros else None
+    vendedor_filtro = db.session.get(Vendedor, filtros["vendedor_id"]) if "vendedor_id" in filtros else None
+
+    return render_template(
+        "ordenes/index.html",
+        ordenes=page.items,
+        page=page,
+        form=OrdenForm(),
+        filtros=filtros,
+        cliente_filtro=cliente_filtro,
+        vendedor_filtro=vendedor_filtro,
+        estados_trabajo=ESTADOS_TRABAJO,
+        estados_despacho=ESTADOS_DESPACHO,
+        estados_pago=ESTADOS_PAGO,
+    )
+
+
+@bp.route("/notificar", methods=["POST"])
+@login_required
+def notificar():
+    filtros = parse_orden_filters(request.form)
+    if current_user.rol != "admin":
+        flash("Solo admin", "warning")
+        return redirect(url_for("ordenes.index", **filtros))
+    asunto = (request.form.get("asunto") or "").strip()
+    mensaje = (request.form.get("mensaje") or "").strip()
+    if not asunto or not mensaje:
+        flash("Asunto y mensaje son obligatorios", "danger")
+    elif not filtros:
+        flash("Aplique al menos un filtro antes de enviar una campaña", "warning")
+    else:
+        try:
+            encolados = campaigns.enqueue(asunto, mensaje, filtros)
+            flash(f"{encolados} notificaciones encoladas", "success")
+        except TemplateError as exc:
+            flash(f"Plantilla inválida: {exc}", "danger")
+    return redirect(url_for("ordenes.index", **filtros))
 
-    form = OrdenForm()
-    form.cliente_id.choices = [(c.id, c.nombre) for c in clientes]
-    form.vendedor_id.choices = [(0, "-")] + [(v.id, v.nombre) for v in vendedores]
-    form.usuario_id.choices = [(u.id, u.nombre) for u in usuarios]
 
-    return render_template("ordenes/index.html", ordenes=ordenes, form=form)
+@bp.route("/lote")
+@login_required
+def lote():
+    # Batch print: PDFs render in the pool, then the archive streams out from the disk cache
+    filtros = parse_orden_filters(request.args)
+    formato = request.args.get("formato", "zip")
+    limite = current_app.config["PDF_BATCH_MAX"]
+    ordenes = pdf_cache.batch(filtros, limite)
+    if not ordenes:
+        flash("No hay órdenes para exportar con esos filtros", "warning")
+        return redirect(url_for("ordenes.index", **filtros))
+    if len(ordenes) > limite:
+        flash(f"Máximo {limite} órdenes por lote; acote los filtros", "warning")
+        return redirect(url_for("ordenes.index", **filtros))
+    if formato == "pdf" and len(ordenes) > current_app.config["PDF_MERGE_MAX"]:
+        flash(f"Máximo {current_app.config['PDF_MERGE_MAX']} órdenes en un PDF combinado; use ZIP", "warning")
+        return redirect(url_for("ordenes.index", **filtros))
+    # Everything is rendered (and merged) before the first byte, so a failure is a message, not a cut download
+    try:
+        rendered = pdf_cache.render_all(ordenes)
+        if formato == "pdf":
+            merged = pdf_cache.merge(rendered)
+    except Exception:
+        current_app.logger.exception("batch PDF export failed")
+        flash("No se pudieron generar los PDF del lote; intente de nuevo o acote los filtros", "danger")
+        return redirect(url_for("ordenes.index", **filtros))
+    if formato == "pdf":
+        chunks, mimetype, nombre = pdf_cache.stream_file(merged, remove=True), "application/pdf", "ordenes.pdf"
+    else:
+        chunks, mimetype, nombre = pdf_cache.stream_zip(rendered), "application/zip", "ordenes.zip"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={nombre}"},
+    )
 
 
 @bp.route("/create", methods=["POST"]) 
@@ -32,10 +110,9 @@ def index():
 def create():
     form = OrdenForm()
     if form.validate_on_submit():
-        vendedor_id = form.vendedor_id.data or 0
         orden = Orden(
             cliente_id=form.cliente_id.data,
-            vendedor_id=(vendedor_id if vendedor_id != 0 else None),
+            vendedor_id=form.vendedor_id.data,
             usuario_id=form.usuario_id.data,
             fecha=form.fecha.data,
             precio_neto=Decimal(form.precio_neto.data or 0),
@@ -57,14 +134,15 @@ def edit(orden_id: int):
     orden = Orden.query.get_or_404(orden_id)
     form = OrdenForm()
     if form.validate_on_submit():
-        vendedor_id = form.vendedor_id.data or 0
         orden.cliente_id = form.cliente_id.data
-        orden.vendedor_id = (vendedor_id if vendedor_id != 0 else None)
+        orden.vendedor_id = form.vendedor_id.data
         orden.usuario_id = form.usuario_id.data
         orden.fecha = form.fecha.data
-        orden.precio_neto = Decimal(form.precio_neto.data or 0)
-        orden.iva = Decimal(form.iva.data or 0)
-        orden.precio_total = Decimal(form.precio_total.data or 0)
+        # with line items the totals are derived from them (see utils.totales); typed ones only apply without
+        if not db.session.query(Descripcion.query.filter_by(orden_id=orden.id).exists()).scalar():
+            orden.precio_neto = Decimal(form.precio_neto.data or 0)
+            orden.iva = Decimal(form.iva.data or 0)
+            orden.precio_total = Decimal(form.precio_total.data or 0)
         orden.observaciones = form.observaciones.data
         db.session.commit()
         flash("Orden actualizada", "success")
@@ -73,6 +151,71 @@ def edit(orden_id: int):
     return redirect(url_for("ordenes.index"))
 
 
+def _filas_descripciones() -> tuple[list[dict], dict]:
+    """Line items posted as JSON {"descripciones": [...]} or as repeated form fields, validated."""
+    if request.is_json:
+        crudas = (request.get_json(silent=True) or {}).get("descripciones")
+        if not isinstance(crudas, list) or not all(isinstance(f, dict) for f in crudas):
+            return [], {"descripciones": ["Se espera una lista de objetos"]}
+    else:
+        columnas = {c: request.form.getlist(c) for c in ("id", "texto", "cantidad", "precio_unitario")}
+        crudas = [dict(zip(columnas, valores)) for valores in zip(*columnas.values())]
+    if len(crudas) > current_app.config["DESCRIPCIONES_MAX"]:
+        return [], {"descripciones": [f"Máximo {current_app.config['DESCRIPCIONES_MAX']} líneas"]}
+    filas, errores = [], {}
+    for n, cruda in enumerate(crudas, start=1):
+        form = DescripcionForm(formdata=MultiDict({k: str(v) for k, v in cruda.items() if v is not None}),
+                               meta={"csrf": False})
+        if not form.validate():
+            errores[n] = form.errors
+            continue
+        try:
+            linea_id = int(cruda["id"]) if cruda.get("id") not in (None, "") else None
+        except (TypeError, ValueError):
+            errores[n] = {"id": ["Id inválido"]}
+            continue
+        filas.append({"id": linea_id, "texto": form.texto.data, "cantidad": form.cantidad.data,
+                      "precio_unitario": form.precio_unitario.data or Decimal(0)})
+    return filas, errores
+
+
+@bp.route("/<int:orden_id>/descripciones", methods=["GET", "POST"])
+@login_required
+def descripciones(orden_id: int):
+    # The whole set of line items is posted at once and applied with bulk statements
+    orden = Orden.query.get_or_404(orden_id)
+    if request.method == "POST":
+        filas, errores = _filas_descripciones()
+        if not errores:
+            total_anterior = orden.precio_total
+            try:
+                cambios = totales.apply(orden, filas)
+            except ValueError as exc:
+                errores = {"descripciones": [str(exc)]}
+        if errores:
+            db.session.rollback()
+            if request.is_json:
+                return jsonify(errores=errores), 400
+            flash("Errores en las descripciones", "danger")
+            return redirect(url_for("ordenes.descripciones", orden_id=orden_id))
+        audit.record(
+            db.session, "editar", "ordenes", orden.id,
+            f"descripciones: {cambios['nuevas']} nuevas, {cambios['editadas']} editadas, "
+            f"{cambios['eliminadas']} eliminadas; precio_total: {total_anterior} → {orden.precio_total}",
+        )
+        db.session.commit()
+        if request.is_json:
+            return jsonify(
+                orden_id=orden.id, precio_neto=str(orden.precio_neto), iva=str(orden.iva),
+                precio_total=str(orden.precio_total), saldo=str(orden.saldo), estado_pago=orden.estado_pago,
+                **cambios,
+            )
+        flash("Descripciones actualizadas", "success")
+        return redirect(url_for("ordenes.descripciones", orden_id=orden_id))
+    lineas = Descripcion.query.filter_by(orden_id=orden_id).order_by(Descripcion.id).all()
+    return render_template("ordenes/descripciones.html", orden=orden, lineas=lineas)
+
+
 @bp.route("/<int:orden_id>/delete", methods=["POST"]) 
 @login_required
 def delete(orden_id: int):
@@ -86,22 +229,39 @@ def delete(orden_id: int):
 @bp.route("/<int:orden_id>/print")
 @login_required
 def print_view(orden_id: int):
-    orden = Orden.query.get_or_404(orden_id)
-    return render_template("ordenes/print.html", orden=orden)
+    orden = orden_detail(orden_id)
+    return render_template("ordenes/print.html", orden=orden, empresa=settings.empresa())
 
 
 @bp.route("/<int:orden_id>/pdf")
 @login_required
 def pdf(orden_id: int):
-    # Simple PDF stub using browser print; real PDF via xhtml2pdf could be added later
-    orden = Orden.query.get_or_404(orden_id)
-    html = render_template("ordenes/print.html", orden=orden)
+    # Served from the disk cache; misses render in the PDF process pool while the browser retries
+    orden = orden_detail(orden_id)
     try:
-        from xhtml2pdf import pisa
-        result = BytesIO()
-        pisa.CreatePDF(src=html, dest=result)  # noqa: S602
-        result.seek(0)
-        return send_file(result, as_attachment=True, download_name=f"orden_{orden.id}.pdf", mimetype="application/pdf")
+        path, future = pdf_cache.cached_or_submit(orden)
+        if future is not None:
+            path = future.result(timeout=current_app.config["PDF_RENDER_WAIT"])
+    except FuturesTimeout:
+        response = make_response(render_template("ordenes/pdf_pending.html", orden=orden), 202)
+        response.headers["Retry-After"] = "1"
+        response.headers["Refresh"] = "1"
+        return response
     except Exception:
         flash("No se pudo generar PDF, use la vista imprimible.", "warning")
-        return redirect(url_for("ordenes.print_view", orden_id=orden.id))
\ No newline at end of file
+        return redirect(url_for("ordenes.print_view", orden_id=orden.id))
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=f"orden_{orden.id}.pdf",
+        mimetype="application/pdf",
+        etag=os.path.basename(path),
+        conditional=True,
+        max_age=0,
+    )
+
+
+@bp.route("/export.<any(csv, xlsx):formato>")
+@login_required
+def export(formato: str):
+    return export_util.response("ordenes", formato, request.args)
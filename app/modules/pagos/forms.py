@@ -1,10 +1,13 @@
 from flask_wtf import FlaskForm
-from wtforms import SelectField, DecimalField, DateField, StringField, SubmitField
+from wtforms import DecimalField, DateField, StringField, SubmitField
 from wtforms.validators import DataRequired, Optional
 
+from ...models import Orden
+from ...utils.lookup import LookupField
+
 
 class PagoForm(FlaskForm):
-    orden_id = SelectField("Orden", coerce=int, validators=[DataRequired()])
+    orden_id = LookupField("Orden", model=Orden, validators=[DataRequired()])
     monto = DecimalField("Monto", places=2, validators=[DataRequired()])
     fecha = DateField("Fecha", validators=[DataRequired()])
     metodo = StringField("Método", validators=[Optional()])
@@ -3,7 +3,10 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 
 from ...extensions import db
-from ...models import Pago, Orden
+from ...models import Pago
+from ...queries import pagos_list
+from ...utils import export as export_util
+from ...utils.pagination import keyset_paginate, parse_per_page
 from .forms import PagoForm
 
 bp = Blueprint("pagos", __name__, url_prefix="/pagos", template_folder="templates")
@@ -12,11 +15,8 @@ bp = Blueprint("pagos", __name__, url_prefix="/pagos", template_folder="template
 @bp.route("/")
 @login_required
 def index():
-    pagos = Pago.query.order_by(Pago.created_at.desc()).all()
-    ordenes = Orden.query.order_by(Orden.created_at.desc()).all()
-    form = PagoForm()
-    form.orden_id.choices = [(o.id, f"#{o.id} - {o.cliente.nombre}") for o in ordenes]
-    return render_template("pagos/index.html", pagos=pagos, form=form)
+    page = keyset_paginate(pagos_list(), Pago, request.args.get("cursor"), parse_per_page(request.args))
+    return render_template("pagos/index.html", pagos=page.items, page=page, form=PagoForm())
 
 
 @bp.route("/create", methods=["POST"]) 
@@ -46,4 +46,10 @@ def delete(pago_id: int):
     db.session.delete(pago)
     db.session.commit()
     flash("Pago eliminado", "success")
-    return redirect(url_for("pagos.index"))
\ No newline at end of file
+    return redirect(url_for("pagos.index"))
+
+
+@bp.route("/export.<any(csv, xlsx):formato>")
+@login_required
+def export(formato: str):
+    return export_util.response("pagos", formato, request.args)
@@ -0,0 +1 @@
+# reportes module
\ No newline at end of file
@@ -0,0 +1,45 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from ...extensions import db
+from ...utils import export as export_util
+from ...utils import reportes
+
+bp = Blueprint("reportes", __name__, url_prefix="/reportes", template_folder="templates")
+
+
+def _tipo() -> str:
+    tipo = request.args.get("tipo")
+    return tipo if tipo in reportes.TIPOS else "vendedores"
+
+
+@bp.route("/")
+@login_required
+def index():
+    if current_user.rol != "admin":
+        flash("Solo admin", "warning")
+        return redirect(url_for("dashboard.index"))
+    tipo = _tipo()
+    desde, hasta = reportes.rango(request.args)
+    filas = db.session.execute(reportes.query(tipo, desde, hasta)).all()
+    totales = {
+        campo: sum(getattr(f, campo) or 0 for f in filas) for campo in ("ordenes", "ventas", "cobrado", "comision")
+    }
+    return render_template(
+        "reportes/index.html",
+        tipo=tipo,
+        desde=desde,
+        hasta=hasta,
+        filas=filas,
+        totales=totales,
+        actualizado=reportes.actualizado(),
+    )
+
+
+@bp.route("/export.<any(csv, xlsx):formato>")
+@login_required
+def export(formato: str):
+    if current_user.rol != "admin":
+        flash("Solo admin", "warning")
+        return redirect(url_for("dashboard.index"))
+    return export_util.response(f"reporte_{_tipo()}", formato, request.args)
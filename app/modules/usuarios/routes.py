@@ -3,6 +3,8 @@ from flask_login import login_user, logout_user, login_required, current_user
 
 from ...extensions import db
 from ...models import Usuario
+from ...queries import usuarios_list
+from ...utils import fragments
 from .forms import LoginForm, UsuarioForm
 
 bp = Blueprint("usuarios", __name__, url_prefix="/usuarios", template_folder="templates")
@@ -37,9 +39,10 @@ def index():
     if current_user.rol != "admin":
         flash("Solo admin", "warning")
         return redirect(url_for("dashboard.index"))
-    usuarios = Usuario.query.order_by(Usuario.created_at.desc()).all()
-    form = UsuarioForm()
-    return render_template("usuarios/index.html", usuarios=usuarios, form=form)
+    return fragments.render(
+        "usuarios/index.html", "usuarios/_lista.html", ("usuarios",),
+        lambda: dict(usuarios=usuarios_list().all(), form=UsuarioForm()),
+    )
 
 
 @bp.route("/create", methods=["POST"]) 
@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, request, redirect, url_for, flash
 from flask_login import login_required
 
 from ...extensions import db
 from ...models import Vendedor, Categoria
+from ...queries import vendedores_list
+from ...utils import fragments
 from .forms import VendedorForm
 
 bp = Blueprint("vendedores", __name__, url_prefix="/vendedores", template_folder="templates")
@@ -11,11 +13,13 @@ bp = Blueprint("vendedores", __name__, url_prefix="/vendedores", template_folder
 @bp.route("/")
 @login_required
 def index():
-    vendedores = Vendedor.query.order_by(Vendedor.created_at.desc()).all()
-    categorias = Categoria.query.order_by(Categoria.nombre).all()
-    form = VendedorForm()
-    form.categoria_id.choices = [(0, "-")] + [(c.id, c.nombre) for c in categorias]
-    return render_template("vendedores/index.html", vendedores=vendedores, form=form)
+    def contexto():
+        categorias = Categoria.query.order_by(Categoria.nombre).all()
+        form = VendedorForm()
+        form.categoria_id.choices = [(0, "-")] + [(c.id, c.nombre) for c in categorias]
+        return dict(vendedores=vendedores_list().all(), form=form)
+
+    return fragments.render("vendedores/index.html", "vendedores/_lista.html", ("vendedores", "categorias"), contexto)
 
 
 @bp.route("/create", methods=["POST"]) 
@@ -46,6 +50,8 @@ def create():
 def edit(vendedor_id: int):
     vendedor = Vendedor.query.get_or_404(vendedor_id)
     form = VendedorForm()
+    categorias = Categoria.query.order_by(Categoria.nombre).all()
+    form.categoria_id.choices = [(0, "-")] + [(c.id, c.nombre) for c in categorias]
     if form.validate_on_submit():
         cat_id = form.categoria_id.data or 0
         vendedor.nombre = form.nombre.data
@@ -0,0 +1,130 @@
+"""Connection pool sizing, health checks and statement timeouts for PostgreSQL.
+
+engine_options() builds SQLALCHEMY_ENGINE_OPTIONS from the config:
+
+* pool_size and max_overflow follow the gunicorn thread count
+  (WEB_THREADS), so WEB_WORKERS × (pool_size + max_overflow) is the most
+  connections the web service can open;
+* connections are pre-pinged on checkout, recycled after DB_POOL_RECYCLE
+  seconds, and give up after DB_POOL_TIMEOUT seconds of waiting;
+* DB_STATEMENT_TIMEOUT_MS is set at connect time through libpq options.
+  Endpoints or blueprints listed in DB_STATEMENT_TIMEOUTS get their own value
+  with SET LOCAL at the start of each transaction;
+* with DB_PGBOUNCER the pool is disabled (NullPool: PgBouncer does the
+  pooling) and no startup options are sent, since transaction-mode PgBouncer
+  rejects them. The default timeout then belongs on the database role
+  (ALTER ROLE ... SET statement_timeout); the per-endpoint SET LOCAL still works.
+
+Outside requests (CLI commands, the notification worker) each transaction
+uses DB_BACKGROUND_STATEMENT_TIMEOUT_MS instead, no limit by default.
+Migrations run on a plain engine connection, outside db.session, so
+migrations/env.py turns the timeout off for them.
+
+Checkout waits feed the printshop_db_pool_* metrics (see app.instrumentation).
+Other databases (SQLite in development) keep Flask-SQLAlchemy's defaults.
+"""
+from __future__ import annotations
+import time
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+
+from .extensions import db
+from .instrumentation import registry
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _TimedCheckout:
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            registry.inc("printshop_db_pool_timeouts_total")
+            raise
+        finally:
+            registry.histogram("printshop_db_pool_wait_seconds", (), time.perf_counter() - started, WAIT_BUCKETS)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    """With PgBouncer every checkout is a connect; its time is still the wait."""
+
+
+def pool_sizes(config) -> tuple[int, int]:
+    threads = max(1, config["WEB_THREADS"])
+    pool_size = config["DB_POOL_SIZE"] or threads + 1  # one spare for work outside the request thread
+    max_overflow = config["DB_MAX_OVERFLOW"] if config["DB_MAX_OVERFLOW"] is not None else threads
+    return pool_size, max_overflow
+
+
+def engine_options(config) -> dict:
+    if not config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        return {}
+    connect_args = {"connect_timeout": config["DB_CONNECT_TIMEOUT"], "application_name": "printshop"}
+    if config["DB_PGBOUNCER"]:
+        return {"poolclass": TimedNullPool, "connect_args": connect_args}
+    if config["DB_STATEMENT_TIMEOUT_MS"]:
+        connect_args["options"] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+    pool_size, max_overflow = pool_sizes(config)
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        "connect_args": connect_args,
+    }
+
+
+def _statement_timeout(endpoint: str | None, blueprint: str | None) -> int | None:
+    """The DB_STATEMENT_TIMEOUTS override for this request, if it needs one."""
+    cfg = current_app.config
+    overrides = cfg["DB_STATEMENT_TIMEOUTS"]
+    ms = overrides.get(endpoint, overrides.get(blueprint))
+    if ms is None or (ms == cfg["DB_STATEMENT_TIMEOUT_MS"] and not cfg["DB_PGBOUNCER"]):
+        return None
+    return ms
+
+
+@event.listens_for(db.session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    if connection.dialect.name != "postgresql":
+        return
+    if has_request_context():
+        ms = g.get("statement_timeout_ms")
+    else:
+        # CLI commands and the notification worker: imports, exports and reconciles run long
+        cfg = current_app.config
+        ms = cfg["DB_BACKGROUND_STATEMENT_TIMEOUT_MS"]
+        if ms == cfg["DB_STATEMENT_TIMEOUT_MS"] and not cfg["DB_PGBOUNCER"]:
+            ms = None
+    if ms is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(ms)}")
+
+
+def init_pool(app: Flask) -> None:
+    """Per-endpoint statement timeouts and pool gauges; engine options are set before db.init_app."""
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        return
+    pool_size, max_overflow = pool_sizes(app.config)
+
+    @app.before_request
+    def choose_statement_timeout():
+        g.statement_timeout_ms = _statement_timeout(request.endpoint, request.blueprint)
+
+    def collect(reg):
+        with app.app_context():
+            for engine in db.engines.values():
+                if isinstance(engine.pool, QueuePool):
+                    reg.set("printshop_db_pool_checked_out", (), engine.pool.checkedout())
+                    reg.set("printshop_db_pool_size", (), pool_size + max_overflow)
+
+    registry.collectors.append(collect)
@@ -0,0 +1,171 @@
+"""Query builders for list pages.
+
+Every blueprint fetches its list through one of these functions so the loader
+plan lives next to the query: relationships the templates walk are loaded up
+front with joinedload (many-to-one) or selectinload (collections) instead of
+one lazy SELECT per row.
+"""
+from __future__ import annotations
+from datetime import date
+
+from flask import Flask, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload
+
+from .extensions import db
+from .models import Cliente, Log, Orden, Pago, Usuario, Vendedor
+
+ESTADOS_TRABAJO = ["pendiente", "en_proceso", "listo"]
+ESTADOS_DESPACHO = ["pendiente", "despachado"]
+ESTADOS_PAGO = ["pendiente", "abonado", "pagado"]
+ENTIDADES_LOG = ["clientes", "vendedores", "ordenes", "pagos", "usuarios"]
+ACCIONES_LOG = ["crear", "editar", "eliminar"]
+
+
+def parse_date(value: str | None) -> date | None:
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_int(value: str | None) -> int | None:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_orden_filters(args) -> dict:
+    """Extract the order list filters from a request's query string, dropping invalid values."""
+    filtros = {
+        "estado_trabajo": args.get("estado_trabajo") if args.get("estado_trabajo") in ESTADOS_TRABAJO else None,
+        "estado_despacho": args.get("estado_despacho") if args.get("estado_despacho") in ESTADOS_DESPACHO else None,
+        "estado_pago": args.get("estado_pago") if args.get("estado_pago") in ESTADOS_PAGO else None,
+        "cliente_id": _parse_int(args.get("cliente_id")),
+        "vendedor_id": _parse_int(args.get("vendedor_id")),
+        "desde": parse_date(args.get("desde")),
+        "hasta": parse_date(args.get("hasta")),
+    }
+    return {k: v for k, v in filtros.items() if v is not None}
+
+
+def apply_orden_filters(query, filtros: dict):
+    for campo in ("estado_trabajo", "estado_despacho", "estado_pago", "cliente_id", "vendedor_id"):
+        if campo in filtros:
+            query = query.filter(getattr(Orden, campo) == filtros[campo])
+    if "desde" in filtros:
+        query = query.filter(Orden.fecha >= filtros["desde"])
+    if "hasta" in filtros:
+        query = query.filter(Orden.fecha <= filtros["hasta"])
+    return query
+
+
+def ordenes_list(filtros: dict | None = None):
+    query = Orden.query.options(
+        joinedload(Orden.cliente), joinedload(Orden.vendedor), joinedload(Orden.usuario),
+        selectinload(Orden.attachments),
+    )
+    return apply_orden_filters(query, filtros or {})
+
+
+def orden_detail(orden_id: int) -> Orden:
+    return (
+        Orden.query.options(
+            joinedload(Orden.cliente),
+            joinedload(Orden.vendedor),
+            joinedload(Orden.usuario),
+            selectinload(Orden.descripciones),
+        )
+        .filter(Orden.id == orden_id)
+        .first_or_404()
+    )
+
+
+def calendario_eventos(desde: date, hasta: date, filtros: dict) -> list[dict]:
+    """Compact rows for the calendar feed; orders in [desde, hasta] by Orden.fecha."""
+    query = (
+        db.session.query(
+            Orden.id, Orden.fecha, Orden.estado_trabajo, Orden.estado_despacho, Cliente.nombre.label("cliente"),
+        )
+        .join(Cliente, Orden.cliente_id == Cliente.id)
+        .filter(Orden.fecha >= desde, Orden.fecha <= hasta)
+    )
+    for campo in ("estado_trabajo", "estado_despacho"):
+        if campo in filtros:
+            query = query.filter(getattr(Orden, campo) == filtros[campo])
+    return [
+        {**row._asdict(), "fecha": row.fecha.isoformat()}
+        for row in query.order_by(Orden.fecha, Orden.id)
+    ]
+
+
+def pagos_list():
+    # ordered by keyset_paginate
+    return Pago.query.options(joinedload(Pago.usuario_registra))
+
+
+def clientes_list():
+    # searches go through app.utils.search
+    return Cliente.query
+
+
+def vendedores_list():
+    return Vendedor.query.options(joinedload(Vendedor.categoria)).order_by(Vendedor.created_at.desc())
+
+
+def usuarios_list():
+    return Usuario.query.order_by(Usuario.created_at.desc())
+
+
+def parse_log_filters(args) -> dict:
+    filtros = {
+        "entidad": args.get("entidad") if args.get("entidad") in ENTIDADES_LOG else None,
+        "entidad_id": _parse_int(args.get("entidad_id")),
+        "accion": args.get("accion") if args.get("accion") in ACCIONES_LOG else None,
+        "usuario_id": _parse_int(args.get("usuario_id")),
+    }
+    return {k: v for k, v in filtros.items() if v is not None}
+
+
+def logs_list(filtros: dict | None = None):
+    query = Log.query.options(joinedload(Log.usuario))
+    for campo, valor in (filtros or {}).items():
+        query = query.filter(getattr(Log, campo) == valor)
+    return query
+
+
+class TooManyQueries(AssertionError):
+    pass
+
+
+def init_query_guard(app: Flask) -> None:
+    """Fail any request that issues more than SQL_QUERY_LIMIT statements.
+
+    Meant for tests and local runs (TestingConfig turns it on) so an N+1
+    regression surfaces as an error rather than a slow page. The count is
+    reset in before_request: tests and ``flask bench`` run many requests
+    inside one app context, so ``g`` alone would carry it across them.
+    """
+    limit = app.config.get("SQL_QUERY_LIMIT") or 0
+    if limit <= 0:
+        return
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.sql_statements = g.get("sql_statements", 0) + 1
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", count_statement)
+
+    @app.before_request
+    def reset_query_count():
+        g.sql_statements = 0
+
+    @app.after_request
+    def check_query_count(response):
+        issued = g.get("sql_statements", 0)
+        if issued > limit:
+            raise TooManyQueries(f"{issued} SQL statements issued (limit {limit})")
+        return response
@@ -0,0 +1,30 @@
+// Typeahead for <input data-lookup>: fills the shared <datalist> from /lookup/<entidad>
+// and copies the picked option's id into the hidden input named by data-lookup-target.
+(function () {
+  const timers = new WeakMap();
+
+  document.addEventListener('input', function (event) {
+    const input = event.target;
+    if (!input.matches || !input.matches('input[data-lookup]')) return;
+    const hidden = input.form.querySelector('input[type=hidden][name="' + input.dataset.lookupTarget + '"]');
+    const list = input.list;
+    const picked = Array.from(list.options).find(function (o) { return o.value === input.value; });
+    hidden.value = picked ? picked.dataset.id : '';
+    if (picked) return;
+
+    clearTimeout(timers.get(input));
+    timers.set(input, setTimeout(function () {
+      fetch(input.dataset.lookup + '?q=' + encodeURIComponent(input.value))
+        .then(function (r) { return r.json(); })
+        .then(function (items) {
+          list.replaceChildren(...items.map(function (item) {
+            const option = document.createElement('option');
+            option.value = item.label;
+            option.dataset.id = item.id;
+            return option;
+          }));
+        })
+        .catch(function () {});
+    }, 150));
+  });
+})();
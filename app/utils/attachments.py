@@ -0,0 +1,220 @@
+"""Content-addressed storage for order attachments.
+
+Uploads are copied from the request stream to a temp file in
+UPLOAD_CHUNK_SIZE pieces while being hashed. The file is then renamed to
+blobs/<sha[:2]>/<sha>, or dropped if that blob already exists. Every
+Attachment row with the same artwork points at the same file, and a blob is
+removed once the commit that deletes its last row (directly or through its
+orden) goes through. Placing a blob and removing an orphan both hold a lock on
+its sha, so an upload never ends up pointing at a file a concurrent delete
+just removed. Image previews are rendered in the PDF
+process pool (see app.utils.pdf) into thumbs/<sha>.jpg, never inside the
+request.
+"""
+from __future__ import annotations
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import event, select, text
+
+from ..extensions import db
+from ..models import Attachment
+from .pdf import executor
+
+logger = logging.getLogger(__name__)
+
+_thumbs_inflight: dict[str, Future] = {}
+_lock = threading.Lock()
+_blobs_lock = threading.Lock()  # stands in for the advisory lock off PostgreSQL
+
+
+def render_thumbnail(src: str, dest: str, size: int) -> str:
+    """Runs in the pool: JPEG preview no larger than size×size."""
+    from PIL import Image
+
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    with Image.open(src) as im:
+        im.draft("RGB", (size, size))  # let JPEG decode at reduced scale
+        im.thumbnail((size, size))
+        im.convert("RGB").save(tmp, "JPEG", quality=80)
+    os.replace(tmp, dest)
+    return dest
+
+
+def _root() -> str:
+    return current_app.config["UPLOAD_FOLDER"]
+
+
+def blob_relpath(sha: str) -> str:
+    return os.path.join("blobs", sha[:2], sha)
+
+
+def abspath(att: Attachment) -> str:
+    return os.path.join(_root(), att.path)
+
+
+def thumb_path(sha: str) -> str:
+    return os.path.join(_root(), "thumbs", f"{sha}.jpg")
+
+
+@contextmanager
+def _blob_lock(sha: str) -> Iterator[None]:
+    """Serialize placing and removing one blob across processes (PostgreSQL) or threads."""
+    if db.engine.dialect.name != "postgresql":
+        with _blobs_lock:
+            yield
+        return
+    # A connection of its own, so the lock survives the session's commits
+    with db.engine.connect() as conn:
+        key = int(sha[:15], 16)
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+            conn.commit()
+
+
+def _spool(stream: BinaryIO) -> tuple[str, str, int]:
+    """Copy `stream` to a temp file in UPLOAD_CHUNK_SIZE pieces; return (tmp path, sha256, size)."""
+    chunk_size = current_app.config["UPLOAD_CHUNK_SIZE"]
+    tmp_dir = os.path.join(_root(), "blobs", "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as fh:
+            while chunk := stream.read(chunk_size):
+                digest.update(chunk)
+                fh.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return tmp, digest.hexdigest(), size
+
+
+def _place(tmp: str, sha: str) -> None:
+    """Move a spooled file to its blob path, or drop it if the blob is already there."""
+    dest = os.path.join(_root(), blob_relpath(sha))
+    if os.path.exists(dest):
+        os.remove(tmp)
+    else:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp, dest)
+
+
+def create(orden_id: int, stream: BinaryIO, filename: str, content_type: Optional[str],
+           uploaded_by_id: Optional[int]) -> Attachment:
+    tmp, sha, size = _spool(stream)
+    filename = os.path.basename(filename or "archivo")[:255]
+    if not content_type or content_type == "application/octet-stream":
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    att = Attachment(
+        orden_id=orden_id, filename=filename, path=blob_relpath(sha), sha256=sha,
+        size=size, content_type=content_type, uploaded_by_id=uploaded_by_id,
+    )
+    # The row is committed before the lock is released, so a concurrent purge sees it
+    with _blob_lock(sha):
+        try:
+            _place(tmp, sha)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        db.session.add(att)
+        db.session.commit()
+    request_thumbnail(att)
+    return att
+
+
+def delete(att: Attachment) -> None:
+    # the blob goes with the commit, see _purge_deleted
+    db.session.delete(att)
+    db.session.commit()
+
+
+def purge(shas: Iterable[str]) -> None:
+    """Remove the blob and thumbnail of every sha no Attachment row points at any more."""
+    for sha in shas:
+        with _blob_lock(sha):
+            with db.engine.connect() as conn:
+                in_use = conn.execute(select(Attachment.id).where(Attachment.sha256 == sha).limit(1)).first()
+            if in_use is not None:
+                continue
+            for stale in (os.path.join(_root(), blob_relpath(sha)), thumb_path(sha)):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+
+@event.listens_for(db.session, "before_flush")
+def _collect_deleted(session, flush_context, instances):
+    # Covers rows deleted through the Orden cascade too
+    shas = {obj.sha256 for obj in session.deleted if isinstance(obj, Attachment) and obj.sha256}
+    if shas:
+        session.info.setdefault("blobs", set()).update(shas)
+
+
+@event.listens_for(db.session, "after_commit")
+def _purge_deleted(session):
+    shas = session.info.pop("blobs", None)
+    if shas:
+        try:
+            purge(shas)
+        except Exception:  # the rows are gone either way; a leftover blob only costs disk
+            logger.exception("could not remove blobs %s", sorted(shas))
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_deleted(session, previous_transaction):
+    session.info.pop("blobs", None)
+
+
+def has_preview(att: Attachment) -> bool:
+    return bool(att.sha256) and (att.content_type or "").startswith("image/")
+
+
+def request_thumbnail(att: Attachment) -> Optional[str]:
+    """Path of the ready thumbnail, or None after making sure one is being rendered."""
+    if not has_preview(att):
+        return None
+    dest = thumb_path(att.sha256)
+    if os.path.exists(dest):
+        return dest
+    with _lock:
+        future = _thumbs_inflight.get(att.sha256)
+        if future is not None and not (future.done() and future.exception() is None):
+            return None
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        future = executor().submit(render_thumbnail, abspath(att), dest, current_app.config["THUMBNAIL_SIZE"])
+        _thumbs_inflight[att.sha256] = future
+    future.add_done_callback(lambda f, sha=att.sha256: _thumb_done(sha, f))
+    return None
+
+
+def thumbnail_failed(att: Attachment) -> bool:
+    """True once this file's thumbnail render has failed; it is not retried."""
+    with _lock:
+        future = _thumbs_inflight.get(att.sha256)
+    return future is not None and future.done() and future.exception() is not None
+
+
+def _thumb_done(sha: str, future: Future) -> None:
+    if future.exception() is None:
+        with _lock:
+            _thumbs_inflight.pop(sha, None)
+    else:
+        # keep the failed future so unreadable images are not resubmitted on every page view
+        logger.warning("thumbnail for %s failed: %s", sha, future.exception())
@@ -0,0 +1,156 @@
+"""Latency, query-count and memory benchmark of the main pages.
+
+Every scenario is requested through the Flask test client, logged in as the
+first admin, against whatever database the app is configured with. Run
+`flask seed-synthetic` on a throwaway database first. Scenarios that take an
+id or a search term draw a new one on every request from a seeded RNG, so
+each run sees the same sequence. The peak memory is measured with
+tracemalloc on one extra request, kept out of the timings because
+tracemalloc slows everything down.
+"""
+from __future__ import annotations
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+from flask import Flask
+from sqlalchemy import event, func, select
+
+from ..extensions import db
+from ..models import Cliente, Orden, Usuario
+
+Scenario = Callable[[random.Random, dict], str]
+
+
+def _mes(rng: random.Random, ctx: dict) -> str:
+    inicio = ctx["hasta"] - timedelta(days=rng.randint(0, 365))
+    inicio = inicio.replace(day=1)
+    return f"desde={inicio}&hasta={inicio + timedelta(days=41)}"
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "dashboard.index": lambda rng, ctx: "/",
+    "ordenes.index": lambda rng, ctx: "/ordenes/",
+    "ordenes.index?estado_pago": lambda rng, ctx: "/ordenes/?estado_pago=abonado",
+    "ordenes.index?cliente": lambda rng, ctx: f"/ordenes/?cliente_id={rng.randint(1, ctx['max_cliente'])}",
+    "pagos.index": lambda rng, ctx: "/pagos/",
+    "clientes.index": lambda rng, ctx: "/clientes/",
+    "clientes.search": lambda rng, ctx: f"/clientes/?q={rng.choice(ctx['terminos'])}",
+    "clientes.autocomplete": lambda rng, ctx: f"/clientes/autocomplete?q={rng.choice(ctx['terminos'])[:3]}",
+    "lookup.ordenes": lambda rng, ctx: "/lookup/ordenes?q=",
+    "calendario.eventos": lambda rng, ctx: f"/calendario/eventos?{_mes(rng, ctx)}",
+    "ordenes.print_view": lambda rng, ctx: f"/ordenes/{rng.randint(1, ctx['max_orden'])}/print",
+    "ordenes.pdf": lambda rng, ctx: f"/ordenes/{rng.randint(1, ctx['max_orden'])}/pdf",
+    "ordenes.export": lambda rng, ctx: f"/ordenes/export.csv?{_mes(rng, ctx)}",
+}
+
+
+def _percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def run(app: Flask, repeticiones: int = 20, solo: Optional[list[str]] = None, seed: int = 1,
+        echo: Callable[[str], None] = print) -> list[dict]:
+    """Benchmark every scenario (or those named in `solo`); one result dict per scenario."""
+    rng = random.Random(seed)
+    with app.app_context():
+        admin = db.session.scalars(select(Usuario).filter_by(rol="admin").order_by(Usuario.id)).first()
+        if admin is None:
+            raise RuntimeError("no admin user; run flask ensure-admin first")
+        ctx = {
+            "hasta": db.session.query(func.max(Orden.fecha)).scalar() or date.today(),
+            "max_orden": db.session.query(func.max(Orden.id)).scalar() or 1,
+            "max_cliente": db.session.query(func.max(Cliente.id)).scalar() or 1,
+            "terminos": [n.split()[0] for n in db.session.scalars(select(Cliente.nombre).limit(50))] or ["a"],
+        }
+        admin_id = admin.id
+        engines = list(db.engines.values())
+        db.session.remove()
+
+    # a PDF that is still rendering would otherwise come back as a 202 placeholder
+    app.config["PDF_RENDER_WAIT"] = max(app.config["PDF_RENDER_WAIT"], 60)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(admin_id)
+        session["_fresh"] = True
+
+    counter = _QueryCounter()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter)
+    resultados = []
+    try:
+        for nombre, scenario in SCENARIOS.items():
+            if solo and nombre not in solo:
+                continue
+            client.get(scenario(rng, ctx)).close()  # warm-up: templates, caches, pool
+            tiempos, consultas, bytes_, estados = [], [], 0, set()
+            for _ in range(repeticiones):
+                url = scenario(rng, ctx)
+                counter.count = 0
+                started = time.perf_counter()
+                response = client.get(url)
+                bytes_ += len(response.get_data())  # streamed bodies are generated here
+                tiempos.append((time.perf_counter() - started) * 1000)
+                consultas.append(counter.count)
+                estados.add(response.status_code)
+                response.close()
+            tracemalloc.start()
+            client.get(scenario(rng, ctx)).get_data()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            resultado = {
+                "escenario": nombre,
+                "estados": sorted(estados),
+                "p50_ms": round(statistics.median(tiempos), 1),
+                "p95_ms": round(_percentile(tiempos, 95), 1),
+                "max_ms": round(max(tiempos), 1),
+                "consultas": max(consultas),
+                "peak_mb": round(peak / 2**20, 2),
+                "kb": round(bytes_ / repeticiones / 1024, 1),
+            }
+            resultados.append(resultado)
+            echo(format_row(resultado))
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter)
+    return resultados
+
+
+HEADER = f"{'scenario':<28} {'status':<9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'queries':>8} {'peak MB':>8} {'KB':>8}"
+
+
+def format_row(r: dict) -> str:
+    estados = ",".join(str(e) for e in r["estados"])
+    return (
+        f"{r['escenario']:<28} {estados:<9} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['max_ms']:>8} "
+        f"{r['consultas']:>8} {r['peak_mb']:>8} {r['kb']:>8}"
+    )
+
+
+def compare(actual: list[dict], base: list[dict]) -> list[str]:
+    """Lines comparing p95 and query counts against a previous --json run."""
+    previos = {r["escenario"]: r for r in base}
+    lineas = []
+    for r in actual:
+        b = previos.get(r["escenario"])
+        if b is None:
+            continue
+        delta = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b["p95_ms"] else 0.0
+        lineas.append(
+            f"{r['escenario']:<28} p95 {b['p95_ms']:>8} -> {r['p95_ms']:>8} ({delta:+.0f}%)  "
+            f"queries {b['consultas']} -> {r['consultas']}"
+        )
+    return lineas
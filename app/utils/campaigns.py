@@ -0,0 +1,177 @@
+"""Bulk email campaigns to the clients behind a filtered set of orders.
+
+Recipients are read with one projection query, one per cliente however many
+of its orders match, and bodies are rendered from a single compiled
+(sandboxed) template. A campaign needs at least one filter, so a bare call
+cannot mail every client. Messages always go to the notification outbox
+first. enqueue() leaves them to the worker. send() claims them itself and
+spreads them over a few pooled SMTP connections, and each outcome is
+committed as soon as that message is sent. A crash mid-campaign leaves
+only the unsent rows, which the worker picks up once the claim expires.
+"""
+from __future__ import annotations
+import queue
+import smtplib
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from jinja2.sandbox import SandboxedEnvironment
+from sqlalchemy import insert, update
+
+from ..extensions import db
+from ..models import Cliente, NotificationLog, Orden
+from ..queries import apply_orden_filters
+from . import settings
+from .notifications import compose_message
+from .smtp import SMTPPool
+
+_env = SandboxedEnvironment(autoescape=False)
+
+
+def recipients(filtros: dict) -> list[dict]:
+    """One row per cliente with an email among the filtered orders.
+
+    The row carries the cliente's most recent matching order as ``orden`` and
+    all of them, oldest first, as ``ordenes``.
+    """
+    if not filtros:
+        raise ValueError("a campaign needs at least one order filter")
+    query = (
+        db.session.query(
+            Orden.id, Orden.fecha, Orden.precio_total, Orden.saldo,
+            Orden.estado_trabajo, Orden.estado_despacho, Cliente.id.label("cliente_id"), Cliente.nombre, Cliente.correo,
+        )
+        .join(Cliente, Orden.cliente_id == Cliente.id)
+        .filter(Cliente.correo.isnot(None), Cliente.correo != "")
+        .order_by(Cliente.id, Orden.id)
+    )
+    por_cliente: dict[int, dict] = {}
+    for row in apply_orden_filters(query, filtros):
+        orden = row._asdict()
+        fila = por_cliente.setdefault(orden["cliente_id"], {"ordenes": []})
+        fila["ordenes"].append(orden)
+        fila["orden"] = orden
+    return list(por_cliente.values())
+
+
+def render(asunto: str, plantilla: str, filas: list[dict]) -> list[dict]:
+    """Compile subject and body once, then render one log row per recipient."""
+    asunto_tpl = _env.from_string(asunto)
+    cuerpo_tpl = _env.from_string(plantilla)
+    mensajes = []
+    for fila in filas:
+        orden = fila["orden"]
+        ctx = {"orden": orden, "ordenes": fila["ordenes"], "cliente": orden["nombre"]}
+        mensajes.append({
+            "orden_id": orden["id"],
+            "destinatario": orden["correo"],
+            "canal": "email",
+            "asunto": asunto_tpl.render(ctx),
+            "mensaje": cuerpo_tpl.render(ctx),
+        })
+    return mensajes
+
+
+def _insert(mensajes: list[dict], proximo_intento: datetime) -> list[int]:
+    """Bulk insert pending outbox rows; return their ids in the order given."""
+    ids = db.session.execute(
+        insert(NotificationLog).returning(NotificationLog.id, sort_by_parameter_order=True),
+        [{**m, "estado": "pendiente", "proximo_intento": proximo_intento} for m in mensajes],
+    ).scalars().all()
+    db.session.commit()
+    return ids
+
+
+def enqueue(asunto: str, plantilla: str, filtros: dict) -> int:
+    """Render a campaign into the outbox (one bulk insert) for the notification worker."""
+    mensajes = render(asunto, plantilla, recipients(filtros))
+    if mensajes:
+        _insert(mensajes, datetime.utcnow())
+    return len(mensajes)
+
+
+def _send_chunk(pool: SMTPPool, chunk: list[dict], from_addr: str, retry_at: datetime,
+                resultados: queue.Queue) -> None:
+    """Send `chunk` and report each outcome on `resultados` as (id, values); None when done."""
+    pending = deque(chunk)
+    try:
+        while pending:
+            try:
+                with pool.connection() as server:
+                    while pending:
+                        item = pending[0]
+                        started = time.perf_counter()
+                        try:
+                            msg = compose_message(item["destinatario"], item["asunto"], item["mensaje"], from_addr)
+                            server.send_message(msg)
+                            resultado = {"estado": "enviado", "enviado_at": datetime.utcnow(),
+                                         "latencia_ms": int((time.perf_counter() - started) * 1000)}
+                        except smtplib.SMTPRecipientsRefused as exc:
+                            resultado = {"estado": "error", "respuesta": str(exc)}
+                        except (smtplib.SMTPException, OSError):
+                            raise
+                        except Exception as exc:  # noqa: BLE001
+                            # bad stored data (e.g. a CR/LF in the address); retrying cannot help
+                            resultado = {"estado": "error", "respuesta": str(exc)}
+                        resultados.put((item["id"], resultado))
+                        pending.popleft()
+            except (smtplib.SMTPException, OSError) as exc:
+                # connection-level failure: leave this one to the outbox worker's retries
+                item = pending.popleft()
+                resultados.put((item["id"], {"estado": "pendiente", "respuesta": str(exc), "proximo_intento": retry_at}))
+    finally:
+        resultados.put(None)
+
+
+def send(asunto: str, plantilla: str, filtros: dict, connections: int | None = None) -> dict:
+    """Render and deliver a campaign now; return counts and throughput."""
+    cfg = current_app.config
+    connections = connections or cfg["CAMPAIGN_CONNECTIONS"]
+    mensajes = render(asunto, plantilla, recipients(filtros))
+    estados = {"enviado": 0, "pendiente": 0, "error": 0}
+    started = time.perf_counter()
+    if mensajes:
+        # Claimed like a worker batch (see notifications.claim_batch) until each outcome is committed
+        ahora = datetime.utcnow()
+        ids = _insert(mensajes, ahora + timedelta(seconds=cfg["NOTIFY_CLAIM_SECONDS"]))
+        for m, log_id in zip(mensajes, ids):
+            m["id"] = log_id
+        smtp = settings.smtp()
+        pool = SMTPPool.from_config(smtp, size=connections)
+        retry_at = ahora + timedelta(seconds=cfg["NOTIFY_RETRY_BASE_SECONDS"])
+        resultados: queue.Queue = queue.Queue()
+        chunks = [chunk for chunk in (mensajes[i::connections] for i in range(connections)) if chunk]
+        workers = [
+            threading.Thread(target=_send_chunk, args=(pool, chunk, smtp["SMTP_FROM"], retry_at, resultados))
+            for chunk in chunks
+        ]
+        for worker in workers:
+            worker.start()
+        activos = len(workers)
+        while activos:
+            resultado = resultados.get()
+            if resultado is None:
+                activos -= 1
+                continue
+            log_id, valores = resultado
+            db.session.execute(
+                update(NotificationLog).where(NotificationLog.id == log_id).values(intentos=1, **valores)
+            )
+            db.session.commit()
+            estados[valores["estado"]] += 1
+        for worker in workers:
+            worker.join()
+        pool.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "total": len(mensajes),
+        "enviados": estados["enviado"],
+        "reintentar": estados["pendiente"],
+        "errores": estados["error"],
+        "segundos": elapsed,
+        "mensajes_por_segundo": estados["enviado"] / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,147 @@
+"""Receivables: aging per cliente and the estado de cuenta of one cliente.
+
+Both read the persisted Orden.abono/saldo, which app.utils.saldos keeps in step
+with pagos, over orders with a balance due. They never sum pagos per order
+(Orden.saldo_calc), so a cliente's paid-off history costs nothing.
+
+* aging() is one GROUP BY cliente_id over the open orders. Each saldo falls in
+  a 0–30/31–60/61–90/90+ day bucket by Orden.fecha against the corte date.
+  Window functions over the grouped rows add the grand totals to every row,
+  so a page of clientes and the totals of the whole report come from one
+  statement. Pages are keyset on (saldo, cliente_id), largest debt first.
+* estado_cuenta() lists a cliente's open orders, oldest first, with the
+  running balance as a window SUM. It pages on (fecha, id) through
+  ix_ordenes_cliente_con_saldo.
+"""
+from __future__ import annotations
+import base64
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Optional
+
+from sqlalchemy import Numeric, and_, case, func, literal, select, tuple_
+
+from ..models import Cliente, Orden
+from .pagination import KeysetPage
+
+ordenes_table = Orden.__table__
+
+# (column, label, oldest day of the bucket); the last one has no upper bound
+TRAMOS = (("d0_30", "0–30", 30), ("d31_60", "31–60", 60), ("d61_90", "61–90", 90), ("d90_mas", "90+", None))
+
+
+def tramo(dias: int) -> str:
+    """Label of the bucket an order `dias` old falls in."""
+    return next(label for _, label, hasta in TRAMOS if hasta is None or dias <= hasta)
+
+
+def _tramos(corte: date) -> list:
+    o = ordenes_table
+    columnas, desde = [], None
+    for nombre, _, hasta in TRAMOS:
+        # Bounds as dates, not ages: no date arithmetic in SQL, which differs per dialect
+        conds = []
+        if desde is not None:
+            conds.append(o.c.fecha < corte - timedelta(days=desde))
+        if hasta is not None:
+            conds.append(o.c.fecha >= corte - timedelta(days=hasta))
+        columnas.append(func.sum(case((and_(*conds), o.c.saldo), else_=0)).label(nombre))
+        desde = hasta
+    return columnas
+
+
+def aging(corte: date, cliente_id: Optional[int] = None, totales: bool = True):
+    """Clientes with a balance due, the buckets of their saldo and (with totales) the report totals."""
+    o = ordenes_table
+    por_cliente = (
+        select(
+            o.c.cliente_id,
+            func.count().label("ordenes"),
+            func.min(o.c.fecha).label("mas_antigua"),
+            func.sum(o.c.saldo).label("saldo"),
+            *_tramos(corte),
+        )
+        .where(o.c.saldo > 0)
+        .group_by(o.c.cliente_id)
+    )
+    if cliente_id is not None:
+        por_cliente = por_cliente.where(o.c.cliente_id == cliente_id)
+    por_cliente = por_cliente.subquery("por_cliente")
+    columnas = [por_cliente.c[c] for c in ("ordenes", "mas_antigua", "saldo", *(t[0] for t in TRAMOS))]
+    if totales:
+        # Evaluated before the page's cursor filter and LIMIT, so they cover every cliente
+        columnas += [
+            func.count().over().label("total_clientes"),
+            func.sum(por_cliente.c.saldo).over().label("total_saldo"),
+            *(func.sum(por_cliente.c[t[0]]).over().label(f"total_{t[0]}") for t in TRAMOS),
+        ]
+    cartera = select(por_cliente.c.cliente_id, *columnas).subquery("cartera")
+    return (
+        select(cartera.c.cliente_id, Cliente.nombre.label("cliente"), Cliente.rut,
+               *(c for c in cartera.c if c.key != "cliente_id"))
+        .join(Cliente, Cliente.id == cartera.c.cliente_id)
+        .order_by(cartera.c.saldo.desc(), cartera.c.cliente_id.desc())
+    ), cartera
+
+
+def _encode(clave, row_id: int) -> str:
+    raw = f"{clave}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: Optional[str], parse: Callable[[str], Any]) -> Optional[tuple[Any, int]]:
+    """(clave, id) from a cursor written by _encode, or None if it is missing or invalid."""
+    if not cursor:
+        return None
+    try:
+        clave, row_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|", 1)
+        return parse(clave), int(row_id)
+    except (ValueError, UnicodeDecodeError, InvalidOperation):
+        return None
+
+
+def _page(session, stmt, per_page: int, clave: str) -> KeysetPage:
+    rows = session.execute(stmt.limit(per_page + 1)).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = _encode(getattr(rows[-1], clave), rows[-1][0])
+    return KeysetPage(rows, next_cursor, per_page)
+
+
+def aging_page(session, corte: date, cursor: Optional[str], per_page: int) -> tuple[KeysetPage, Optional[dict]]:
+    """One page of aging() and the report totals, from a single statement."""
+    stmt, cartera = aging(corte)
+    position = _decode(cursor, Decimal)
+    if position is not None:
+        stmt = stmt.where(
+            tuple_(cartera.c.saldo, cartera.c.cliente_id) < tuple_(literal(position[0], Numeric(14, 2)), position[1])
+        )
+    page = _page(session, stmt, per_page, "saldo")
+    # A page past the end has no row to read the window totals from
+    nombres = ("total_clientes", "total_saldo", *(f"total_{t[0]}" for t in TRAMOS))
+    totales = {n: getattr(page.items[0], n) for n in nombres} if page.items else None
+    return page, totales
+
+
+def estado_cuenta(cliente_id: int):
+    """Open orders of a cliente, oldest first, with saldo_acumulado (running balance)."""
+    o = ordenes_table
+    abiertas = (
+        select(
+            o.c.id, o.c.fecha, o.c.precio_total, o.c.abono, o.c.saldo, o.c.estado_trabajo, o.c.estado_pago,
+            func.sum(o.c.saldo).over(order_by=(o.c.fecha, o.c.id)).label("saldo_acumulado"),
+        )
+        .where(o.c.cliente_id == cliente_id, o.c.saldo > 0)
+        .subquery("abiertas")
+    )
+    return select(abiertas).order_by(abiertas.c.fecha, abiertas.c.id), abiertas
+
+
+def estado_cuenta_page(session, cliente_id: int, cursor: Optional[str], per_page: int) -> KeysetPage:
+    stmt, abiertas = estado_cuenta(cliente_id)
+    position = _decode(cursor, date.fromisoformat)
+    if position is not None:
+        # Filters the windowed rows, so the running balance still starts at the oldest order
+        stmt = stmt.where(tuple_(abiertas.c.fecha, abiertas.c.id) > tuple_(literal(position[0]), position[1]))
+    return _page(session, stmt, per_page, "fecha")
@@ -0,0 +1,234 @@
+"""Streaming CSV/XLSX exports of ordenes, pagos, clientes, receivables and the sales reports.
+
+Rows come from a single SELECT executed with yield_per, which on PostgreSQL
+uses a server-side cursor, and are encoded one partition at a time. Memory
+therefore depends on EXPORT_YIELD_PER, not on the table size. The XLSX
+writer emits a minimal workbook (inline strings, one sheet) through a
+streaming ZIP. In CSV, text that a spreadsheet would read as a formula
+(starting with =, +, -, @, tab or CR) is prefixed with an apostrophe. Inline
+strings in XLSX are never evaluated.
+"""
+from __future__ import annotations
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Iterator
+from xml.sax.saxutils import escape
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import select
+
+from ..extensions import db
+from ..models import Cliente, Orden, Pago, Usuario, Vendedor
+from ..queries import apply_orden_filters, parse_date, parse_orden_filters
+from . import cuentas, reportes
+from .search import filter_clientes
+from .streams import ChunkSink
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _ordenes(args):
+    columnas = [
+        Orden.id, Orden.fecha, Cliente.nombre.label("cliente"), Cliente.rut.label("rut_cliente"),
+        Vendedor.nombre.label("vendedor"), Orden.estado_trabajo, Orden.estado_despacho, Orden.estado_pago,
+        Orden.precio_neto, Orden.iva, Orden.precio_total, Orden.abono, Orden.saldo, Orden.observaciones,
+        Orden.created_at,
+    ]
+    stmt = (
+        select(*columnas)
+        .join(Cliente, Orden.cliente_id == Cliente.id)
+        .outerjoin(Vendedor, Orden.vendedor_id == Vendedor.id)
+    )
+    return apply_orden_filters(stmt, parse_orden_filters(args)).order_by(Orden.id)
+
+
+def _pagos(args):
+    stmt = (
+        select(
+            Pago.id, Pago.orden_id, Pago.fecha, Pago.monto, Pago.metodo,
+            Usuario.nombre.label("usuario"), Pago.created_at,
+        )
+        .outerjoin(Usuario, Pago.usuario_id == Usuario.id)
+    )
+    try:
+        orden_id = int(args.get("orden_id") or 0)
+    except ValueError:
+        orden_id = 0
+    if orden_id:
+        stmt = stmt.filter(Pago.orden_id == orden_id)
+    desde, hasta = parse_date(args.get("desde")), parse_date(args.get("hasta"))
+    if desde:
+        stmt = stmt.filter(Pago.fecha >= datetime.combine(desde, time()))
+    if hasta:
+        stmt = stmt.filter(Pago.fecha < datetime.combine(hasta + timedelta(days=1), time()))
+    return stmt.order_by(Pago.id)
+
+
+def _clientes(args):
+    stmt = select(Cliente.id, Cliente.nombre, Cliente.rut, Cliente.telefono, Cliente.correo, Cliente.created_at)
+    q = (args.get("q") or "").strip()
+    return filter_clientes(stmt, q) if q else stmt.order_by(Cliente.id)
+
+
+def _cartera(args):
+    return cuentas.aging(parse_date(args.get("corte")) or date.today(), totales=False)[0]
+
+
+def _estado_cuenta(args):
+    try:
+        cliente_id = int(args.get("cliente_id") or 0)
+    except ValueError:
+        cliente_id = 0
+    return cuentas.estado_cuenta(cliente_id)[0]
+
+
+def _reporte_vendedores(args):
+    return reportes.query("vendedores", *reportes.rango(args))
+
+
+def _reporte_categorias(args):
+    return reportes.query("categorias", *reportes.rango(args))
+
+
+DATASETS: dict[str, Callable] = {
+    "ordenes": _ordenes,
+    "pagos": _pagos,
+    "clientes": _clientes,
+    "cartera": _cartera,
+    "estado_cuenta": _estado_cuenta,
+    "reporte_vendedores": _reporte_vendedores,
+    "reporte_categorias": _reporte_categorias,
+}
+
+
+def _rows(dataset: str, args):
+    stmt = DATASETS[dataset](args).execution_options(yield_per=current_app.config["EXPORT_YIELD_PER"])
+    result = db.session.execute(stmt)
+    return list(result.keys()), result
+
+
+_FORMULA_START = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_cell(value):
+    """Neutralize text a spreadsheet would evaluate (CSV injection); numbers are left alone."""
+    if isinstance(value, str) and value.startswith(_FORMULA_START):
+        return "'" + value
+    return value
+
+
+def stream_csv(headers: list[str], result) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")  # Excel needs the BOM to read UTF-8
+    writer.writerow(headers)
+    for partition in result.partitions():
+        writer.writerows([_csv_cell(v) for v in row] for row in partition)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _workbook(sheet: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet)}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    text = escape(_XML_INVALID.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xml_row(values) -> str:
+    return "<row>" + "".join(_cell(v) for v in values) + "</row>"
+
+
+def stream_xlsx(headers: list[str], result, sheet: str) -> Iterator[bytes]:
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, body in {**_XLSX_PARTS, "xl/workbook.xml": _workbook(sheet)}.items():
+            zf.writestr(name, body)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as fh:
+            fh.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            fh.write(_xml_row(headers).encode("utf-8"))
+            for partition in result.partitions():
+                fh.write("".join(_xml_row(row) for row in partition).encode("utf-8"))
+                yield sink.drain()
+            fh.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+def stream(dataset: str, formato: str, args) -> Iterator[bytes]:
+    """Encoded chunks of `dataset` filtered by `args` (anything with .get, like request.args)."""
+    headers, result = _rows(dataset, args)
+    try:
+        if formato == "xlsx":
+            yield from stream_xlsx(headers, result, dataset)
+        else:
+            yield from stream_csv(headers, result)
+    finally:
+        result.close()
+
+
+def response(dataset: str, formato: str, args) -> Response:
+    nombre = f"{dataset}_{date.today():%Y%m%d}.{formato}"
+    return Response(
+        stream_with_context(stream(dataset, formato, args)),
+        mimetype=FORMATOS[formato],
+        headers={"Content-Disposition": f"attachment; filename={nombre}"},
+    )
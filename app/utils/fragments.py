@@ -0,0 +1,126 @@
+"""Per-worker cache of the rendered list pages (clientes, vendedores, usuarios).
+
+The content block of these pages depends only on a few tables and the query
+string, so it is rendered once per version of those tables and kept as HTML
+in an LRU dict capped at FRAGMENT_CACHE_MAX_BYTES per worker. Any flushed
+insert, update or delete of a Cliente, Vendedor, Categoria or Usuario bumps
+its table's counter in cache_versions (see app.utils.versions). The counters
+are read on each request, in one query, so every worker serves the new
+content as soon as the write commits.
+
+The page around the fragment (navbar, flashed messages) is rendered per
+request. CSRF tokens are per session: the fragment is rendered with a
+placeholder that is swapped for the current token on the way out.
+
+Responses carry an ETag (table versions, query string, user and CSRF token)
+and a Last-Modified (newest counter bump), and are answered with 304 Not
+Modified when the browser's copy is still current.
+"""
+from __future__ import annotations
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from typing import Callable
+
+from flask import Response, current_app, render_template, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+
+from ..instrumentation import registry
+from ..models import Categoria, Cliente, Usuario, Vendedor
+from . import versions
+
+CSRF_PLACEHOLDER = "__fragment_csrf_token__"
+
+for _model, _nombre in ((Cliente, "clientes"), (Vendedor, "vendedores"), (Categoria, "categorias"),
+                        (Usuario, "usuarios")):
+    versions.track(_model, _nombre)
+
+_cache: OrderedDict[tuple, str] = OrderedDict()
+_lock = threading.Lock()
+_size = {"bytes": 0}
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+        _size["bytes"] = 0
+
+
+def _get(key: tuple):
+    with _lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+        return html
+
+
+def _put(key: tuple, html: str) -> None:
+    limit = current_app.config["FRAGMENT_CACHE_MAX_BYTES"]
+    size = sys.getsizeof(html)
+    if size > limit // 4:  # a handful of huge pages should not flush everything else
+        return
+    with _lock:
+        if key in _cache:
+            return
+        _cache[key] = html
+        _size["bytes"] += size
+        while _size["bytes"] > limit:
+            _, old = _cache.popitem(last=False)
+            _size["bytes"] -= sys.getsizeof(old)
+
+
+def _csrf_window() -> int:
+    """Changes before a page's CSRF token expires, so a 304 never revives a stale token."""
+    limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    return int(time.time() // (limit / 2)) if limit else 0
+
+
+def render(template: str, fragmento: str, tablas: tuple[str, ...], contexto: Callable[[], dict]) -> Response:
+    """Render `template` around the cached `fragmento` (built from contexto() on a miss).
+
+    `template` places the fragment with {{ fragment }}; `tablas` are the
+    cache_versions counters the fragment depends on.
+    """
+    token = generate_csrf()  # first, so a new session has its CSRF secret before the ETag is computed
+    estado = versions.state(tablas)
+    key = (fragmento, tuple(sorted(request.args.items(multi=True))), tuple(estado[t][0] for t in tablas))
+    etag = hashlib.sha1(repr((
+        key, current_user.get_id(), current_user.nombre, current_user.rol,
+        session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token")), _csrf_window(),
+    )).encode()).hexdigest()[:24]
+    bumped = [updated for _, updated in estado.values() if updated is not None]
+    last_modified = max(bumped).replace(microsecond=0, tzinfo=timezone.utc) if bumped else None
+
+    # Flashed messages are consumed by the page, so a pending one always renders it
+    if not session.get("_flashes"):
+        if request.if_none_match:
+            fresh = request.if_none_match.contains(etag)
+        else:
+            fresh = bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+        if fresh:
+            registry.inc("printshop_fragment_cache_total", (("fragmento", fragmento), ("resultado", "not_modified")))
+            return _headers(Response(status=304), etag, last_modified)
+
+    html = _get(key) if current_app.config["FRAGMENT_CACHE_MAX_BYTES"] else None
+    registry.inc("printshop_fragment_cache_total", (("fragmento", fragmento), ("resultado", "hit" if html else "miss")))
+    if html is None:
+        html = render_template(fragmento, csrf_token=lambda: CSRF_PLACEHOLDER, **contexto())
+        if current_app.config["FRAGMENT_CACHE_MAX_BYTES"]:
+            _put(key, html)
+    fragment = Markup(html.replace(CSRF_PLACEHOLDER, token))
+    return _headers(Response(render_template(template, fragment=fragment)), etag, last_modified)
+
+
+def _headers(response: Response, etag: str, last_modified) -> Response:
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # always revalidate; the ETag makes that cheap
+    response.vary.add("Cookie")
+    return response
@@ -0,0 +1,306 @@
+"""Bulk CSV import of clientes, vendedores, ordenes, descripciones and pagos.
+
+Each file is read in chunks. Every row is validated with the same WTForms
+rules as the web forms. Foreign keys are resolved through in-memory maps
+(legacy ``ref`` → new id, plus the RUTs and emails already in the database),
+so no per-row SELECT is issued. Accepted rows go in with one executemany
+INSERT ... RETURNING per chunk, or COPY on PostgreSQL for the leaf tables
+(descripciones, pagos). Core inserts skip the ORM events, so saldos and
+resumen_diario are recomputed for the imported range at the end.
+
+Columns are the form field names plus:
+  clientes, vendedores: ref (defaults to rut); vendedores: categoria (name)
+  ordenes: ref, cliente_ref, vendedor_ref, usuario (email), estado_trabajo, estado_despacho
+  descripciones, pagos: orden_ref
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+import time
+from datetime import date, datetime, time as dtime
+from decimal import Decimal
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import insert, text
+from werkzeug.datastructures import MultiDict
+
+from ..extensions import db
+from ..models import Categoria, Cliente, Descripcion, Orden, Pago, Usuario, Vendedor
+from ..modules.clientes.forms import ClienteForm
+from ..modules.ordenes.forms import DescripcionForm, OrdenForm
+from ..modules.pagos.forms import PagoForm
+from ..modules.vendedores.forms import VendedorForm
+from ..queries import ESTADOS_DESPACHO, ESTADOS_TRABAJO
+from . import resumen, versions
+from .saldos import estado_pago_for, reconcile
+
+ENTIDADES = ("clientes", "vendedores", "ordenes", "descripciones", "pagos")
+
+
+# Foreign keys come from the import maps, not from per-row LookupField queries
+class _VendedorImport(VendedorForm):
+    categoria_id = None
+
+
+class _OrdenImport(OrdenForm):
+    cliente_id = None
+    vendedor_id = None
+    usuario_id = None
+
+
+class _PagoImport(PagoForm):
+    orden_id = None
+
+
+class Rechazo(Exception):
+    pass
+
+
+class Reporte:
+    def __init__(self, entidad: str):
+        self.entidad = entidad
+        self.leidas = 0
+        self.importadas = 0
+        self.existentes = 0
+        self.rechazadas = 0
+        self.segundos = 0.0
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.leidas / self.segundos if self.segundos > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.entidad}: {self.leidas} read, {self.importadas} imported, {self.existentes} existing, "
+            f"{self.rechazadas} rejected in {self.segundos:.2f}s ({self.filas_por_segundo:.0f} rows/s)"
+        )
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[tuple[int, dict]]]:
+    numbered = enumerate(rows, start=2)  # line 1 is the header
+    while chunk := list(islice(numbered, size)):
+        yield chunk
+
+
+def _validate(form_cls, row: dict) -> dict:
+    form = form_cls(formdata=MultiDict(row), meta={"csrf": False})
+    if not form.validate():
+        raise Rechazo("; ".join(f"{campo}: {', '.join(errs)}" for campo, errs in form.errors.items()))
+    return {k: v for k, v in form.data.items() if k != "submit"}
+
+
+def bulk_insert(model, records: list[dict]) -> None:
+    """Insert same-shaped dicts with COPY on PostgreSQL, executemany elsewhere.
+
+    Include "id" in the records to keep explicit keys (then move the sequence
+    past them, see sync_sequence). created_at/updated_at default to now.
+    """
+    if not records:
+        return
+    if db.engine.dialect.name != "postgresql":
+        db.session.execute(insert(model.__table__), records)
+        return
+    now = datetime.utcnow()
+    columnas = [c.name for c in model.__table__.columns if c.name != "id" or "id" in records[0]]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for record in records:
+        full = {"created_at": now, "updated_at": now, **record}
+        writer.writerow(["\\N" if full.get(c) is None else full[c] for c in columnas])
+    buf.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY {model.__tablename__} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+    )
+
+
+def sync_sequence(model) -> None:
+    """After inserting explicit ids on PostgreSQL, continue the id sequence from max(id)."""
+    if db.engine.dialect.name == "postgresql":
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {table}"
+        ))
+
+
+class Importer:
+    def __init__(self, chunk_size: int = 1000, usuario_id: Optional[int] = None, rechazos=None,
+                 dry_run: bool = False):
+        self.chunk_size = chunk_size
+        self.usuario_id = usuario_id
+        self.dry_run = dry_run
+        self.rechazos = csv.writer(rechazos) if rechazos is not None else None
+        if self.rechazos is not None:
+            self.rechazos.writerow(["entidad", "linea", "error", "datos"])
+        # One query per referenced table up front; rows then resolve keys from these dicts
+        self.clientes = {rut: i for rut, i in db.session.query(Cliente.rut, Cliente.id).filter(Cliente.rut.isnot(None))}
+        self.vendedores = {rut: i for rut, i in db.session.query(Vendedor.rut, Vendedor.id).filter(Vendedor.rut.isnot(None))}
+        self.categorias = {nombre.lower(): i for nombre, i in db.session.query(Categoria.nombre, Categoria.id)}
+        self.usuarios = {email.lower(): i for email, i in db.session.query(Usuario.email, Usuario.id)}
+        self.ordenes: dict[str, int] = {}
+        self.min_orden_id: Optional[int] = None
+        self.dias: set[date] = set()
+        self._fake_id = 0
+
+    # -- row builders: validated dict (plus its ref) or Rechazo -------------------------------
+
+    def _cliente(self, row: dict):
+        ref = row.get("ref") or row.get("rut")
+        if row.get("rut") and row["rut"] in self.clientes:
+            return ref, self.clientes[row["rut"]]
+        return ref, _validate(ClienteForm, row)
+
+    def _vendedor(self, row: dict):
+        ref = row.get("ref") or row.get("rut")
+        if row.get("rut") and row["rut"] in self.vendedores:
+            return ref, self.vendedores[row["rut"]]
+        data = _validate(_VendedorImport, row)
+        categoria = row.get("categoria")
+        if categoria:
+            if categoria.lower() not in self.categorias:
+                raise Rechazo(f"categoria: '{categoria}' no existe")
+            data["categoria_id"] = self.categorias[categoria.lower()]
+        return ref, data
+
+    def _orden(self, row: dict):
+        data = _validate(_OrdenImport, row)
+        cliente_id = self.clientes.get(row.get("cliente_ref", ""))
+        if cliente_id is None:
+            raise Rechazo(f"cliente_ref: '{row.get('cliente_ref', '')}' no encontrado")
+        vendedor_id = None
+        if row.get("vendedor_ref"):
+            vendedor_id = self.vendedores.get(row["vendedor_ref"])
+            if vendedor_id is None:
+                raise Rechazo(f"vendedor_ref: '{row['vendedor_ref']}' no encontrado")
+        usuario_id = self.usuarios.get(row["usuario"].lower()) if row.get("usuario") else self.usuario_id
+        if usuario_id is None:
+            raise Rechazo(f"usuario: '{row.get('usuario', '')}' no encontrado")
+        estado_trabajo = row.get("estado_trabajo") or "pendiente"
+        estado_despacho = row.get("estado_despacho") or "pendiente"
+        if estado_trabajo not in ESTADOS_TRABAJO or estado_despacho not in ESTADOS_DESPACHO:
+            raise Rechazo(f"estado: '{estado_trabajo}'/'{estado_despacho}' no válido")
+        data.update(
+            cliente_id=cliente_id, vendedor_id=vendedor_id, usuario_id=usuario_id,
+            estado_trabajo=estado_trabajo, estado_despacho=estado_despacho,
+            # pagos are added afterwards; reconcile() brings these up to date
+            abono=Decimal(0), saldo=data["precio_total"], estado_pago=estado_pago_for(Decimal(0), data["precio_total"]),
+        )
+        return row.get("ref"), data
+
+    def _orden_id(self, row: dict) -> int:
+        orden_id = self.ordenes.get(row.get("orden_ref", ""))
+        if orden_id is None:
+            raise Rechazo(f"orden_ref: '{row.get('orden_ref', '')}' no encontrada")
+        return orden_id
+
+    def _descripcion(self, row: dict):
+        data = _validate(DescripcionForm, row)
+        data["precio_unitario"] = data["precio_unitario"] or Decimal(0)
+        data.update(orden_id=self._orden_id(row), subtotal=Decimal(data["cantidad"]) * data["precio_unitario"])
+        return None, data
+
+    def _pago(self, row: dict):
+        data = _validate(_PagoImport, row)
+        data.update(
+            orden_id=self._orden_id(row),
+            fecha=datetime.combine(data["fecha"], dtime()),
+            metodo=data["metodo"] or "transferencia",
+            usuario_id=self.usuario_id,
+        )
+        return None, data
+
+    # -- loading ------------------------------------------------------------------------------
+
+    def _insert_returning(self, model, records: list[dict]) -> list[int]:
+        if self.dry_run:
+            self._fake_id -= len(records)
+            return list(range(self._fake_id, self._fake_id + len(records)))
+        # Core table insert: plain executemany, no ORM bulk machinery
+        table = model.__table__
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        return list(db.session.execute(stmt, records).scalars())
+
+    def _insert_leaf(self, model, records: list[dict]) -> None:
+        if not self.dry_run:
+            bulk_insert(model, records)
+
+    def _run(self, entidad: str, rows: Iterable[dict], build: Callable, load: Callable) -> Reporte:
+        reporte = Reporte(entidad)
+        started = time.perf_counter()
+        for chunk in _chunks(rows, self.chunk_size):
+            refs, records = [], []
+            for linea, row in chunk:
+                reporte.leidas += 1
+                row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+                try:
+                    ref, data = build(row)
+                except Rechazo as exc:
+                    reporte.rechazadas += 1
+                    if self.rechazos is not None:
+                        self.rechazos.writerow([entidad, linea, str(exc), json.dumps(row, ensure_ascii=False)])
+                    continue
+                if isinstance(data, int):  # matched an existing row by RUT
+                    reporte.existentes += 1
+                    if ref:
+                        getattr(self, entidad)[ref] = data
+                    continue
+                refs.append(ref)
+                records.append(data)
+            load(refs, records)
+            reporte.importadas += len(records)
+            if not self.dry_run:
+                db.session.commit()
+        reporte.segundos = time.perf_counter() - started
+        return reporte
+
+    def _load_with_ids(self, entidad: str, model) -> Callable:
+        mapa = getattr(self, entidad)
+
+        def load(refs: list, records: list[dict]) -> None:
+            if not records:
+                return
+            ids = self._insert_returning(model, records)
+            for ref, record, new_id in zip(refs, records, ids):
+                if ref:
+                    mapa[ref] = new_id
+                if record.get("rut"):
+                    mapa.setdefault(record["rut"], new_id)
+            if model is Orden:
+                self.dias.update(r["fecha"] for r in records)
+                if ids and not self.dry_run:
+                    self.min_orden_id = min(self.min_orden_id or ids[0], min(ids))
+        return load
+
+    def _load_leaf(self, model) -> Callable:
+        def load(refs: list, records: list[dict]) -> None:
+            self._insert_leaf(model, records)
+            if model is Pago:
+                self.dias.update(r["fecha"].date() for r in records)
+        return load
+
+    def importar(self, archivos: dict[str, Iterable[dict]]) -> list[Reporte]:
+        """Import the given {entidad: rows} in dependency order, then refresh derived totals."""
+        plan = {
+            "clientes": (self._cliente, self._load_with_ids("clientes", Cliente)),
+            "vendedores": (self._vendedor, self._load_with_ids("vendedores", Vendedor)),
+            "ordenes": (self._orden, self._load_with_ids("ordenes", Orden)),
+            "descripciones": (self._descripcion, self._load_leaf(Descripcion)),
+            "pagos": (self._pago, self._load_leaf(Pago)),
+        }
+        reportes = [self._run(e, archivos[e], *plan[e]) for e in ENTIDADES if e in archivos]
+        if not self.dry_run:
+            # Core inserts skip the ORM events that invalidate the cached clientes/vendedores lists
+            for reporte in reportes:
+                if reporte.entidad in ("clientes", "vendedores") and reporte.importadas:
+                    versions.bump(db.session.connection(), reporte.entidad)
+            db.session.commit()
+        if not self.dry_run and self.min_orden_id is not None:
+            reconcile(min_id=self.min_orden_id)
+        if not self.dry_run and self.dias:
+            dias = sorted(self.dias)
+            for start in range(0, len(dias), 500):
+                resumen.refresh_days(db.session.connection(), dias[start:start + 500])
+            db.session.commit()
+        return reportes
@@ -0,0 +1,85 @@
+"""Typeahead lookups for the id fields of the order and payment forms.
+
+Pages no longer embed every cliente, vendedor, usuario or orden as <option>s:
+the browser asks /lookup/<entidad>?q= for a handful of {id, label} matches
+and posts back only the id, which LookupField checks with one primary-key
+query.
+"""
+from __future__ import annotations
+from typing import Callable
+
+from sqlalchemy import or_
+from wtforms import IntegerField
+from wtforms.validators import ValidationError
+
+from ..extensions import db
+from ..models import Cliente, Orden, Usuario, Vendedor
+from . import search
+
+
+def _like(q: str) -> str:
+    return f"%{search.escape_like(q)}%"
+
+
+def clientes(q: str, limit: int) -> list[dict]:
+    return [
+        {"id": c["id"], "label": f"{c['nombre']} ({c['rut'] or '#' + str(c['id'])})"}
+        for c in search.autocomplete(q, limit)
+    ]
+
+
+def vendedores(q: str, limit: int) -> list[dict]:
+    query = db.session.query(Vendedor.id, Vendedor.nombre)
+    if q:
+        query = query.filter(Vendedor.nombre.ilike(_like(q), escape="\\"))
+    return [{"id": v.id, "label": v.nombre} for v in query.order_by(Vendedor.nombre).limit(limit)]
+
+
+def usuarios(q: str, limit: int) -> list[dict]:
+    query = db.session.query(Usuario.id, Usuario.nombre, Usuario.email)
+    if q:
+        like = _like(q)
+        query = query.filter(or_(Usuario.nombre.ilike(like, escape="\\"), Usuario.email.ilike(like, escape="\\")))
+    return [{"id": u.id, "label": f"{u.nombre} <{u.email}>"} for u in query.order_by(Usuario.nombre).limit(limit)]
+
+
+def ordenes(q: str, limit: int) -> list[dict]:
+    """By number or cliente name; with no query, the latest orders that still owe money."""
+    query = db.session.query(Orden.id, Orden.saldo, Cliente.nombre).join(Cliente, Orden.cliente_id == Cliente.id)
+    if q.lstrip("#").isdigit():
+        query = query.filter(Orden.id == int(q.lstrip("#")))
+    elif q:
+        query = query.filter(Cliente.nombre.ilike(_like(q), escape="\\"))
+    else:
+        query = query.filter(Orden.saldo > 0)  # ix_ordenes_con_saldo
+    rows = query.order_by(Orden.fecha.desc(), Orden.id.desc()).limit(limit)
+    return [{"id": o.id, "label": f"#{o.id} - {o.nombre} (saldo ${o.saldo:.0f})"} for o in rows]
+
+
+ENTIDADES: dict[str, Callable[[str, int], list[dict]]] = {
+    "clientes": clientes,
+    "vendedores": vendedores,
+    "usuarios": usuarios,
+    "ordenes": ordenes,
+}
+
+
+class LookupField(IntegerField):
+    """Id of a `model` row chosen through a typeahead; blank (or the legacy "0") means none."""
+
+    def __init__(self, label=None, validators=None, model=None, **kwargs):
+        super().__init__(label, validators, **kwargs)
+        self.model = model
+        self.object = None
+
+    def process_formdata(self, valuelist):
+        if valuelist and valuelist[0].strip() in ("", "0"):
+            self.data = None
+            return
+        super().process_formdata(valuelist)
+
+    def pre_validate(self, form):
+        if self.data is not None:
+            self.object = db.session.get(self.model, self.data)
+            if self.object is None:
+                raise ValidationError("No existe")
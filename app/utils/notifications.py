@@ -1,20 +1,25 @@
 from __future__ import annotations
+import logging
+import signal
 import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from typing import Optional
-from flask import current_app
+from flask import Flask, current_app
+from sqlalchemy import update
 
 from ..extensions import db
 from ..models import NotificationLog
+from . import settings
+from .smtp import SMTPPool
 
+logger = logging.getLogger(__name__)
 
-def send_email(to_email: str, subject: str, body: str, orden_id: Optional[int] = None) -> bool:
-    cfg = current_app.config
-    msg = MIMEText(body, _charset="utf-8")
-    msg["Subject"] = subject
-    msg["From"] = cfg.get("SMTP_FROM")
-    msg["To"] = to_email
 
+def send_email(to_email: str, subject: str, body: str, orden_id: Optional[int] = None) -> bool:
+    """Queue an email in the notification outbox; `flask notifications-worker` delivers it."""
     log = NotificationLog(
         orden_id=orden_id,
         destinatario=to_email,
@@ -24,25 +29,8 @@ def send_email(to_email: str, subject: str, body: str, orden_id: Optional[int] =
         estado="pendiente",
     )
     db.session.add(log)
-    db.session.flush()
-
-    try:
-        with smtplib.SMTP(cfg.get("SMTP_HOST"), cfg.get("SMTP_PORT")) as server:
-            if cfg.get("SMTP_USE_TLS"):
-                server.starttls()
-            username = cfg.get("SMTP_USERNAME")
-            password = cfg.get("SMTP_PASSWORD")
-            if username and password:
-                server.login(username, password)
-            server.send_message(msg)
-        log.estado = "enviado"
-        db.session.commit()
-        return True
-    except Exception as exc:  # noqa: BLE001
-        log.estado = "error"
-        log.respuesta = str(exc)
-        db.session.commit()
-        return False
+    db.session.commit()
+    return True
 
 
 def send_whatsapp(to_number: str, body: str, orden_id: Optional[int] = None) -> bool:
@@ -56,4 +44,162 @@ def send_whatsapp(to_number: str, body: str, orden_id: Optional[int] = None) ->
     )
     db.session.add(log)
     db.session.commit()
-    return True
\ No newline at end of file
+    return True
+
+
+def compose_message(to_email: str, subject: Optional[str], body: Optional[str], from_addr: str) -> MIMEText:
+    msg = MIMEText(body or "", _charset="utf-8")
+    msg["Subject"] = subject or ""
+    msg["From"] = from_addr
+    msg["To"] = to_email
+    return msg
+
+
+def claim_batch(limit: int) -> tuple[list[NotificationLog], datetime]:
+    """Claim up to `limit` due emails for this worker and commit the claim.
+
+    The rows are locked with SKIP LOCKED, so rows another worker is claiming
+    are skipped, not waited on. Their proximo_intento then moves
+    NOTIFY_CLAIM_SECONDS ahead (the lease, returned with the rows), which
+    hides them from other workers while each one is sent and committed on its
+    own. A worker that dies mid-batch leaves its unsent rows to be picked up
+    again after that lease.
+    """
+    batch = (
+        NotificationLog.query
+        .filter(
+            NotificationLog.estado == "pendiente",
+            NotificationLog.canal == "email",
+            NotificationLog.proximo_intento <= datetime.utcnow(),
+        )
+        .order_by(NotificationLog.proximo_intento, NotificationLog.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease = datetime.utcnow() + timedelta(seconds=current_app.config["NOTIFY_CLAIM_SECONDS"])
+    for log in batch:
+        log.proximo_intento = lease
+    db.session.commit()
+    return batch, lease
+
+
+def _hold(log_id: int, lease: datetime) -> bool:
+    """Renew the lease on one claimed row right before sending it.
+
+    A slow batch can outlive its lease; by then another worker may have
+    claimed the row again, and this returns False so it is not sent twice.
+    """
+    renewed = datetime.utcnow() + timedelta(seconds=current_app.config["NOTIFY_CLAIM_SECONDS"])
+    result = db.session.execute(
+        update(NotificationLog)
+        .where(
+            NotificationLog.id == log_id,
+            NotificationLog.estado == "pendiente",
+            NotificationLog.proximo_intento == lease,
+        )
+        .values(proximo_intento=renewed)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _schedule_retry(log: NotificationLog, exc: Exception, permanent: bool = False) -> None:
+    cfg = current_app.config
+    log.intentos = (log.intentos or 0) + 1
+    log.respuesta = str(exc)
+    if permanent or log.intentos >= cfg["NOTIFY_MAX_ATTEMPTS"]:
+        log.estado = "error"
+        return
+    delay = min(cfg["NOTIFY_RETRY_BASE_SECONDS"] * 2 ** (log.intentos - 1), cfg["NOTIFY_RETRY_MAX_SECONDS"])
+    log.proximo_intento = datetime.utcnow() + timedelta(seconds=delay)
+
+
+def _send_one(pool: SMTPPool, log: NotificationLog, from_addr: str) -> None:
+    started = time.perf_counter()
+    try:
+        message = compose_message(log.destinatario, log.asunto, log.mensaje, from_addr)
+        with pool.connection() as server:
+            server.send_message(message)
+    except smtplib.SMTPRecipientsRefused as exc:
+        _schedule_retry(log, exc, permanent=True)  # only this address is rejected
+        return
+    except (smtplib.SMTPException, OSError) as exc:
+        _schedule_retry(log, exc)
+        return
+    except Exception as exc:  # noqa: BLE001
+        # Bad stored data (e.g. a CR/LF in the address) fails the same way on every retry
+        logger.warning("notification %s cannot be sent: %r", log.id, exc)
+        _schedule_retry(log, exc, permanent=True)
+        return
+    log.intentos = (log.intentos or 0) + 1
+    log.estado = "enviado"
+    log.enviado_at = datetime.utcnow()
+    log.latencia_ms = int((time.perf_counter() - started) * 1000)
+    log.respuesta = None
+
+
+def deliver_batch(pool: SMTPPool, limit: int) -> int:
+    """Send one claimed batch, committing each row's outcome right after it; return rows handled."""
+    batch, lease = claim_batch(limit)
+    from_addr = settings.get("SMTP_FROM")
+    for log in batch:
+        if not _hold(log.id, lease):
+            logger.info("notification %s was claimed again after its lease ran out; skipped", log.id)
+            continue
+        _send_one(pool, log, from_addr)
+        db.session.commit()  # a sent row is never rolled back with a later one
+    return len(batch)
+
+
+def run_worker(app: Flask, threads: int, batch_size: int, poll_interval: float, once: bool = False) -> None:
+    """Drain the outbox with `threads` workers sharing one SMTP pool until SIGTERM/SIGINT."""
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    if dialect != "postgresql" and threads > 1:
+        # without SKIP LOCKED concurrent claimers would pick the same rows
+        logger.warning("%s has no FOR UPDATE SKIP LOCKED; running a single sender thread", dialect)
+        threads = 1
+    stop = threading.Event()
+    pool_lock = threading.Lock()
+    pool_state: dict = {"key": None, "pool": None}
+
+    def current_pool() -> SMTPPool:
+        # settings edited in the web UI take effect without restarting the worker
+        smtp = settings.smtp()
+        key = tuple(sorted(smtp.items()))
+        with pool_lock:
+            if pool_state["key"] != key:
+                if pool_state["pool"] is not None:
+                    # other threads may be sending on it; their connections close as they return them
+                    pool_state["pool"].close()
+                pool_state.update(key=key, pool=SMTPPool.from_config(smtp, size=threads))
+            return pool_state["pool"]
+
+    def loop() -> None:
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    handled = deliver_batch(current_pool(), batch_size)
+                except Exception:  # noqa: BLE001
+                    logger.exception("notification batch failed")
+                    db.session.rollback()
+                    handled = 0
+                finally:
+                    db.session.remove()
+                if handled == 0:
+                    if once:
+                        return
+                    stop.wait(poll_interval)
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    workers = [threading.Thread(target=loop, name=f"notify-{i}", daemon=True) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        while worker.is_alive():
+            worker.join(timeout=1)
+    if pool_state["pool"] is not None:
+        pool_state["pool"].close()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+import base64
+from datetime import datetime
+from typing import Any, Optional
+
+from flask import current_app
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, int]]:
+    """Return (created_at, id) from an opaque cursor, or None if it is missing or invalid."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def parse_per_page(args) -> int:
+    """Page size from ?per_page=, clamped to [1, MAX_PAGE_SIZE]."""
+    try:
+        per_page = int(args.get("per_page") or current_app.config["PAGE_SIZE"])
+    except ValueError:
+        per_page = current_app.config["PAGE_SIZE"]
+    return max(1, min(per_page, current_app.config["MAX_PAGE_SIZE"]))
+
+
+class KeysetPage:
+    def __init__(self, items: list[Any], next_cursor: Optional[str], per_page: int):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def keyset_paginate(query, model, cursor: Optional[str], per_page: int) -> KeysetPage:
+    """Newest-first page over (created_at, id).
+
+    The row-value comparison lets the database walk a (…, created_at, id) index
+    and stop after per_page + 1 rows instead of sorting the whole table.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(*position))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return KeysetPage(rows, next_cursor, per_page)
@@ -0,0 +1,317 @@
+"""Disk cache and process pool for work-order PDFs.
+
+A PDF is stored under UPLOAD_FOLDER/pdf_cache keyed by order id, the
+updated_at of the order and of the cliente, vendedor and usuario it prints,
+and a hash of the print template, so a reprint is a send_file of an existing
+file. pisa runs in a small process pool; the web worker only renders the HTML
+and hands it over. Changes to an order's pagos or descripciones bump
+ordenes.updated_at, and cached files of touched orders are removed on commit.
+A finished render also removes the order's files under older keys (say, a
+cliente or template change that no commit of the order itself cleaned up).
+
+Batch exports reuse the same cache. Every order of the batch is submitted to
+the pool up front, and the response starts only once all of them are on disk
+(within PDF_BATCH_TIMEOUT), so a failed render is reported instead of cutting a
+200 short. The ZIP is then streamed from those files. A merged PDF is built by
+pypdf in a pool process into a temp file, which is streamed and removed.
+"""
+from __future__ import annotations
+import glob
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, Optional
+
+from flask import current_app, render_template
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.util import identity_key
+
+
+from ..extensions import db
+from ..models import Descripcion, Orden, Pago
+from ..queries import ordenes_list
+from . import settings
+from .streams import ChunkSink
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE = "ordenes/print.html"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_inflight: dict[str, Future] = {}
+_failed: dict[str, tuple[float, BaseException]] = {}
+FAILURE_TTL = 60  # seconds a failed render is reported before it is tried again
+_lock = threading.Lock()
+_template_version: Optional[str] = None
+
+
+def render_to_file(html: str, dest: str) -> str:
+    """Runs in the pool: write the PDF next to dest and move it into place atomically."""
+    from xhtml2pdf import pisa
+
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        status = pisa.CreatePDF(src=html, dest=fh)  # noqa: S602
+    if status.err:
+        os.remove(tmp)
+        raise RuntimeError(f"pisa reported {status.err} errors")
+    os.replace(tmp, dest)
+    return dest
+
+
+def merge_to_file(paths: list[str], dest: str) -> str:
+    """Runs in the pool: concatenate PDFs into dest, so the web worker never holds them in memory."""
+    from pypdf import PdfWriter  # installed with xhtml2pdf
+
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    with open(dest, "wb") as fh:
+        writer.write(fh)
+    writer.close()
+    return dest
+
+
+def executor() -> ProcessPoolExecutor:
+    global _executor, _executor_pid
+    with _lock:
+        # a pool created before gunicorn forked belongs to the master; build our own
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config["PDF_RENDER_PROCESSES"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def cache_dir() -> str:
+    path = os.path.join(current_app.config["UPLOAD_FOLDER"], "pdf_cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def template_version() -> str:
+    global _template_version
+    if _template_version is None:
+        env = current_app.jinja_env
+        source, _, _ = env.loader.get_source(env, TEMPLATE)
+        _template_version = hashlib.sha1(source.encode()).hexdigest()[:12]
+    return _template_version
+
+
+def cache_key(orden: Orden) -> str:
+    # the template prints the names of these rows; renaming one must not serve the old PDF
+    related = (orden.cliente, orden.vendedor, orden.usuario)
+    stamps = ":".join(r.updated_at.isoformat() if r is not None else "-" for r in related)
+    raw = f"{orden.id}:{orden.updated_at.isoformat()}:{stamps}:{template_version()}:{settings.empresa_huella()}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def cache_path(orden: Orden) -> str:
+    return os.path.join(cache_dir(), f"orden_{orden.id}_{cache_key(orden)}.pdf")
+
+
+def render_html(orden: Orden) -> str:
+    return render_template(TEMPLATE, orden=orden, empresa=settings.empresa())
+
+
+def submit(orden: Orden) -> Future:
+    """Schedule a render for this order version unless one is already running.
+
+    A render that failed in the last FAILURE_TTL seconds is not retried: its
+    error is handed to the next caller once (the PDF view polls after a 202),
+    and only then may a new render start.
+    """
+    path = cache_path(orden)
+    orden_id = orden.id
+    with _lock:
+        future = _inflight.get(path)
+        if future is not None:
+            return future
+        now = time.monotonic()
+        for stale in [p for p, (at, _) in _failed.items() if now - at > FAILURE_TTL]:
+            del _failed[stale]
+        failed = _failed.pop(path, None)
+    if failed is not None:
+        future = Future()
+        future.set_exception(failed[1])
+        return future
+    future = executor().submit(render_to_file, render_html(orden), path)
+    with _lock:
+        _inflight[path] = future
+
+    def _done(f: Future) -> None:
+        with _lock:
+            _inflight.pop(path, None)
+            if f.exception() is not None:
+                _failed[path] = (time.monotonic(), f.exception())
+                return
+            keep = {path, *_inflight}
+        _remove_cached(os.path.dirname(path), orden_id, keep)
+
+    future.add_done_callback(_done)
+    return future
+
+
+def cached_or_submit(orden: Orden) -> tuple[Optional[str], Optional[Future]]:
+    """Return (path, None) for a cached PDF, otherwise (None, future) of its render."""
+    path = cache_path(orden)
+    if os.path.exists(path):
+        return path, None
+    return None, submit(orden)
+
+
+def _remove_cached(folder: str, orden_id: int, keep=()) -> None:
+    for path in glob.glob(os.path.join(folder, f"orden_{int(orden_id)}_*.pdf")):
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def invalidate(orden_ids) -> None:
+    folder = os.path.join(current_app.config["UPLOAD_FOLDER"], "pdf_cache")
+    for orden_id in orden_ids:
+        _remove_cached(folder, orden_id)
+
+
+def batch(filtros: dict, limit: int) -> list[Orden]:
+    """Orders for a batch export in id order; one more than `limit` signals an oversized batch."""
+    return (
+        ordenes_list(filtros)
+        .options(selectinload(Orden.descripciones))
+        .order_by(Orden.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+
+def render_all(ordenes: list[Orden], timeout: Optional[float] = None) -> list[tuple[Orden, str]]:
+    """Render a batch in parallel and return (orden, path) once every PDF is on disk.
+
+    Raises the first render error, or TimeoutError after `timeout` seconds
+    (PDF_BATCH_TIMEOUT by default) for the batch as a whole.
+    """
+    timeout = current_app.config["PDF_BATCH_TIMEOUT"] if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    pending = [(orden, *cached_or_submit(orden)) for orden in ordenes]
+    rendered = []
+    for orden, path, future in pending:
+        if future is not None:
+            path = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        rendered.append((orden, path))
+    return rendered
+
+
+def stream_zip(rendered: list[tuple[Orden, str]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """One PDF per order in a ZIP, emitted file by file (ZIP data descriptors, no seeking)."""
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for orden, path in rendered:
+            with open(path, "rb") as src, zf.open(f"orden_{orden.id}.pdf", "w") as dest:
+                while block := src.read(chunk_size):
+                    dest.write(block)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def merge(rendered: list[tuple[Orden, str]], timeout: Optional[float] = None) -> str:
+    """Merge rendered PDFs in a pool process; return the temp file, which the caller removes."""
+    timeout = current_app.config["PDF_BATCH_TIMEOUT"] if timeout is None else timeout
+    fd, dest = tempfile.mkstemp(prefix="lote_", suffix=".pdf", dir=cache_dir())
+    os.close(fd)
+    try:
+        return executor().submit(merge_to_file, [path for _, path in rendered], dest).result(timeout=timeout)
+    except BaseException:
+        os.remove(dest)
+        raise
+
+
+def stream_file(path: str, chunk_size: int = 64 * 1024, remove: bool = False) -> Iterator[bytes]:
+    try:
+        with open(path, "rb") as fh:
+            while block := fh.read(chunk_size):
+                yield block
+    finally:
+        if remove:
+            os.remove(path)
+
+
+def _touched(session) -> set:
+    return session.info.setdefault("pdf_touched", set())
+
+
+def touch(session, orden_ids: set[int], bump: bool = True) -> None:
+    """For Core writes that change what orders print: new updated_at (unless already set) and cleanup on commit."""
+    if bump:
+        ordenes = Orden.__table__
+        session.connection().execute(
+            ordenes.update().where(ordenes.c.id.in_(orden_ids)).values(updated_at=datetime.utcnow())
+        )
+    _touched(session).update(orden_ids)
+
+
+@event.listens_for(db.session, "before_flush")
+def _collect_deleted(session, flush_context, instances):
+    for obj in session.deleted:
+        if isinstance(obj, Orden):
+            _touched(session).add(obj.id)
+        elif isinstance(obj, (Pago, Descripcion)):
+            _touched(session).add(obj.orden_id)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changed(session, flush_context):
+    children = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Orden) and obj in session.dirty:
+            _touched(session).add(obj.id)
+        elif isinstance(obj, (Pago, Descripcion)):
+            hist = inspect(obj).attrs.orden_id.history
+            children.update(v for v in (*hist.deleted, obj.orden_id) if v is not None)
+    children.discard(None)
+    if children:
+        # the order's own row did not change, but its printed content did
+        ordenes = Orden.__table__
+        session.connection().execute(
+            ordenes.update().where(ordenes.c.id.in_(children)).values(updated_at=datetime.utcnow())
+        )
+        session.info.setdefault("pdf_expire", set()).update(children)
+        _touched(session).update(children)
+
+
+@event.listens_for(db.session, "after_flush_postexec")
+def _expire_updated_at(session, flush_context):
+    for orden_id in session.info.pop("pdf_expire", ()):
+        orden = session.identity_map.get(identity_key(Orden, orden_id))
+        if orden is not None:
+            session.expire(orden, ["updated_at"])
+
+
+@event.listens_for(db.session, "after_commit")
+def _drop_cached_files(session):
+    touched = session.info.pop("pdf_touched", None)
+    if touched:
+        try:
+            invalidate(touched)
+        except RuntimeError:  # no app context (e.g. scripts); stale files are unreachable anyway
+            logger.debug("skipping PDF cache cleanup outside app context")
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard(session, previous_transaction):
+    session.info.pop("pdf_touched", None)
+    session.info.pop("pdf_expire", None)
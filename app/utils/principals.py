@@ -0,0 +1,113 @@
+"""Per-worker cache of the logged-in user, for Flask-Login's user_loader.
+
+Each request needs id, nombre, rol and email. These are kept as a small
+Principal in an LRU dict (USER_CACHE_SIZE entries, USER_CACHE_TTL seconds)
+instead of being loaded from usuarios every time. Writes to Usuario bump the
+"usuarios" counter in cache_versions within the same transaction. Every
+worker reads the counter at most once per USER_CACHE_CHECK_SECONDS and
+empties its cache when the counter has moved. The worker that made the
+change drops the affected entries as soon as the transaction commits.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, select
+
+from ..extensions import db
+from ..models import Usuario
+from . import versions
+
+VERSION = "usuarios"
+
+_cache: OrderedDict[int, tuple[float, "Principal"]] = OrderedDict()
+_lock = threading.Lock()
+_version = {"value": None, "checked": 0.0}
+
+
+class Principal(UserMixin):
+    """Read-only stand-in for Usuario as current_user."""
+    __slots__ = ("id", "nombre", "rol", "email")
+
+    def __init__(self, id: int, nombre: str, rol: str, email: str):
+        self.id = id
+        self.nombre = nombre
+        self.rol = rol
+        self.email = email
+
+    def __repr__(self) -> str:
+        return f"<Principal {self.email}>"
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def _check_version(now: float, interval: float) -> None:
+    if now - _version["checked"] < interval:
+        return
+    actual = versions.get(VERSION)
+    with _lock:
+        if actual != _version["value"]:
+            _cache.clear()
+            _version["value"] = actual
+        _version["checked"] = now
+
+
+def load(user_id: int) -> Optional[Principal]:
+    cfg = current_app.config
+    ttl = cfg["USER_CACHE_TTL"]
+    now = time.monotonic()
+    if ttl > 0:
+        _check_version(now, cfg["USER_CACHE_CHECK_SECONDS"])
+        with _lock:
+            entry = _cache.get(user_id)
+            if entry is not None and now - entry[0] < ttl:
+                _cache.move_to_end(user_id)
+                return entry[1]
+    row = db.session.execute(
+        select(Usuario.id, Usuario.nombre, Usuario.rol, Usuario.email).where(Usuario.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    principal = Principal(*row)
+    if ttl > 0:
+        with _lock:
+            _cache[user_id] = (now, principal)
+            _cache.move_to_end(user_id)
+            while len(_cache) > cfg["USER_CACHE_SIZE"]:
+                _cache.popitem(last=False)
+    return principal
+
+
+# -- invalidation on write ------------------------------------------------------------------
+
+versions.track(Usuario, VERSION)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changed(session, flush_context):
+    changed = {
+        obj.id for obj in session.dirty if isinstance(obj, Usuario) and session.is_modified(obj)
+    } | {obj.id for obj in session.deleted if isinstance(obj, Usuario)}
+    if changed:
+        session.info.setdefault("principals_changed", set()).update(changed)
+
+
+@event.listens_for(db.session, "after_commit")
+def _drop_changed(session):
+    changed = session.info.pop("principals_changed", None)
+    if changed:
+        with _lock:
+            for user_id in changed:
+                _cache.pop(user_id, None)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_changed(session, previous_transaction):
+    session.info.pop("principals_changed", None)
@@ -0,0 +1,99 @@
+"""Monthly sales, collections and commission reports by vendedor and categoria.
+
+The reports read only from two materialized views that the migration creates:
+reporte_vendedores_mes, with one row per (mes, vendedor_id), and
+reporte_categorias_mes, which rolls the first view up per categoria. Orders
+count towards the month of their fecha. Payments count towards the month
+they were received. Reading a year of data is a scan of a few hundred rows.
+It does not aggregate ordenes or pagos.
+
+The views are as fresh as their last refresh. ``flask refresh-reportes``
+refreshes them CONCURRENTLY, so reports keep reading the old rows meanwhile.
+It runs once, or every REPORTES_REFRESH_SECONDS with --loop. Each refresh bumps the
+"reportes" counter in cache_versions, whose updated_at is shown as the data
+date. Off PostgreSQL the migration creates plain views and refresh() only
+bumps the counter.
+
+Commission is cobrado × COMISION_RATE, computed when the report is read.
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import Column, Date, Integer, MetaData, Numeric, String, Table, bindparam, func, select, text
+
+from ..extensions import db
+from . import versions
+
+VERSION = "reportes"
+LOCK_KEY = 0x7265706F  # pg advisory lock shared by every refresher
+
+# Created by migration 6d2a9f4e1b73, outside db.metadata so create_all and autogenerate leave them alone
+metadata = MetaData()
+vendedores_mes = Table(
+    "reporte_vendedores_mes", metadata,
+    Column("mes", Date), Column("vendedor_id", Integer), Column("vendedor", String),
+    Column("categoria_id", Integer), Column("categoria", String), Column("ordenes", Integer),
+    Column("ventas", Numeric(14, 2)), Column("cobrado", Numeric(14, 2)),
+)
+categorias_mes = Table(
+    "reporte_categorias_mes", metadata,
+    Column("mes", Date), Column("categoria_id", Integer), Column("categoria", String),
+    Column("vendedores", Integer), Column("ordenes", Integer),
+    Column("ventas", Numeric(14, 2)), Column("cobrado", Numeric(14, 2)),
+)
+VISTAS = (vendedores_mes, categorias_mes)  # refresh order: the second is built from the first
+TIPOS = {"vendedores": vendedores_mes, "categorias": categorias_mes}
+
+
+def parse_mes(value: Optional[str]) -> Optional[date]:
+    """First day of a YYYY-MM month, or None when missing or malformed."""
+    try:
+        return datetime.strptime((value or "").strip()[:7], "%Y-%m").date()
+    except ValueError:
+        return None
+
+
+def _shift(mes: date, meses: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def rango(args, today: Optional[date] = None) -> tuple[date, date]:
+    """(desde, hasta) months from args; defaults to the twelve months up to the current one."""
+    hasta = parse_mes(args.get("hasta")) or (today or date.today()).replace(day=1)
+    desde = parse_mes(args.get("desde")) or _shift(hasta, -11)
+    return min(desde, hasta), max(desde, hasta)
+
+
+def query(tipo: str, desde: date, hasta: date):
+    """Rows of one report view between two months (inclusive), newest month first, with comision."""
+    vista = TIPOS[tipo]
+    rate = bindparam("comision_rate", Decimal(str(current_app.config["COMISION_RATE"])), type_=Numeric(6, 4))
+    clave = vista.c.vendedor if tipo == "vendedores" else vista.c.categoria
+    return (
+        select(*vista.c, func.round(vista.c.cobrado * rate, 0, type_=Numeric(14, 0)).label("comision"))
+        .where(vista.c.mes >= desde, vista.c.mes <= hasta)
+        .order_by(vista.c.mes.desc(), clave)
+    )
+
+
+def actualizado() -> Optional[datetime]:
+    """When the views were last refreshed."""
+    return versions.state([VERSION])[VERSION][1]
+
+
+def refresh() -> bool:
+    """Refresh both views and bump the counter; False when another refresh holds the lock."""
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": LOCK_KEY}).scalar():
+            db.session.rollback()
+            return False
+        for vista in VISTAS:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {vista.name}"))
+    versions.bump(conn, VERSION)
+    db.session.commit()
+    return True
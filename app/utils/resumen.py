@@ -0,0 +1,206 @@
+"""Daily summary table behind the dashboard.
+
+``resumen_diario`` holds one row per (fecha, vendedor_id, estado_trabajo) with
+order count, ventas, pagos and orders still owing. Flushes that touch an Orden
+or Pago mark the affected days, and those days alone are recomputed at the end
+of the flush, so dashboard totals are a SUM over a few hundred rows instead of
+the full ordenes/pagos history. ``flask rebuild-resumen`` rebuilds everything.
+
+A day is recomputed under a PostgreSQL advisory lock keyed on its date, so two
+transactions refreshing the same day run one after the other and the second
+replaces the rows the first committed instead of adding to them.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, case, event, func, inspect, or_, select, text
+
+from ..extensions import db
+from ..models import Orden, Pago, ResumenDiario, Vendedor
+
+resumen_table = ResumenDiario.__table__
+LOCK_KEY = 0x72657375  # pg advisory lock namespace; the second key is the day
+
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _history_values(obj, attr: str) -> list:
+    hist = inspect(obj).attrs[attr].history
+    return [v for v in (*hist.deleted, getattr(obj, attr)) if v is not None]
+
+
+def _pending(session) -> dict:
+    return session.info.setdefault("resumen", {"dias": set(), "ordenes": set(), "pagos_de": set()})
+
+
+@event.listens_for(db.session, "before_flush")
+def _collect_deleted(session, flush_context, instances):
+    pending = _pending(session)
+    for obj in session.deleted:
+        if isinstance(obj, Orden):
+            pending["dias"].update(_as_date(v) for v in _history_values(obj, "fecha"))
+        elif isinstance(obj, Pago):
+            pending["dias"].update(_as_date(v) for v in _history_values(obj, "fecha"))
+            pending["ordenes"].update(_history_values(obj, "orden_id"))
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_changed(session, flush_context):
+    pending = _pending(session)
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Orden):
+            pending["dias"].update(_as_date(v) for v in _history_values(obj, "fecha"))
+            state = inspect(obj)
+            if obj in session.dirty and (
+                state.attrs.vendedor_id.history.has_changes() or state.attrs.estado_trabajo.history.has_changes()
+            ):
+                # its pagos are bucketed under the order's vendedor/estado
+                pending["pagos_de"].add(obj.id)
+        elif isinstance(obj, Pago):
+            pending["dias"].update(_as_date(v) for v in _history_values(obj, "fecha"))
+            pending["ordenes"].update(_history_values(obj, "orden_id"))
+
+
+@event.listens_for(db.session, "after_flush_postexec")
+def _refresh_pending(session, flush_context):
+    pending = session.info.pop("resumen", None)
+    if not pending:
+        return
+    conn = session.connection()
+    dias = set(pending["dias"])
+    if pending["ordenes"]:
+        dias.update(conn.execute(select(Orden.fecha).where(Orden.id.in_(pending["ordenes"]))).scalars())
+    if pending["pagos_de"]:
+        dias.update(
+            _as_date(d)
+            for d in conn.execute(
+                select(func.date(Pago.fecha)).where(Pago.orden_id.in_(pending["pagos_de"])).distinct()
+            ).scalars()
+        )
+    dias.discard(None)
+    if dias:
+        refresh_days(conn, dias)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    session.info.pop("resumen", None)
+
+
+def _compute(conn, dias: Optional[set[date]] = None) -> list[dict]:
+    key = lambda fecha, vendedor_id, estado: (_as_date(fecha), vendedor_id, estado or "pendiente")  # noqa: E731
+    rows: dict[tuple, dict] = defaultdict(
+        lambda: {"ordenes": 0, "ventas": Decimal(0), "pagos": Decimal(0), "pendientes": 0}
+    )
+
+    ordenes_q = select(
+        Orden.fecha,
+        Orden.vendedor_id,
+        Orden.estado_trabajo,
+        func.count(Orden.id),
+        func.coalesce(func.sum(Orden.precio_total), 0),
+        func.coalesce(func.sum(case((Orden.saldo > 0, 1), else_=0)), 0),
+    ).group_by(Orden.fecha, Orden.vendedor_id, Orden.estado_trabajo)
+    if dias is not None:
+        ordenes_q = ordenes_q.where(Orden.fecha.in_(dias))
+    for fecha, vendedor_id, estado, n, ventas, pendientes in conn.execute(ordenes_q):
+        row = rows[key(fecha, vendedor_id, estado)]
+        row.update(ordenes=n, ventas=Decimal(ventas), pendientes=int(pendientes))
+
+    dia_pago = func.date(Pago.fecha)
+    pagos_q = (
+        select(dia_pago, Orden.vendedor_id, Orden.estado_trabajo, func.coalesce(func.sum(Pago.monto), 0))
+        .join(Orden, Pago.orden_id == Orden.id)
+        .group_by(dia_pago, Orden.vendedor_id, Orden.estado_trabajo)
+    )
+    if dias is not None:
+        # range predicates so ix_pagos_fecha is usable
+        pagos_q = pagos_q.where(or_(*(
+            and_(Pago.fecha >= datetime.combine(d, datetime.min.time()),
+                 Pago.fecha < datetime.combine(d + timedelta(days=1), datetime.min.time()))
+            for d in dias
+        )))
+    for fecha, vendedor_id, estado, monto in conn.execute(pagos_q):
+        rows[key(fecha, vendedor_id, estado)]["pagos"] = Decimal(monto)
+
+    return [
+        {"fecha": fecha, "vendedor_id": vendedor_id, "estado_trabajo": estado, **valores}
+        for (fecha, vendedor_id, estado), valores in rows.items()
+    ]
+
+
+def refresh_days(conn, dias: Iterable[date]) -> None:
+    dias = set(dias)
+    if conn.dialect.name == "postgresql":
+        # Sorted so concurrent refreshes of overlapping days cannot deadlock; held until commit
+        for dia in sorted(dias):
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key, :dia)"), {"key": LOCK_KEY, "dia": dia.toordinal()})
+    conn.execute(resumen_table.delete().where(resumen_table.c.fecha.in_(dias)))
+    filas = _compute(conn, dias)
+    if filas:
+        conn.execute(resumen_table.insert(), filas)
+
+
+def rebuild(chunk_size: int = 5000) -> int:
+    """Recompute the whole summary table; return the number of rows written."""
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        # Waits for and then blocks refresh_days, whose rows would otherwise survive the delete
+        conn.execute(text("LOCK TABLE resumen_diario IN SHARE ROW EXCLUSIVE MODE"))
+    filas = _compute(conn)
+    conn.execute(resumen_table.delete())
+    for start in range(0, len(filas), chunk_size):
+        conn.execute(resumen_table.insert(), filas[start:start + chunk_size])
+    db.session.commit()
+    return len(filas)
+
+
+def totales(desde: Optional[date] = None, hasta: Optional[date] = None) -> dict:
+    query = db.session.query(
+        func.coalesce(func.sum(ResumenDiario.ordenes), 0),
+        func.coalesce(func.sum(ResumenDiario.ventas), 0),
+        func.coalesce(func.sum(ResumenDiario.pagos), 0),
+        func.coalesce(func.sum(ResumenDiario.pendientes), 0),
+    )
+    if desde:
+        query = query.filter(ResumenDiario.fecha >= desde)
+    if hasta:
+        query = query.filter(ResumenDiario.fecha <= hasta)
+    ordenes, ventas, pagos, pendientes = query.one()
+    return {"ordenes": ordenes, "ventas": Decimal(ventas), "pagos": Decimal(pagos), "pendientes": pendientes}
+
+
+def periodos(hoy: Optional[date] = None) -> dict[str, dict]:
+    hoy = hoy or date.today()
+    return {
+        "hoy": totales(hoy, hoy),
+        "semana": totales(hoy - timedelta(days=hoy.weekday()), hoy),
+        "mes": totales(hoy.replace(day=1), hoy),
+    }
+
+
+def por_vendedor(desde: Optional[date] = None) -> list:
+    query = (
+        db.session.query(
+            Vendedor.nombre,
+            func.coalesce(func.sum(ResumenDiario.ordenes), 0).label("ordenes"),
+            func.coalesce(func.sum(ResumenDiario.ventas), 0).label("ventas"),
+            func.coalesce(func.sum(ResumenDiario.pagos), 0).label("pagos"),
+        )
+        .select_from(ResumenDiario)
+        .outerjoin(Vendedor, ResumenDiario.vendedor_id == Vendedor.id)
+        .group_by(ResumenDiario.vendedor_id, Vendedor.nombre)
+        .order_by(func.sum(ResumenDiario.ventas).desc())
+    )
+    if desde:
+        query = query.filter(ResumenDiario.fecha >= desde)
+    return query.all()
@@ -0,0 +1,135 @@
+"""Keep Orden.abono / Orden.saldo / Orden.estado_pago in step with pagos.
+
+Every flush that touches a Pago turns into one ``UPDATE ordenes SET abono =
+abono + delta`` per affected order, so the persisted totals never need the
+correlated SUM(pagos.monto) again. ``flask reconcile-saldos`` recomputes them
+from scratch for rows written outside the ORM.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import case, event, inspect, literal, select, func
+from sqlalchemy.orm.util import identity_key
+
+from ..extensions import db
+from ..models import Orden, Pago
+
+ordenes_table = Orden.__table__
+
+
+def estado_pago_expr(abono, saldo):
+    return case(
+        (saldo <= 0, literal("pagado")),
+        (abono > 0, literal("abonado")),
+        else_=literal("pendiente"),
+    )
+
+
+def estado_pago_for(abono: Decimal, saldo: Decimal) -> str:
+    if saldo <= 0:
+        return "pagado"
+    if abono > 0:
+        return "abonado"
+    return "pendiente"
+
+
+def _dec(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _old_and_new(obj, attr: str):
+    hist = inspect(obj).attrs[attr].history
+    new = getattr(obj, attr)
+    old = hist.deleted[0] if hist.deleted else new
+    return old, new
+
+
+@event.listens_for(db.session, "before_flush")
+def _sync_orden_saldo(session, flush_context, instances):
+    # Deleted rows are gone by after_flush, so read what they held now
+    deltas = session.info.setdefault("pago_deltas", defaultdict(Decimal))
+    for pago in session.deleted:
+        if isinstance(pago, Pago):
+            old_orden, _ = _old_and_new(pago, "orden_id")
+            old_monto, _ = _old_and_new(pago, "monto")
+            deltas[old_orden] -= _dec(old_monto)
+
+    # precio_total typed in the form: saldo follows it against the stored abono
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Orden):
+            continue
+        if obj in session.dirty and not inspect(obj).attrs.precio_total.history.has_changes():
+            continue
+        abono = _dec(obj.abono)
+        obj.abono = abono
+        obj.saldo = _dec(obj.precio_total) - abono
+        obj.estado_pago = estado_pago_for(obj.abono, obj.saldo)
+
+
+@event.listens_for(db.session, "after_flush")
+def _apply_pago_deltas(session, flush_context):
+    deltas: dict[int, Decimal] = session.info.pop("pago_deltas", None) or defaultdict(Decimal)
+    for pago in session.new:
+        if isinstance(pago, Pago):
+            deltas[pago.orden_id] += _dec(pago.monto)
+    for pago in session.dirty:
+        if isinstance(pago, Pago) and session.is_modified(pago):
+            old_orden, new_orden = _old_and_new(pago, "orden_id")
+            old_monto, new_monto = _old_and_new(pago, "monto")
+            deltas[old_orden] -= _dec(old_monto)
+            deltas[new_orden] += _dec(new_monto)
+
+    deltas = {orden_id: delta for orden_id, delta in deltas.items() if orden_id is not None and delta}
+    if not deltas:
+        return
+    conn = session.connection()
+    for orden_id, delta in deltas.items():
+        abono = ordenes_table.c.abono + delta
+        saldo = ordenes_table.c.saldo - delta
+        conn.execute(
+            ordenes_table.update()
+            .where(ordenes_table.c.id == orden_id)
+            .values(abono=abono, saldo=saldo, estado_pago=estado_pago_expr(abono, saldo))
+        )
+    session.info.setdefault("saldos_stale", set()).update(deltas)
+
+
+@event.listens_for(db.session, "after_flush_postexec")
+def _expire_stale_ordenes(session, flush_context):
+    for orden_id in session.info.pop("saldos_stale", ()):
+        orden = session.identity_map.get(identity_key(Orden, orden_id))
+        if orden is not None:
+            session.expire(orden, ["abono", "saldo", "estado_pago"])
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_pending_deltas(session, previous_transaction):
+    session.info.pop("pago_deltas", None)
+    session.info.pop("saldos_stale", None)
+
+
+def reconcile(chunk_size: int = 5000, min_id: int = 0) -> int:
+    """Recompute abono/saldo/estado_pago from pagos in id-range chunks; return rows changed."""
+    pagado = (
+        select(func.coalesce(func.sum(Pago.monto), 0))
+        .where(Pago.orden_id == ordenes_table.c.id)
+        .scalar_subquery()
+    )
+    saldo = ordenes_table.c.precio_total - pagado
+    max_id = db.session.query(func.max(Orden.id)).scalar() or 0
+    changed = 0
+    for start in range(min_id, max_id + 1, chunk_size):
+        result = db.session.execute(
+            ordenes_table.update()
+            .where(ordenes_table.c.id >= start, ordenes_table.c.id < start + chunk_size)
+            .where(
+                (ordenes_table.c.abono != pagado)
+                | (ordenes_table.c.saldo != saldo)
+                | (ordenes_table.c.estado_pago != estado_pago_expr(pagado, saldo))
+            )
+            .values(abono=pagado, saldo=saldo, estado_pago=estado_pago_expr(pagado, saldo))
+        )
+        changed += result.rowcount or 0
+        db.session.commit()
+    return changed
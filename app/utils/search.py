@@ -0,0 +1,79 @@
+"""Cliente search.
+
+On PostgreSQL every searchable column has a pg_trgm GIN index, so the
+substring ILIKE predicates (and the fuzzy `%` match on nombre) are answered
+from the indexes and results are ranked by trigram similarity. Other
+databases fall back to plain ILIKE ordered by name.
+"""
+from __future__ import annotations
+import logging
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import OperationalError
+
+from ..extensions import db
+from ..models import Cliente
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (Cliente.nombre, Cliente.correo, Cliente.rut, Cliente.telefono)
+
+
+class SearchPage:
+    def __init__(self, items: list, page: int, per_page: int, has_next: bool):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+
+
+def _is_postgres() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+def escape_like(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filter_clientes(query, q: str):
+    """Restrict and rank any query over Cliente columns by `q`."""
+    like = f"%{escape_like(q)}%"
+    predicates = [col.ilike(like, escape="\\") for col in COLUMNS]
+    if _is_postgres():
+        predicates.append(Cliente.nombre.op("%")(q))  # typo-tolerant match on the name
+        rank = func.greatest(*(func.similarity(func.coalesce(col, ""), q) for col in COLUMNS))
+        return query.filter(or_(*predicates)).order_by(rank.desc(), Cliente.id)
+    return query.filter(or_(*predicates)).order_by(Cliente.nombre, Cliente.id)
+
+
+def search_clientes(q: str, page: int = 1, per_page: int = 50) -> SearchPage:
+    """Ranked, offset-paginated clientes matching `q` on nombre, correo, rut or telefono."""
+    page = max(page, 1)
+    rows = (
+        filter_clientes(Cliente.query, q)
+        .offset((page - 1) * per_page)
+        .limit(per_page + 1)
+        .all()
+    )
+    return SearchPage(rows[:per_page], page, per_page, len(rows) > per_page)
+
+
+def autocomplete(q: str, limit: Optional[int] = None) -> list[dict]:
+    """Top matches as plain dicts; an empty list when `q` is too short or the time budget runs out."""
+    cfg = current_app.config
+    q = q.strip()
+    if len(q) < cfg["SEARCH_MIN_CHARS"]:
+        return []
+    limit = max(1, min(limit or cfg["AUTOCOMPLETE_LIMIT"], cfg["AUTOCOMPLETE_LIMIT"]))
+    query = db.session.query(Cliente.id, Cliente.nombre, Cliente.rut, Cliente.correo, Cliente.telefono)
+    try:
+        if _is_postgres():
+            # SET LOCAL ends with the request's transaction
+            db.session.execute(select(func.set_config("statement_timeout", f"{cfg['AUTOCOMPLETE_TIMEOUT_MS']}ms", True)))
+        return [row._asdict() for row in filter_clientes(query, q).limit(limit).all()]
+    except OperationalError as exc:  # statement_timeout cancels the query
+        db.session.rollback()
+        logger.warning("autocomplete for %r exceeded its budget: %s", q, exc.orig)
+        return []
@@ -0,0 +1,146 @@
+"""Runtime settings stored in settings/company_configs, cached in every worker.
+
+Reads (SMTP on every send, the company header on every printed order) come
+from an in-process snapshot. A value missing from the table falls back to
+the environment config. Any flushed change to Setting or CompanyConfig bumps
+the "settings" counter in cache_versions within the same transaction. The
+writing worker reloads right after commit; the others notice the new counter
+within SETTINGS_CHECK_SECONDS and reload too.
+"""
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from flask import current_app
+from sqlalchemy import event, select
+
+from ..extensions import db
+from ..models import CompanyConfig, Setting
+from . import versions
+
+VERSION = "settings"
+
+
+def _bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on", "si", "sí")
+
+
+# Editable keys, stored as text, with the parser that restores the config type
+SMTP: dict[str, Callable[[str], Any]] = {
+    "SMTP_HOST": str,
+    "SMTP_PORT": int,
+    "SMTP_USE_TLS": _bool,
+    "SMTP_USERNAME": str,
+    "SMTP_PASSWORD": str,
+    "SMTP_FROM": str,
+}
+EMPRESA_CAMPOS = ("nombre", "rut", "direccion", "telefono", "email")
+
+_lock = threading.Lock()
+_snapshot: dict[str, Any] = {"version": None, "checked": 0.0, "valores": {}, "empresa": None, "huella": ""}
+
+
+def _load() -> None:
+    version = versions.get(VERSION)
+    valores = {}
+    for clave, valor in db.session.execute(select(Setting.clave, Setting.valor)):
+        parse = SMTP.get(clave, str)
+        try:
+            valores[clave] = parse(valor) if valor is not None else None
+        except ValueError:
+            continue  # a bad stored value falls back to the environment
+    row = db.session.scalars(select(CompanyConfig).order_by(CompanyConfig.id).limit(1)).first()
+    empresa = {campo: getattr(row, campo) for campo in EMPRESA_CAMPOS} if row else None
+    huella = hashlib.sha1(repr(sorted((empresa or {}).items())).encode()).hexdigest()[:8]
+    with _lock:
+        _snapshot.update(version=version, valores=valores, empresa=empresa, huella=huella, checked=time.monotonic())
+
+
+def _current() -> dict[str, Any]:
+    now = time.monotonic()
+    if now - _snapshot["checked"] >= current_app.config["SETTINGS_CHECK_SECONDS"]:
+        if versions.get(VERSION) != _snapshot["version"]:
+            _load()
+        else:
+            _snapshot["checked"] = now
+    return _snapshot
+
+
+def get(clave: str, default: Any = None) -> Any:
+    valores = _current()["valores"]
+    if valores.get(clave) is not None:
+        return valores[clave]
+    return current_app.config.get(clave, default)
+
+
+def smtp() -> dict[str, Any]:
+    """Effective SMTP settings, in the shape SMTPPool.from_config expects."""
+    cfg = current_app.config
+    valores = {clave: get(clave) for clave in SMTP}
+    valores.update(SMTP_POOL_SIZE=cfg.get("SMTP_POOL_SIZE", 2), SMTP_TIMEOUT=cfg.get("SMTP_TIMEOUT", 10))
+    return valores
+
+
+def empresa() -> Optional[dict]:
+    return _current()["empresa"]
+
+
+def empresa_huella() -> str:
+    """Changes whenever the company data printed on documents does."""
+    return _current()["huella"]
+
+
+def save(valores: dict[str, Any]) -> None:
+    """Upsert settings (None deletes the key, restoring the environment value)."""
+    existentes = {s.clave: s for s in Setting.query.filter(Setting.clave.in_(valores))}
+    for clave, valor in valores.items():
+        setting = existentes.get(clave)
+        if valor is None:
+            if setting is not None:
+                db.session.delete(setting)
+            continue
+        texto = ("true" if valor else "false") if isinstance(valor, bool) else str(valor)
+        if setting is None:
+            db.session.add(Setting(clave=clave, valor=texto))
+        else:
+            setting.valor = texto
+    db.session.commit()
+
+
+def save_empresa(datos: dict[str, Any]) -> None:
+    row = CompanyConfig.query.order_by(CompanyConfig.id).first() or CompanyConfig()
+    for campo in EMPRESA_CAMPOS:
+        setattr(row, campo, datos.get(campo) or None)
+    db.session.add(row)
+    db.session.commit()
+
+
+# -- invalidation on write ------------------------------------------------------------------
+
+versions.track(Setting, VERSION)
+versions.track(CompanyConfig, VERSION)
+
+
+def _touches_settings(session) -> bool:
+    objs = list(session.new) + list(session.deleted) + [o for o in session.dirty if session.is_modified(o)]
+    return any(isinstance(o, (Setting, CompanyConfig)) for o in objs)
+
+
+@event.listens_for(db.session, "after_flush")
+def _mark_changed(session, flush_context):
+    if _touches_settings(session):
+        session.info["settings_changed"] = True
+
+
+@event.listens_for(db.session, "after_commit")
+def _reload_after_commit(session):
+    if session.info.pop("settings_changed", False):
+        with _lock:
+            _snapshot["checked"] = 0.0  # next read compares the counter and reloads
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _discard_changed(session, previous_transaction):
+    session.info.pop("settings_changed", None)
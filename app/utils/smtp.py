@@ -0,0 +1,118 @@
+"""Small pool of reusable SMTP connections.
+
+Opening a session (TCP + EHLO + STARTTLS + AUTH) costs more than sending a
+message, so the outbox worker and campaigns borrow long-lived connections
+from here and only reconnect when one goes stale or fails. close() may run
+while other threads still hold connections (the worker replaces its pool when
+the SMTP settings change): idle connections are closed at once, and borrowed
+ones when they are given back.
+"""
+from __future__ import annotations
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class _PooledSMTP:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    def __init__(self, host: str, port: int, use_tls: bool = False, username: str = "", password: str = "",
+                 size: int = 2, timeout: float = 10.0, max_uses: int = 500, idle_check: float = 30.0):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.idle_check = idle_check
+        self._idle: queue.LifoQueue[_PooledSMTP] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, cfg, size: int | None = None) -> "SMTPPool":
+        return cls(
+            host=cfg.get("SMTP_HOST"),
+            port=int(cfg.get("SMTP_PORT")),
+            use_tls=bool(cfg.get("SMTP_USE_TLS")),
+            username=cfg.get("SMTP_USERNAME") or "",
+            password=cfg.get("SMTP_PASSWORD") or "",
+            size=size or cfg.get("SMTP_POOL_SIZE", 2),
+            timeout=cfg.get("SMTP_TIMEOUT", 10),
+        )
+
+    def _connect(self) -> _PooledSMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return _PooledSMTP(server)
+
+    @staticmethod
+    def _discard(conn: _PooledSMTP) -> None:
+        try:
+            conn.server.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.server.close()
+
+    def _checkout(self) -> _PooledSMTP:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if conn.uses >= self.max_uses:
+                self._discard(conn)
+                continue
+            if time.monotonic() - conn.last_used > self.idle_check:
+                try:
+                    if conn.server.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("noop failed")
+                except (smtplib.SMTPException, OSError):
+                    conn.server.close()
+                    continue
+            return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """Borrow a connection; it goes back to the pool unless the block raised."""
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn.server
+            except BaseException:
+                conn.server.close()
+                raise
+            conn.uses += 1
+            conn.last_used = time.monotonic()
+            with self._lock:
+                if not self._closed:
+                    self._idle.put(conn)
+                    conn = None
+            if conn is not None:
+                self._discard(conn)  # returned to a closed pool
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Close idle connections now and every borrowed one as it comes back."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+
+class ChunkSink:
+    """Write-only, non-seekable file object that hands written bytes to a generator.
+
+    zipfile writes to it with data descriptors (no seeking back), so a ZIP
+    based download can be yielded entry by entry instead of built in memory.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
@@ -0,0 +1,211 @@
+"""Synthetic data at production-like volumes, for benchmarks and load tests.
+
+Rows are built in memory one chunk of orders at a time, together with their
+descripciones and pagos, and written with bulk_insert (COPY on PostgreSQL).
+Ids are assigned here, so children need no RETURNING round trip. abono,
+saldo and estado_pago are computed alongside the pagos, and resumen_diario
+is rebuilt at the end. The same seed always yields the same data.
+"""
+from __future__ import annotations
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+
+from ..extensions import db
+from ..models import Categoria, Cliente, Descripcion, Orden, Pago, Usuario, Vendedor
+from . import resumen, versions
+from .importer import bulk_insert, sync_sequence
+from .saldos import estado_pago_for
+
+NOMBRES = ("Ana", "Benjamín", "Camila", "Diego", "Elena", "Felipe", "Gabriela", "Héctor", "Isidora", "Joaquín",
+           "Karen", "Luis", "María", "Nicolás", "Olga", "Pablo", "Rocío", "Sebastián", "Valentina", "Tomás")
+APELLIDOS = ("González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda",
+             "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres", "Araya", "Flores", "Espinoza", "Castillo")
+EMPRESAS = ("Comercial", "Inversiones", "Distribuidora", "Constructora", "Servicios", "Agrícola", "Transportes")
+PRODUCTOS = (("Tarjetas de presentación", 25, 60), ("Volantes carta", 500, 90), ("Pendón roller", 1, 45000),
+             ("Talonario de boletas", 10, 4500), ("Adhesivos troquelados", 200, 120), ("Carpeta corporativa", 100, 900),
+             ("Afiche A3", 50, 700), ("Letrero PVC", 1, 28000), ("Diseño gráfico", 1, 35000), ("Libreta anillada", 30, 2500))
+METODOS = ("transferencia", "efectivo", "tarjeta")
+IVA = Decimal("0.19")
+
+
+def _rut(n: int) -> str:
+    digits, factor, total = str(n), 2, 0
+    for d in reversed(digits):
+        total += int(d) * factor
+        factor = 2 if factor == 7 else factor + 1
+    dv = 11 - total % 11
+    return f"{n}-{'0' if dv == 11 else 'K' if dv == 10 else dv}"
+
+
+def _persona(rng: random.Random) -> str:
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+
+def _next_id(model) -> int:
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+class Generator:
+    def __init__(self, seed: int = 1, years: int = 3, chunk_size: int = 5000,
+                 echo: Callable[[str], None] = print):
+        self.rng = random.Random(seed)
+        self.hasta = date.today()
+        self.desde = self.hasta - timedelta(days=365 * years)
+        self.chunk_size = chunk_size
+        self.echo = echo
+        self.counts = {"clientes": 0, "ordenes": 0, "descripciones": 0, "pagos": 0}
+
+    def _catalogos(self, vendedores: int, usuarios: int) -> tuple[list[int], list[int]]:
+        rng = self.rng
+        categorias = []
+        for nombre in ("Offset", "Digital", "Gran formato", "Diseño", "Terminaciones"):
+            cat = Categoria.query.filter_by(nombre=nombre).first() or Categoria(nombre=nombre)
+            db.session.add(cat)
+            categorias.append(cat)
+        base = _next_id(Usuario)
+        password = generate_password_hash("bench1234")  # hashed once; it is deliberately slow
+        nuevos_usuarios = [
+            Usuario(nombre=_persona(rng), email=f"usuario{base + i}@bench.local", rol="staff", password_hash=password)
+            for i in range(usuarios)
+        ]
+        nuevos_vendedores = [
+            Vendedor(nombre=_persona(rng), rut=_rut(rng.randint(5_000_000, 25_000_000)),
+                     correo=f"vendedor{i}@bench.local", categoria=rng.choice(categorias))
+            for i in range(vendedores)
+        ]
+        db.session.add_all(nuevos_usuarios + nuevos_vendedores)
+        db.session.commit()
+        return [v.id for v in nuevos_vendedores], [u.id for u in nuevos_usuarios]
+
+    def _clientes(self, total: int) -> list[int]:
+        rng = self.rng
+        base = _next_id(Cliente)
+        for start in range(0, total, self.chunk_size):
+            records = []
+            for i in range(base + start, base + min(start + self.chunk_size, total)):
+                persona = rng.random() < 0.6
+                nombre = _persona(rng) if persona else f"{rng.choice(EMPRESAS)} {rng.choice(APELLIDOS)} SpA"
+                creado = datetime.combine(self.desde, datetime.min.time()) + timedelta(minutes=i % 1_500_000)
+                records.append({
+                    "id": i, "nombre": nombre,
+                    "rut": _rut(rng.randint(5_000_000, 25_000_000) if persona else rng.randint(76_000_000, 78_000_000)),
+                    "telefono": f"+569{rng.randint(10_000_000, 99_999_999)}",
+                    "correo": f"cliente{i}@{'gmail.com' if persona else 'empresa.cl'}",
+                    "created_at": creado, "updated_at": creado,
+                })
+            bulk_insert(Cliente, records)
+            db.session.commit()
+        sync_sequence(Cliente)
+        versions.bump(db.session.connection(), "clientes")
+        db.session.commit()
+        self.counts["clientes"] += total
+        return list(range(base, base + total))
+
+    def _estados(self, fecha: date) -> tuple[str, str]:
+        edad = (self.hasta - fecha).days
+        if edad > 30:
+            return "listo", "despachado" if self.rng.random() < 0.95 else "pendiente"
+        trabajo = self.rng.choices(("pendiente", "en_proceso", "listo"), (3, 4, 3))[0]
+        return trabajo, "despachado" if trabajo == "listo" and self.rng.random() < 0.5 else "pendiente"
+
+    def _montos_pagos(self, total: Decimal, fecha: date) -> list[Decimal]:
+        """Old orders are mostly paid; recent ones carry a deposit or nothing yet."""
+        rng = self.rng
+        edad = (self.hasta - fecha).days
+        destino = rng.choices(("pagado", "abonado", "pendiente"), (90, 7, 3) if edad > 60 else (40, 40, 20))[0]
+        if destino == "pendiente" or total <= 0:
+            return []
+        if destino == "abonado":
+            return [(total * Decimal(rng.choice((30, 40, 50))) / 100).quantize(Decimal(1))]
+        cuotas = rng.choices((1, 2, 3), (5, 4, 1))[0]
+        montos = [(total / cuotas).quantize(Decimal(1)) for _ in range(cuotas - 1)]
+        return montos + [total - sum(montos)]
+
+    def _ordenes(self, total: int, lineas_por_orden: float, clientes: list[int], vendedores: list[int],
+                 usuarios: list[int]) -> None:
+        if not clientes:
+            clientes = list(db.session.scalars(select(Cliente.id).order_by(Cliente.id)))
+        rng = self.rng
+        dias = (self.hasta - self.desde).days
+        orden_id, desc_id, pago_id = _next_id(Orden), _next_id(Descripcion), _next_id(Pago)
+        # a few regular customers place most of the orders
+        habituales = clientes[: max(1, len(clientes) // 10)]
+        for start in range(0, total, self.chunk_size):
+            ordenes, descripciones, pagos = [], [], []
+            for _ in range(min(self.chunk_size, total - start)):
+                # skewed towards recent dates, like a growing shop
+                fecha = self.desde + timedelta(days=int(dias * rng.random() ** 0.7))
+                creado = datetime.combine(fecha, datetime.min.time()) + timedelta(minutes=rng.randint(540, 1140))
+                neto = Decimal(0)
+                for _ in range(max(1, round(rng.expovariate(1 / lineas_por_orden)))):
+                    texto, cantidad, precio = rng.choice(PRODUCTOS)
+                    cantidad *= rng.randint(1, 4)
+                    precio = Decimal(precio)
+                    descripciones.append({
+                        "id": desc_id, "orden_id": orden_id, "texto": texto, "cantidad": cantidad,
+                        "precio_unitario": precio, "subtotal": precio * cantidad,
+                        "created_at": creado, "updated_at": creado,
+                    })
+                    desc_id += 1
+                    neto += precio * cantidad
+                iva = (neto * IVA).quantize(Decimal(1))
+                abono = Decimal(0)
+                for n, monto in enumerate(self._montos_pagos(neto + iva, fecha)):
+                    pagado = creado + timedelta(days=n * rng.randint(1, 20), hours=rng.randint(0, 8))
+                    pagos.append({
+                        "id": pago_id, "orden_id": orden_id, "monto": monto, "fecha": pagado,
+                        "metodo": rng.choice(METODOS), "usuario_id": rng.choice(usuarios),
+                        "created_at": pagado, "updated_at": pagado,
+                    })
+                    pago_id += 1
+                    abono += monto
+                trabajo, despacho = self._estados(fecha)
+                ordenes.append({
+                    "id": orden_id,
+                    "cliente_id": rng.choice(habituales if rng.random() < 0.5 else clientes),
+                    "usuario_id": rng.choice(usuarios),
+                    "vendedor_id": rng.choice(vendedores) if vendedores and rng.random() < 0.8 else None,
+                    "fecha": fecha, "precio_neto": neto, "iva": iva, "precio_total": neto + iva,
+                    "abono": abono, "saldo": neto + iva - abono,
+                    "estado_pago": estado_pago_for(abono, neto + iva - abono),
+                    "estado_trabajo": trabajo, "estado_despacho": despacho,
+                    "observaciones": "Retira en tienda" if rng.random() < 0.1 else None,
+                    "created_at": creado, "updated_at": creado,
+                })
+                orden_id += 1
+            bulk_insert(Orden, ordenes)
+            bulk_insert(Descripcion, descripciones)
+            bulk_insert(Pago, pagos)
+            db.session.commit()
+            self.counts["ordenes"] += len(ordenes)
+            self.counts["descripciones"] += len(descripciones)
+            self.counts["pagos"] += len(pagos)
+            self.echo(f"  {self.counts['ordenes']}/{total} ordenes")
+        for model in (Orden, Descripcion, Pago):
+            sync_sequence(model)
+        db.session.commit()
+
+    def generate(self, clientes: int = 50_000, ordenes: int = 500_000, lineas_por_orden: float = 2.0,
+                 vendedores: int = 25, usuarios: int = 10) -> dict[str, int]:
+        started = time.perf_counter()
+        vendedor_ids, usuario_ids = self._catalogos(vendedores, usuarios)
+        cliente_ids = self._clientes(clientes) if clientes else []
+        self.echo(f"  {clientes} clientes")
+        if ordenes:
+            self._ordenes(ordenes, lineas_por_orden, cliente_ids, vendedor_ids, usuario_ids)
+            self.echo("  rebuilding resumen_diario")
+            resumen.rebuild()
+        self.counts["segundos"] = round(time.perf_counter() - started, 1)
+        return self.counts
+
+
+def generate(seed: int = 1, years: int = 3, chunk_size: int = 5000, echo: Optional[Callable] = None,
+             **volumes) -> dict[str, int]:
+    """Add synthetic rows (see Generator.generate for the volume keywords); returns the counts."""
+    return Generator(seed, years, chunk_size, echo or print).generate(**volumes)
@@ -0,0 +1,137 @@
+"""Order totals derived from their line items (descripciones).
+
+An order with descripciones gets precio_neto = SUM(cantidad * precio_unitario),
+iva = precio_neto * IVA_RATE rounded to whole pesos and precio_total = neto +
+iva. saldo and estado_pago follow against the stored abono. Each step is one
+set-based statement over every order in the batch: one UPDATE for the
+subtotals, and one UPDATE ... FROM an aggregate subquery for the order
+columns. That second statement returns the fechas whose resumen_diario rows
+need refreshing.
+
+Orders without line items keep their typed totals. The exception is an
+order whose last line is removed through apply(), which drops to zero.
+``flask recompute-totales`` re-derives every order that has line items.
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, or_, select, update
+
+from ..extensions import db
+from ..models import Descripcion, Orden
+from . import pdf, resumen
+from .saldos import estado_pago_expr
+
+descripciones_table = Descripcion.__table__
+ordenes_table = Orden.__table__
+
+
+def _recompute(conn, filtro: Callable, vacias: bool) -> dict[int, date]:
+    """Recompute subtotals and totals of the orders matched by filtro(orden_id column).
+
+    With vacias, matched orders without line items are set to zero as well.
+    Returns {orden_id: fecha} of the orders whose totals changed.
+    """
+    d, o = descripciones_table, ordenes_table
+    subtotal = func.coalesce(d.c.cantidad, 0) * func.coalesce(d.c.precio_unitario, 0)
+    conn.execute(
+        update(d).where(filtro(d.c.orden_id), or_(d.c.subtotal.is_(None), d.c.subtotal != subtotal))
+        .values(subtotal=subtotal)
+    )
+    lineas = o.outerjoin(d, d.c.orden_id == o.c.id) if vacias else o.join(d, d.c.orden_id == o.c.id)
+    netos = (
+        select(o.c.id.label("orden_id"), func.coalesce(func.sum(d.c.subtotal), 0).label("neto"))
+        .select_from(lineas)
+        .where(filtro(o.c.id))
+        .group_by(o.c.id)
+        .subquery()
+    )
+    rate = bindparam("iva_rate", Decimal(str(current_app.config["IVA_RATE"])), type_=db.Numeric(6, 4))
+    iva = func.round(netos.c.neto * rate, 0)  # pesos have no cents
+    total = netos.c.neto + iva
+    saldo = total - o.c.abono
+    result = conn.execute(
+        update(o)
+        .where(o.c.id == netos.c.orden_id)
+        .where(or_(o.c.precio_neto != netos.c.neto, o.c.iva != iva, o.c.precio_total != total))
+        .values(
+            precio_neto=netos.c.neto, iva=iva, precio_total=total, saldo=saldo,
+            estado_pago=estado_pago_expr(o.c.abono, saldo), updated_at=datetime.utcnow(),
+        )
+        .returning(o.c.id, o.c.fecha)
+    )
+    return dict(result.all())
+
+
+def recompute_ordenes(orden_ids: Iterable[int], vacias: bool = False) -> set[date]:
+    """Re-derive the given orders' totals in the current transaction and refresh their resumen days."""
+    orden_ids = list(orden_ids)
+    if not orden_ids:
+        return set()
+    conn = db.session.connection()
+    cambiadas = _recompute(conn, lambda col: col.in_(orden_ids), vacias)
+    if cambiadas:
+        resumen.refresh_days(conn, set(cambiadas.values()))
+        pdf.touch(db.session, set(cambiadas), bump=False)
+    return set(cambiadas.values())
+
+
+def apply(orden: Orden, filas: list[dict]) -> dict[str, int]:
+    """Make `filas` the complete set of line items of `orden`, then re-derive its totals.
+
+    Rows with an "id" update that line, rows without one are inserted, and
+    existing lines missing from `filas` are deleted. Raises ValueError when
+    an id belongs to another order. Does not commit.
+    """
+    existentes = set(db.session.scalars(select(Descripcion.id).where(Descripcion.orden_id == orden.id)))
+    ids = {f["id"] for f in filas if f.get("id")}
+    ajenos = ids - existentes
+    if ajenos:
+        raise ValueError(f"descripciones {sorted(ajenos)} no pertenecen a la orden {orden.id}")
+    now = datetime.utcnow()
+    campos = ("texto", "cantidad", "precio_unitario")
+    nuevas = [
+        {"orden_id": orden.id, "created_at": now, "updated_at": now, **{c: f[c] for c in campos}}
+        for f in filas if not f.get("id")
+    ]
+    editadas = [
+        {"b_id": f["id"], "b_updated_at": now, **{f"b_{c}": f[c] for c in campos}} for f in filas if f.get("id")
+    ]
+    eliminadas = existentes - ids
+
+    d = descripciones_table
+    if eliminadas:
+        db.session.execute(delete(d).where(d.c.id.in_(eliminadas)))
+    if editadas:
+        db.session.execute(
+            update(d).where(d.c.id == bindparam("b_id"))
+            .values({c: bindparam(f"b_{c}") for c in (*campos, "updated_at")}),
+            editadas,
+        )
+    if nuevas:
+        db.session.execute(insert(d), nuevas)
+    pdf.touch(db.session, {orden.id})  # the printed lines changed even when the totals did not
+    recompute_ordenes([orden.id], vacias=True)
+    db.session.expire(orden)
+    return {"nuevas": len(nuevas), "editadas": len(editadas), "eliminadas": len(eliminadas)}
+
+
+def recompute_all(chunk_size: int = 5000, echo: Optional[Callable[[str], None]] = None) -> int:
+    """Re-derive the totals of every order with line items, in id-range chunks; return the days touched."""
+    max_id = db.session.query(func.max(Orden.id)).scalar() or 0
+    dias: set[date] = set()
+    for start in range(0, max_id + 1, chunk_size):
+        dias.update(_recompute(
+            db.session.connection(), lambda col: (col >= start) & (col < start + chunk_size), vacias=False
+        ).values())
+        db.session.commit()
+        if echo:
+            echo(f"  {min(start + chunk_size - 1, max_id)}/{max_id} ordenes")
+    dias = sorted(dias)
+    for start in range(0, len(dias), 500):
+        resumen.refresh_days(db.session.connection(), dias[start:start + 500])
+    db.session.commit()
+    return len(dias)
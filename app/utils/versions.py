@@ -0,0 +1,52 @@
+"""Shared version counters (cache_versions) for cross-worker cache invalidation.
+
+A write bumps its counter in the same transaction as the change. Each worker
+compares the counter with the value it cached and drops what is stale.
+Models registered with track() bump their counter on every flush that inserts,
+updates or deletes one of their rows.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import event, insert, select, update
+
+from ..extensions import db
+from ..models import CacheVersion
+
+table = CacheVersion.__table__
+
+_tracked: dict[type, str] = {}
+
+
+def bump(conn, nombre: str) -> None:
+    """Increment `nombre` on `conn` (usually session.connection(), inside the writing transaction)."""
+    result = conn.execute(update(table).where(table.c.nombre == nombre).values(version=table.c.version + 1))
+    if result.rowcount == 0:
+        conn.execute(insert(table).values(nombre=nombre, version=1))
+
+
+def get(nombre: str) -> int:
+    return db.session.execute(select(table.c.version).where(table.c.nombre == nombre)).scalar() or 0
+
+
+def state(nombres: Iterable[str]) -> dict[str, tuple[int, Optional[datetime]]]:
+    """{nombre: (version, updated_at)} in one query; counters never bumped read as (0, None)."""
+    nombres = list(nombres)
+    rows = db.session.execute(
+        select(table.c.nombre, table.c.version, table.c.updated_at).where(table.c.nombre.in_(nombres))
+    )
+    found = {nombre: (version, updated_at) for nombre, version, updated_at in rows}
+    return {nombre: found.get(nombre, (0, None)) for nombre in nombres}
+
+
+def track(model: type, nombre: str) -> None:
+    _tracked[model] = nombre
+
+
+@event.listens_for(db.session, "after_flush")
+def _bump_tracked(session, flush_context):
+    objs = list(session.new) + list(session.deleted) + [o for o in session.dirty if session.is_modified(o)]
+    nombres = {_tracked[type(o)] for o in objs if type(o) in _tracked}
+    for nombre in sorted(nombres):  # fixed order, so concurrent writers lock the rows alike
+        bump(session.connection(), nombre)
@@ -3,29 +3,16 @@ set -euo pipefail
 
 cd /app
 
+export FLASK_APP=run.py
+
 # Wait for DB
-echo "Waiting for database..."
-python - <<'PY'
-import os, time
-import psycopg2
-host=os.getenv('DB_HOST','db')
-port=os.getenv('DB_PORT','5432')
-user=os.getenv('POSTGRES_USER','postgres')
-password=os.getenv('POSTGRES_PASSWORD','postgres')
-db=os.getenv('POSTGRES_DB','printshop')
-for i in range(30):
-    try:
-        psycopg2.connect(host=host, port=port, user=user, password=password, dbname=db).close()
-        print('DB is ready')
-        break
-    except Exception as e:
-        print('DB not ready yet:', e)
-        time.sleep(2)
-else:
-    raise SystemExit('Database not reachable')
-PY
+flask wait-db --timeout 60
 
-export FLASK_APP=run.py
+# Auxiliary services (e.g. the notification worker) reuse this image with their own command;
+# only the web service runs migrations.
+if [ "$#" -gt 0 ]; then
+  exec "$@"
+fi
 
 # Initialize or upgrade database
 if [ ! -d "migrations" ]; then
@@ -37,8 +24,17 @@ fi
 echo "Applying migrations..."
 flask db upgrade || (echo "Running migrate then upgrade" && flask db migrate -m "autogen" && flask db upgrade)
 
+# The bind mount in docker-compose hides the static/dist built into the image
+echo "Building static assets..."
+flask build-assets > /dev/null
+
 echo "Ensuring admin user..."
 flask ensure-admin
 
+# Per-worker metric snapshots from a previous run would be summed into /metrics
+if [ -n "${METRICS_DIR:-}" ]; then
+  rm -rf "$METRICS_DIR"
+fi
+
 # Start app
-exec gunicorn -w 3 -b 0.0.0.0:8000 run:app
\ No newline at end of file
+exec gunicorn -w "${WEB_WORKERS:-3}" --threads "${WEB_THREADS:-1}" -b 0.0.0.0:8000 run:app
\ No newline at end of file
@@ -97,6 +97,13 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        postgres = connection.dialect.name == 'postgresql'
+        if postgres:
+            # The engine sets DB_STATEMENT_TIMEOUT_MS at connect time (app.pool);
+            # backfills, index builds and view refreshes must not hit it
+            connection.exec_driver_sql('SET statement_timeout = 0')
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -106,6 +113,11 @@ def run_migrations_online():
         with context.begin_transaction():
             context.run_migrations()
 
+        if postgres:
+            # back to the connect-time default before the connection returns to the pool
+            connection.exec_driver_sql('RESET statement_timeout')
+            connection.commit()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,36 @@
+"""cache version counters
+
+Revision ID: 0a7d3e5c91b4
+Revises: f1c6d2e83a47
+Create Date: 2026-10-18 17:02:31.518204
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7d3e5c91b4'
+down_revision = 'f1c6d2e83a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table('cache_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nombre')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(cache_versions, [{'nombre': 'usuarios', 'version': 1, 'created_at': now, 'updated_at': now}])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,50 @@
+"""logs audit indexes
+
+Also makes logs.usuario_id ON DELETE SET NULL, so deleting a user who has
+audit rows keeps them.
+
+Revision ID: 3b8f2d6a4c19
+Revises: 9c41e7a2d5b8
+Create Date: 2026-10-18 20:11:48.530192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f2d6a4c19'
+down_revision = '9c41e7a2d5b8'
+branch_labels = None
+depends_on = None
+
+# initial created the foreign key unnamed; these are the names it gets
+PG_FK = 'logs_usuario_id_fkey'
+SQLITE_FK = 'fk_logs_usuario_id_usuarios'
+NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _usuario_fk(ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('logs', schema=None, naming_convention=NAMING) as batch_op:
+            batch_op.drop_constraint(SQLITE_FK, type_='foreignkey')
+            batch_op.create_foreign_key(SQLITE_FK, 'usuarios', ['usuario_id'], ['id'], ondelete=ondelete)
+    else:
+        op.drop_constraint(PG_FK, 'logs', type_='foreignkey')
+        op.create_foreign_key(PG_FK, 'logs', 'usuarios', ['usuario_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    with op.batch_alter_table('logs', schema=None) as batch_op:
+        batch_op.create_index('ix_logs_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_logs_entidad_entidad_id_created_at_id', ['entidad', 'entidad_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_logs_usuario_id_created_at_id', ['usuario_id', 'created_at', 'id'], unique=False)
+    _usuario_fk('SET NULL')
+
+
+def downgrade():
+    _usuario_fk(None)
+    with op.batch_alter_table('logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_logs_usuario_id_created_at_id')
+        batch_op.drop_index('ix_logs_entidad_entidad_id_created_at_id')
+        batch_op.drop_index('ix_logs_created_at_id')
@@ -0,0 +1,38 @@
+"""ordenes keyset indexes
+
+Revision ID: 3b9d2c71a4f0
+Revises: e1a347842332
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2c71a4f0'
+down_revision = 'e1a347842332'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.create_index('ix_ordenes_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_ordenes_estado_trabajo_created_at_id', ['estado_trabajo', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_ordenes_estado_despacho_created_at_id', ['estado_despacho', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_ordenes_estado_pago_created_at_id', ['estado_pago', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_ordenes_cliente_id_created_at_id', ['cliente_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_ordenes_vendedor_id_created_at_id', ['vendedor_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_ordenes_fecha', ['fecha'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.drop_index('ix_ordenes_fecha')
+        batch_op.drop_index('ix_ordenes_vendedor_id_created_at_id')
+        batch_op.drop_index('ix_ordenes_cliente_id_created_at_id')
+        batch_op.drop_index('ix_ordenes_estado_pago_created_at_id')
+        batch_op.drop_index('ix_ordenes_estado_despacho_created_at_id')
+        batch_op.drop_index('ix_ordenes_estado_trabajo_created_at_id')
+        batch_op.drop_index('ix_ordenes_created_at_id')
@@ -0,0 +1,35 @@
+"""settings cache version
+
+Revision ID: 5e2b8c14d7f3
+Revises: 0a7d3e5c91b4
+Create Date: 2026-10-18 17:40:12.904117
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8c14d7f3'
+down_revision = '0a7d3e5c91b4'
+branch_labels = None
+depends_on = None
+
+cache_versions = sa.table(
+    'cache_versions',
+    sa.column('nombre', sa.String),
+    sa.column('version', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def upgrade():
+    now = datetime.utcnow()
+    op.bulk_insert(cache_versions, [{'nombre': 'settings', 'version': 1, 'created_at': now, 'updated_at': now}])
+
+
+def downgrade():
+    op.execute(cache_versions.delete().where(cache_versions.c.nombre == 'settings'))
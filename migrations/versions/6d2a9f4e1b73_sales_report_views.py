@@ -0,0 +1,95 @@
+"""sales report views
+
+Revision ID: 6d2a9f4e1b73
+Revises: 3b8f2d6a4c19
+Create Date: 2026-10-18 21:02:44.731905
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2a9f4e1b73'
+down_revision = '3b8f2d6a4c19'
+branch_labels = None
+depends_on = None
+
+cache_versions = sa.table(
+    'cache_versions',
+    sa.column('nombre', sa.String),
+    sa.column('version', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+# Orders count towards the month of Orden.fecha, collections towards the month of Pago.fecha
+VENDEDORES = """
+{create} reporte_vendedores_mes AS
+WITH movimientos AS (
+    SELECT {mes_orden} AS mes, o.vendedor_id, count(*) AS ordenes, sum(o.precio_total) AS ventas, 0 AS cobrado
+    FROM ordenes o
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT {mes_pago}, o.vendedor_id, 0, 0, sum(p.monto)
+    FROM pagos p JOIN ordenes o ON o.id = p.orden_id
+    GROUP BY 1, 2
+)
+SELECT m.mes,
+       coalesce(m.vendedor_id, 0) AS vendedor_id,
+       coalesce(v.nombre, 'Sin vendedor') AS vendedor,
+       coalesce(v.categoria_id, 0) AS categoria_id,
+       coalesce(c.nombre, 'Sin categoría') AS categoria,
+       sum(m.ordenes) AS ordenes,
+       sum(m.ventas) AS ventas,
+       sum(m.cobrado) AS cobrado
+FROM movimientos m
+LEFT JOIN vendedores v ON v.id = m.vendedor_id
+LEFT JOIN categorias c ON c.id = v.categoria_id
+GROUP BY m.mes, m.vendedor_id, v.nombre, v.categoria_id, c.nombre
+"""
+
+CATEGORIAS = """
+{create} reporte_categorias_mes AS
+SELECT mes, categoria_id, categoria,
+       sum(CASE WHEN vendedor_id <> 0 THEN 1 ELSE 0 END) AS vendedores,
+       sum(ordenes) AS ordenes,
+       sum(ventas) AS ventas,
+       sum(cobrado) AS cobrado
+FROM reporte_vendedores_mes
+GROUP BY mes, categoria_id, categoria
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        fmt = dict(
+            create='CREATE MATERIALIZED VIEW',
+            mes_orden="date_trunc('month', o.fecha)::date",
+            mes_pago="date_trunc('month', p.fecha)::date",
+        )
+        op.execute(VENDEDORES.format(**fmt) + 'WITH DATA')
+        op.execute(CATEGORIAS.format(**fmt) + 'WITH DATA')
+        # REFRESH ... CONCURRENTLY needs a unique index without a WHERE clause
+        op.execute('CREATE UNIQUE INDEX ux_reporte_vendedores_mes ON reporte_vendedores_mes (mes, vendedor_id)')
+        op.execute('CREATE UNIQUE INDEX ux_reporte_categorias_mes ON reporte_categorias_mes (mes, categoria_id)')
+    else:
+        # No materialized views elsewhere: plain views, computed on read (development only)
+        fmt = dict(
+            create='CREATE VIEW',
+            mes_orden="date(o.fecha, 'start of month')",
+            mes_pago="date(p.fecha, 'start of month')",
+        )
+        op.execute(VENDEDORES.format(**fmt))
+        op.execute(CATEGORIAS.format(**fmt))
+    now = datetime.utcnow()
+    op.bulk_insert(cache_versions, [{'nombre': 'reportes', 'version': 1, 'created_at': now, 'updated_at': now}])
+
+
+def downgrade():
+    op.execute(cache_versions.delete().where(cache_versions.c.nombre == 'reportes'))
+    kind = 'MATERIALIZED VIEW' if op.get_bind().dialect.name == 'postgresql' else 'VIEW'
+    op.execute(f'DROP {kind} reporte_categorias_mes')
+    op.execute(f'DROP {kind} reporte_vendedores_mes')
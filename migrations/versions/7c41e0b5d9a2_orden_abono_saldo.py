@@ -0,0 +1,47 @@
+"""orden abono saldo
+
+Revision ID: 7c41e0b5d9a2
+Revises: 3b9d2c71a4f0
+Create Date: 2026-10-18 10:02:17.530114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41e0b5d9a2'
+down_revision = '3b9d2c71a4f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('abono', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('saldo', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False))
+
+    # Backfill from existing pagos; later drift is repaired with `flask reconcile-saldos`
+    op.execute("""
+        UPDATE ordenes SET abono = COALESCE((SELECT SUM(p.monto) FROM pagos p WHERE p.orden_id = ordenes.id), 0)
+    """)
+    op.execute("""
+        UPDATE ordenes SET
+            saldo = precio_total - abono,
+            estado_pago = CASE
+                WHEN precio_total - abono <= 0 THEN 'pagado'
+                WHEN abono > 0 THEN 'abonado'
+                ELSE 'pendiente'
+            END
+    """)
+
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.create_index('ix_ordenes_con_saldo', ['fecha', 'id'], unique=False,
+                              postgresql_where=sa.text('saldo > 0'), sqlite_where=sa.text('saldo > 0'))
+
+
+def downgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.drop_index('ix_ordenes_con_saldo')
+        batch_op.drop_column('saldo')
+        batch_op.drop_column('abono')
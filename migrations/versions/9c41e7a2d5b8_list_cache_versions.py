@@ -0,0 +1,39 @@
+"""list cache versions
+
+Revision ID: 9c41e7a2d5b8
+Revises: 5e2b8c14d7f3
+Create Date: 2026-10-18 19:05:37.218406
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41e7a2d5b8'
+down_revision = '5e2b8c14d7f3'
+branch_labels = None
+depends_on = None
+
+cache_versions = sa.table(
+    'cache_versions',
+    sa.column('nombre', sa.String),
+    sa.column('version', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+NOMBRES = ('clientes', 'vendedores', 'categorias')
+
+
+def upgrade():
+    now = datetime.utcnow()
+    op.bulk_insert(cache_versions, [
+        {'nombre': nombre, 'version': 1, 'created_at': now, 'updated_at': now} for nombre in NOMBRES
+    ])
+
+
+def downgrade():
+    op.execute(cache_versions.delete().where(cache_versions.c.nombre.in_(NOMBRES)))
@@ -0,0 +1,27 @@
+"""ordenes cliente con saldo index
+
+Revision ID: a5e3c8d1f264
+Revises: 6d2a9f4e1b73
+Create Date: 2026-10-18 21:48:09.264117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5e3c8d1f264'
+down_revision = '6d2a9f4e1b73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.create_index('ix_ordenes_cliente_con_saldo', ['cliente_id', 'fecha', 'id'], unique=False,
+                              postgresql_where=sa.text('saldo > 0'), sqlite_where=sa.text('saldo > 0'))
+
+
+def downgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.drop_index('ix_ordenes_cliente_con_saldo')
@@ -0,0 +1,64 @@
+"""resumen diario
+
+Revision ID: a5f83e6c2d17
+Revises: 7c41e0b5d9a2
+Create Date: 2026-10-18 11:24:05.902731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5f83e6c2d17'
+down_revision = '7c41e0b5d9a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resumen_diario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('vendedor_id', sa.Integer(), nullable=True),
+    sa.Column('estado_trabajo', sa.String(length=50), nullable=False),
+    sa.Column('ordenes', sa.Integer(), nullable=False),
+    sa.Column('ventas', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('pagos', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('pendientes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('resumen_diario', schema=None) as batch_op:
+        batch_op.create_index('ix_resumen_diario_fecha_vendedor_estado', ['fecha', 'vendedor_id', 'estado_trabajo'], unique=False)
+
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.create_index('ix_pagos_fecha', ['fecha'], unique=False)
+
+    # Initial fill; `flask rebuild-resumen` does the same from Python
+    op.execute("""
+        INSERT INTO resumen_diario (fecha, vendedor_id, estado_trabajo, ordenes, ventas, pagos, pendientes, created_at, updated_at)
+        SELECT fecha, vendedor_id, estado_trabajo, SUM(n), SUM(ventas), SUM(pagos), SUM(pendientes), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+        FROM (
+            SELECT fecha, vendedor_id, estado_trabajo, COUNT(*) AS n, SUM(precio_total) AS ventas, 0 AS pagos,
+                   SUM(CASE WHEN saldo > 0 THEN 1 ELSE 0 END) AS pendientes
+            FROM ordenes
+            GROUP BY fecha, vendedor_id, estado_trabajo
+            UNION ALL
+            SELECT DATE(p.fecha), o.vendedor_id, o.estado_trabajo, 0, 0, SUM(p.monto), 0
+            FROM pagos p JOIN ordenes o ON o.id = p.orden_id
+            GROUP BY DATE(p.fecha), o.vendedor_id, o.estado_trabajo
+        ) t
+        GROUP BY fecha, vendedor_id, estado_trabajo
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.drop_index('ix_pagos_fecha')
+
+    with op.batch_alter_table('resumen_diario', schema=None) as batch_op:
+        batch_op.drop_index('ix_resumen_diario_fecha_vendedor_estado')
+
+    op.drop_table('resumen_diario')
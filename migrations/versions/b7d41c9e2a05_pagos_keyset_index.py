@@ -0,0 +1,26 @@
+"""pagos keyset index
+
+Revision ID: b7d41c9e2a05
+Revises: a5e3c8d1f264
+Create Date: 2026-10-18 23:12:40.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41c9e2a05'
+down_revision = 'a5e3c8d1f264'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.create_index('ix_pagos_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pagos', schema=None) as batch_op:
+        batch_op.drop_index('ix_pagos_created_at_id')
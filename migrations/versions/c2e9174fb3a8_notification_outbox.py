@@ -0,0 +1,35 @@
+"""notification outbox
+
+Revision ID: c2e9174fb3a8
+Revises: a5f83e6c2d17
+Create Date: 2026-10-18 12:40:51.274466
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e9174fb3a8'
+down_revision = 'a5f83e6c2d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notification_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('intentos', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('proximo_intento', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+        batch_op.add_column(sa.Column('enviado_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('latencia_ms', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_notification_logs_pendientes', ['proximo_intento', 'id'], unique=False,
+                              postgresql_where=sa.text("estado = 'pendiente'"), sqlite_where=sa.text("estado = 'pendiente'"))
+
+
+def downgrade():
+    with op.batch_alter_table('notification_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_logs_pendientes')
+        batch_op.drop_column('latencia_ms')
+        batch_op.drop_column('enviado_at')
+        batch_op.drop_column('proximo_intento')
+        batch_op.drop_column('intentos')
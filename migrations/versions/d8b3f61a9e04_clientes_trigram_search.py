@@ -0,0 +1,35 @@
+"""clientes trigram search
+
+Revision ID: d8b3f61a9e04
+Revises: c2e9174fb3a8
+Create Date: 2026-10-18 14:05:12.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b3f61a9e04'
+down_revision = 'c2e9174fb3a8'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('nombre', 'correo', 'rut', 'telefono')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.batch_alter_table('clientes', schema=None) as batch_op:
+        batch_op.create_index('ix_clientes_created_at_id', ['created_at', 'id'], unique=False)
+        for col in COLUMNS:
+            batch_op.create_index(f'ix_clientes_{col}_trgm', [col], unique=False,
+                                  postgresql_using='gin', postgresql_ops={col: 'gin_trgm_ops'})
+
+
+def downgrade():
+    with op.batch_alter_table('clientes', schema=None) as batch_op:
+        for col in reversed(COLUMNS):
+            batch_op.drop_index(f'ix_clientes_{col}_trgm')
+        batch_op.drop_index('ix_clientes_created_at_id')
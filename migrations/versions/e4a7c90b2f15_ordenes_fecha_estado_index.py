@@ -0,0 +1,28 @@
+"""ordenes (fecha, estado_trabajo) index
+
+Revision ID: e4a7c90b2f15
+Revises: d8b3f61a9e04
+Create Date: 2026-10-18 14:52:37.905116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c90b2f15'
+down_revision = 'd8b3f61a9e04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.create_index('ix_ordenes_fecha_estado_trabajo', ['fecha', 'estado_trabajo'], unique=False)
+        batch_op.drop_index('ix_ordenes_fecha')
+
+
+def downgrade():
+    with op.batch_alter_table('ordenes', schema=None) as batch_op:
+        batch_op.create_index('ix_ordenes_fecha', ['fecha'], unique=False)
+        batch_op.drop_index('ix_ordenes_fecha_estado_trabajo')
@@ -0,0 +1,34 @@
+"""content-addressed attachments
+
+Revision ID: f1c6d2e83a47
+Revises: e4a7c90b2f15
+Create Date: 2026-10-18 16:10:44.362871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6d2e83a47'
+down_revision = 'e4a7c90b2f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('size', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('content_type', sa.String(length=255), nullable=True))
+        batch_op.create_index(batch_op.f('ix_attachments_sha256'), ['sha256'], unique=False)
+        batch_op.create_index(batch_op.f('ix_attachments_orden_id'), ['orden_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attachments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_attachments_orden_id'))
+        batch_op.drop_index(batch_op.f('ix_attachments_sha256'))
+        batch_op.drop_column('content_type')
+        batch_op.drop_column('size')
+        batch_op.drop_column('sha256')
@@ -0,0 +1,73 @@
+import os
+import socket
+import tempfile
+
+import pytest
+from aiosmtpd.controller import Controller
+
+# Read by app.config at import time, so set before the app package is imported
+_tmp = tempfile.mkdtemp(prefix="printshop-tests-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(_tmp, 'test.sqlite')}"
+os.environ["UPLOAD_FOLDER"] = os.path.join(_tmp, "uploads")
+# Audit stays on; tests call audit.flush() themselves rather than racing the flusher thread
+os.environ["AUDIT_FLUSH_SECONDS"] = "3600"
+
+from app import audit, create_app  # noqa: E402
+from app.extensions import db as _db  # noqa: E402
+from app.models import Usuario  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    return create_app("testing")
+
+
+@pytest.fixture
+def db(app):
+    with app.app_context():
+        _db.create_all()
+        yield _db
+        _db.session.remove()
+        audit.flush()  # while the logs table still exists; the buffer is per process
+        _db.drop_all()
+
+
+@pytest.fixture
+def admin(db):
+    user = Usuario(nombre="Admin", email="admin@test.cl", rol="admin")
+    user.set_password("secreto")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, admin):
+    client = app.test_client()
+    response = client.post("/usuarios/login", data={"email": "admin@test.cl", "password": "secreto"})
+    assert response.status_code == 302
+    return client
+
+
+class Inbox:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, inbox
+    controller.stop()
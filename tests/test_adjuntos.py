@@ -0,0 +1,74 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.models import Attachment, Cliente, Orden
+from app.utils import attachments, pdf
+
+
+@pytest.fixture
+def orden(db, admin):
+    cliente = Cliente(nombre="Cliente")
+    db.session.add(cliente)
+    db.session.flush()
+    orden = Orden(cliente_id=cliente.id, usuario_id=admin.id)
+    db.session.add(orden)
+    db.session.commit()
+    return orden
+
+
+def _upload(client, orden, data: bytes, filename: str, content_type: str) -> Attachment:
+    response = client.post(f"/adjuntos/orden/{orden.id}?filename={filename}", data=data, content_type=content_type)
+    assert response.status_code == 201
+    return Attachment.query.filter_by(id=response.json["id"]).one()
+
+
+def _blob_exists(sha: str) -> bool:
+    return os.path.exists(os.path.join(attachments._root(), attachments.blob_relpath(sha)))
+
+
+def test_html_is_never_served_inline(client, orden):
+    att = _upload(client, orden, b"<script>alert(1)</script>", "x.html", "text/html")
+    response = client.get(f"/adjuntos/{att.id}?inline")
+    assert response.headers["Content-Disposition"].startswith("attachment")
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+
+def test_pdf_is_served_inline_on_request(client, orden):
+    att = _upload(client, orden, b"%PDF-1.4 test", "x.pdf", "application/pdf")
+    assert client.get(f"/adjuntos/{att.id}?inline").headers["Content-Disposition"].startswith("inline")
+    assert client.get(f"/adjuntos/{att.id}").headers["Content-Disposition"].startswith("attachment")
+
+
+def test_shared_blob_is_kept_until_its_last_row_goes(client, orden):
+    first = _upload(client, orden, b"same bytes", "a.txt", "text/plain")
+    second = _upload(client, orden, b"same bytes", "b.txt", "text/plain")
+    sha = first.sha256
+
+    client.post(f"/adjuntos/{first.id}/delete")
+    assert _blob_exists(sha)
+    client.post(f"/adjuntos/{second.id}/delete")
+    assert not _blob_exists(sha)
+
+
+def test_deleting_an_orden_removes_its_blobs(client, orden):
+    sha = _upload(client, orden, b"artwork", "a.txt", "text/plain").sha256
+    client.post(f"/ordenes/{orden.id}/delete")
+    assert Attachment.query.count() == 0
+    assert not _blob_exists(sha)
+
+
+def test_unreadable_image_stops_the_thumbnail_polling(client, orden, monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(pdf, "_executor", executor)
+    monkeypatch.setattr(pdf, "_executor_pid", os.getpid())
+    att = _upload(client, orden, b"not really a png", "x.png", "image/png")
+
+    assert client.get(f"/adjuntos/{att.id}/miniatura").status_code == 202
+    executor.shutdown()  # the render has failed and its callback has run
+    try:
+        assert client.get(f"/adjuntos/{att.id}/miniatura").status_code == 415
+    finally:
+        attachments._thumbs_inflight.clear()
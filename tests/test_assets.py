@@ -0,0 +1,14 @@
+import os
+import re
+
+SOURCE_MAP = re.compile(rb"sourceMappingURL=(\S+?)(?:\s*\*/)?\s*$", re.M)
+
+
+def test_source_maps_referenced_by_static_files_exist(app):
+    for root, _, files in os.walk(app.static_folder):
+        for name in files:
+            if not name.endswith((".css", ".js")):
+                continue
+            with open(os.path.join(root, name), "rb") as fh:
+                for ref in SOURCE_MAP.findall(fh.read()):
+                    assert os.path.exists(os.path.join(root, ref.decode())), f"{name} points at missing {ref.decode()}"
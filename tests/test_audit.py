@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from app import audit
+from app.models import Cliente, Log
+
+
+def _fila(accion, entidad_id):
+    now = datetime.utcnow()
+    return {"accion": accion, "entidad": "clientes", "entidad_id": entidad_id, "mensaje": None,
+            "usuario_id": None, "created_at": now, "updated_at": now}
+
+
+def test_committed_edit_is_written_on_flush(client, db, admin):
+    cliente = Cliente(nombre="Ana", correo="ana@test.cl")
+    db.session.add(cliente)
+    db.session.commit()
+    audit.flush()
+
+    resp = client.post(f"/clientes/{cliente.id}/edit", data={"nombre": "Ana María", "correo": "ana@test.cl"})
+    assert resp.status_code == 302
+    assert audit.pending() == 1
+    assert audit.flush() == 1
+
+    log = Log.query.filter_by(accion="editar", entidad_id=cliente.id).one()
+    assert log.entidad == "clientes"
+    assert log.usuario_id == admin.id
+    assert "nombre: 'Ana' → 'Ana María'" in log.mensaje
+
+
+def test_rolled_back_changes_leave_no_trace(db):
+    audit.flush()
+    db.session.add(Cliente(nombre="Fantasma"))
+    db.session.flush()
+    db.session.rollback()
+
+    assert audit.pending() == 0
+    assert audit.flush() == 0
+    assert Log.query.count() == 0
+
+
+def test_rejected_row_is_dropped_and_the_rest_written(db):
+    audit.enqueue([_fila("crear", 1), _fila(None, 2), _fila("editar", 3)])  # accion is NOT NULL
+
+    assert audit.flush() == 2
+    assert audit.pending() == 0
+    assert sorted(log.entidad_id for log in Log.query) == [1, 3]
@@ -0,0 +1,25 @@
+from app import create_app
+from app.models import Cliente, Orden, Pago
+from app.utils import bench, synthetic
+
+ESCENARIOS = ["dashboard.index", "ordenes.index", "ordenes.index?cliente", "pagos.index", "clientes.index",
+              "calendario.eventos", "ordenes.print_view", "ordenes.export"]
+
+
+def test_generate_and_run_on_sqlite(db, admin):
+    counts = synthetic.generate(clientes=20, ordenes=60, vendedores=3, usuarios=2, echo=lambda *_: None)
+    assert counts["ordenes"] == 60
+    assert Cliente.query.count() == 20
+    assert Orden.query.count() == 60
+    assert Pago.query.count() == counts["pagos"]
+
+    # its own app: run() raises PDF_RENDER_WAIT in the config it is given. Like `flask bench`, every
+    # request runs inside one app context, which is where the query guard used to pile up counts.
+    app = create_app("testing")
+    with app.app_context():
+        resultados = bench.run(app, repeticiones=3, solo=ESCENARIOS, echo=lambda *_: None)
+
+    assert [r["escenario"] for r in resultados] == ESCENARIOS
+    for r in resultados:
+        assert r["estados"] == [200], r
+        assert r["consultas"] <= app.config["SQL_QUERY_LIMIT"], r
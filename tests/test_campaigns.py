@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+from app.models import Cliente, NotificationLog, Orden, Usuario
+from app.utils import campaigns, settings
+from app.utils.notifications import deliver_batch
+from app.utils.smtp import SMTPPool
+
+
+@pytest.fixture
+def clientes(db, admin):
+    ana = Cliente(nombre="Ana", correo="ana@test.cl")
+    beto = Cliente(nombre="Beto", correo="beto@test.cl\r\nBcc: otro@test.cl")
+    sin_correo = Cliente(nombre="Sin correo")
+    db.session.add_all([ana, beto, sin_correo])
+    db.session.flush()
+    for cliente, n in ((ana, 3), (beto, 1), (sin_correo, 1)):
+        for _ in range(n):
+            db.session.add(Orden(cliente_id=cliente.id, usuario_id=admin.id, fecha=date(2026, 5, 4), estado_trabajo="listo"))
+    db.session.commit()
+    return ana, beto
+
+
+def test_one_message_per_cliente(clientes):
+    filas = campaigns.recipients({"estado_trabajo": "listo"})
+    assert [f["orden"]["nombre"] for f in filas] == ["Ana", "Beto"]
+    assert len(filas[0]["ordenes"]) == 3
+    mensajes = campaigns.render("Hola {{ cliente }}", "{{ ordenes|length }} órdenes", filas)
+    assert mensajes[0]["mensaje"] == "3 órdenes"
+
+
+def test_empty_filter_is_refused(clientes):
+    with pytest.raises(ValueError):
+        campaigns.recipients({})
+
+
+def test_send_records_each_outcome_in_the_outbox(clientes, smtp_server, db):
+    controller, inbox = smtp_server
+    settings.save({"SMTP_HOST": controller.hostname, "SMTP_PORT": str(controller.port), "SMTP_USE_TLS": False})
+
+    resultado = campaigns.send("Orden {{ orden.id }}", "Hola {{ cliente }}", {"estado_trabajo": "listo"}, connections=2)
+
+    assert (resultado["total"], resultado["enviados"], resultado["errores"]) == (2, 1, 1)
+    assert [m.rcpt_tos for m in inbox.messages] == [["ana@test.cl"]]
+    estados = sorted(log.estado for log in NotificationLog.query)
+    assert estados == ["enviado", "error"]
+    # nothing is left for the worker to send a second time
+    assert deliver_batch(SMTPPool(controller.hostname, controller.port, size=1), 10) == 0
+
+
+def test_campaign_form_needs_a_filter(client, clientes):
+    response = client.post("/ordenes/notificar", data={"asunto": "Hola", "mensaje": "Hola"}, follow_redirects=True)
+    assert "al menos un filtro".encode() in response.data
+    assert NotificationLog.query.count() == 0
+
+
+def test_only_admin_can_send_a_campaign(app, clientes, db):
+    staff = Usuario(nombre="Staff", email="staff@test.cl", rol="staff")
+    staff.set_password("secreto")
+    db.session.add(staff)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/usuarios/login", data={"email": "staff@test.cl", "password": "secreto"})
+
+    response = client.post("/ordenes/notificar", data={"asunto": "Hola", "mensaje": "Hola", "estado_trabajo": "listo"},
+                           follow_redirects=True)
+    assert "Solo admin".encode() in response.data
+    assert NotificationLog.query.count() == 0
@@ -0,0 +1,22 @@
+import csv
+import io
+from decimal import Decimal
+
+from app.models import Cliente, Orden
+
+
+def test_csv_neutralizes_formulas(client, db, admin):
+    nombres = ["=HYPERLINK(\"http://x\")", "+1", "-2+3", "@SUM(A1)", "Normal"]
+    for nombre in nombres:
+        db.session.add(Cliente(nombre=nombre))
+    db.session.flush()
+    db.session.add(Orden(cliente_id=Cliente.query.first().id, usuario_id=admin.id, precio_total=Decimal("-5")))
+    db.session.commit()
+
+    filas = list(csv.reader(io.StringIO(client.get("/clientes/export.csv").data.decode("utf-8-sig"))))
+    celdas = {c for fila in filas[1:] for c in fila}
+    assert {"'=HYPERLINK(\"http://x\")", "'+1", "'-2+3", "'@SUM(A1)", "Normal"} <= celdas
+    assert not any(c.startswith(("=", "+", "@")) for c in celdas)
+
+    ordenes = client.get("/ordenes/export.csv").data.decode("utf-8-sig")
+    assert "-5" in ordenes and "'-5" not in ordenes
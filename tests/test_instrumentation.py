@@ -0,0 +1,29 @@
+import pytest
+
+from app import create_app
+from app.instrumentation import registry
+
+
+def _count(endpoint: str, status: str) -> float:
+    key = ("printshop_http_requests_total", (("endpoint", endpoint), ("method", "GET"), ("status", status)))
+    return registry.samples.get(key, 0)
+
+
+def test_unhandled_errors_are_counted_as_500(db):
+    app = create_app("testing")
+
+    @app.route("/falla")
+    def falla():
+        raise RuntimeError("boom")
+
+    antes = _count("falla", "500")
+    with pytest.raises(RuntimeError):
+        app.test_client().get("/falla")
+    assert _count("falla", "500") == antes + 1
+
+
+def test_requests_are_counted_with_their_status(client):
+    antes = _count("dashboard.index", "200")
+    response = client.get("/")
+    assert "Server-Timing" in response.headers
+    assert _count("dashboard.index", "200") == antes + 1
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from app.models import NotificationLog
+from app.utils import notifications
+from app.utils.notifications import deliver_batch
+from app.utils.smtp import SMTPPool
+
+from .conftest import free_port
+
+
+def _queue(db, *destinatarios):
+    logs = [NotificationLog(destinatario=d, canal="email", asunto="Orden lista", mensaje="Hola", estado="pendiente")
+            for d in destinatarios]
+    db.session.add_all(logs)
+    db.session.commit()
+    return [log.id for log in logs]
+
+
+def test_deliver_batch_sends_pending_emails(db, smtp_server):
+    controller, inbox = smtp_server
+    ids = _queue(db, "uno@test.cl", "dos@test.cl")
+    pool = SMTPPool(controller.hostname, controller.port, size=1)
+
+    assert deliver_batch(pool, 10) == 2
+    assert deliver_batch(pool, 10) == 0
+    pool.close()
+
+    assert sorted(rcpt for m in inbox.messages for rcpt in m.rcpt_tos) == ["dos@test.cl", "uno@test.cl"]
+    for log in (db.session.get(NotificationLog, i) for i in ids):
+        assert log.estado == "enviado"
+        assert log.intentos == 1
+
+
+def test_bad_address_fails_alone_and_is_not_resent(db, smtp_server):
+    controller, inbox = smtp_server
+    buena, mala, otra = _queue(db, "uno@test.cl", "mala@test.cl\r\nBcc: otro@test.cl", "dos@test.cl")
+    pool = SMTPPool(controller.hostname, controller.port, size=1)
+
+    assert deliver_batch(pool, 10) == 3
+    assert deliver_batch(pool, 10) == 0  # nothing is claimed again
+    pool.close()
+
+    assert len(inbox.messages) == 2
+    assert db.session.get(NotificationLog, mala).estado == "error"
+    assert db.session.get(NotificationLog, buena).estado == "enviado"
+    assert db.session.get(NotificationLog, otra).estado == "enviado"
+
+
+def test_unreachable_server_schedules_a_retry(db):
+    (log_id,) = _queue(db, "uno@test.cl")
+    pool = SMTPPool("127.0.0.1", free_port(), size=1, timeout=1)
+
+    assert deliver_batch(pool, 10) == 1
+    log = db.session.get(NotificationLog, log_id)
+    assert log.estado == "pendiente"
+    assert log.intentos == 1
+    assert deliver_batch(pool, 10) == 0  # backed off
+
+
+def test_row_claimed_again_after_its_lease_is_not_resent(db, smtp_server, monkeypatch):
+    controller, inbox = smtp_server
+    uno, dos = _queue(db, "uno@test.cl", "dos@test.cl")
+    claim = notifications.claim_batch
+
+    def slow_claim(limit):
+        batch, lease = claim(limit)
+        # our lease on "dos" ran out mid-batch and another worker claimed it
+        otro = db.session.get(NotificationLog, dos)
+        otro.proximo_intento = datetime.utcnow() + timedelta(minutes=5)
+        db.session.commit()
+        return batch, lease
+
+    monkeypatch.setattr(notifications, "claim_batch", slow_claim)
+    pool = SMTPPool(controller.hostname, controller.port, size=1)
+    deliver_batch(pool, 10)
+    pool.close()
+
+    assert [rcpt for m in inbox.messages for rcpt in m.rcpt_tos] == ["uno@test.cl"]
+    assert db.session.get(NotificationLog, uno).estado == "enviado"
+    assert db.session.get(NotificationLog, dos).estado == "pendiente"
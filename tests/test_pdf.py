@@ -0,0 +1,100 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pypdf import PdfReader
+
+from app.models import Cliente, Orden
+from app.utils import pdf
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # threads instead of spawned processes: same code path, and monkeypatching reaches the workers
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(pdf, "_executor", executor)
+    monkeypatch.setattr(pdf, "_executor_pid", os.getpid())
+    yield executor
+    executor.shutdown()
+    pdf._inflight.clear()
+    pdf._failed.clear()
+
+
+@pytest.fixture
+def ordenes(db, admin):
+    cliente = Cliente(nombre="Cliente", correo="c@test.cl")
+    db.session.add(cliente)
+    db.session.flush()
+    ordenes = [Orden(cliente_id=cliente.id, usuario_id=admin.id, estado_trabajo="listo") for _ in range(3)]
+    db.session.add_all(ordenes)
+    db.session.commit()
+    return ordenes
+
+
+def test_merged_batch_is_one_pdf(client, ordenes, pool):
+    response = client.get("/ordenes/lote?formato=pdf&estado_trabajo=listo")
+    assert response.status_code == 200
+    assert len(PdfReader(io.BytesIO(response.data)).pages) >= len(ordenes)
+    assert not [f for f in os.listdir(pdf.cache_dir()) if f.startswith("lote_")]
+
+
+def test_failed_render_is_reported_before_the_response(client, ordenes, pool, monkeypatch):
+    def broken(html, dest):
+        raise RuntimeError("pisa reported 1 errors")
+
+    monkeypatch.setattr(pdf, "render_to_file", broken)
+    response = client.get("/ordenes/lote?formato=zip&estado_trabajo=listo")
+    assert response.status_code == 302
+
+
+def test_merged_batch_is_capped(client, ordenes, pool, app, monkeypatch):
+    monkeypatch.setitem(app.config, "PDF_MERGE_MAX", 2)
+    response = client.get("/ordenes/lote?formato=pdf&estado_trabajo=listo", follow_redirects=True)
+    assert "use ZIP".encode() in response.data
+
+
+def test_failed_render_is_reported_once_then_retried(ordenes, pool, monkeypatch):
+    orden = ordenes[0]
+    monkeypatch.setattr(pdf, "render_to_file", lambda html, dest: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        pdf.submit(orden).result(timeout=5)
+    assert not pdf._inflight
+
+    monkeypatch.undo()
+    monkeypatch.setattr(pdf, "_executor", pool)
+    monkeypatch.setattr(pdf, "_executor_pid", os.getpid())
+    with pytest.raises(ZeroDivisionError):
+        pdf.submit(orden).result(timeout=5)  # the stored failure, without a new render
+    assert pdf.submit(orden).result(timeout=30) == pdf.cache_path(orden)
+
+
+def test_renaming_the_cliente_changes_the_cache_key(db, ordenes):
+    orden = ordenes[0]
+    before = pdf.cache_key(orden)
+    orden.cliente.nombre = "Otro nombre"
+    db.session.commit()
+    assert pdf.cache_key(orden) != before
+
+
+def test_render_removes_the_files_of_older_versions(ordenes, pool, monkeypatch):
+    orden, otra = ordenes[:2]
+    folder = pdf.cache_dir()
+    viejo = os.path.join(folder, f"orden_{orden.id}_viejo.pdf")
+    ajeno = os.path.join(folder, f"orden_{otra.id}_viejo.pdf")
+    for path in (viejo, ajeno):
+        with open(path, "wb") as fh:
+            fh.write(b"%PDF")
+
+    def fake(html, dest):
+        with open(dest, "wb") as fh:
+            fh.write(b"%PDF")
+        return dest
+
+    monkeypatch.setattr(pdf, "render_to_file", fake)
+    path = pdf.submit(orden).result()
+    pool.shutdown()  # done callbacks have run
+
+    assert os.path.exists(path)
+    assert not os.path.exists(viejo)
+    assert os.path.exists(ajeno)
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from app.extensions import db as _db
+from app.models import Cliente, Orden, Pago
+from app.queries import TooManyQueries
+
+
+def test_count_starts_over_on_every_request(client):
+    # the db fixture keeps one app context open across all of these requests
+    for _ in range(5):
+        assert client.get("/").status_code == 200
+        assert client.get("/pagos/").status_code == 200
+
+
+def test_request_over_the_limit_fails(db):
+    app = create_app("testing")
+
+    @app.route("/n-mas-uno")
+    def n_mas_uno():
+        for _ in range(app.config["SQL_QUERY_LIMIT"] + 1):
+            _db.session.execute(text("SELECT 1"))
+        return "ok"
+
+    with pytest.raises(TooManyQueries):
+        app.test_client().get("/n-mas-uno")
+
+
+def test_pagos_are_paginated(db, admin, client):
+    cliente = Cliente(nombre="Cliente")
+    db.session.add(cliente)
+    db.session.flush()
+    orden = Orden(cliente_id=cliente.id, usuario_id=admin.id, precio_total=Decimal("1000"))
+    db.session.add(orden)
+    db.session.flush()
+    inicio = datetime(2026, 1, 1)
+    db.session.add_all(
+        Pago(orden_id=orden.id, monto=Decimal(i + 1), usuario_id=admin.id, created_at=inicio + timedelta(minutes=i))
+        for i in range(5)
+    )
+    db.session.commit()
+
+    first = client.get("/pagos/?per_page=3")
+    assert first.status_code == 200
+    assert b"$5</td>" in first.data and b"$3</td>" in first.data and b"$2</td>" not in first.data
+    assert b"cursor=" in first.data
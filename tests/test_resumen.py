@@ -0,0 +1,26 @@
+from datetime import date
+from decimal import Decimal
+
+from app.models import Cliente, Orden
+from app.utils import resumen
+
+
+def test_refreshing_a_day_replaces_its_rows(db, admin):
+    cliente = Cliente(nombre="Cliente")
+    db.session.add(cliente)
+    db.session.flush()
+    dia = date(2026, 3, 2)
+    db.session.add_all([
+        Orden(cliente_id=cliente.id, usuario_id=admin.id, fecha=dia, precio_total=Decimal("1000")),
+        Orden(cliente_id=cliente.id, usuario_id=admin.id, fecha=dia, precio_total=Decimal("500")),
+    ])
+    db.session.commit()
+
+    resumen.refresh_days(db.session.connection(), {dia})
+    resumen.refresh_days(db.session.connection(), {dia})
+    db.session.commit()
+
+    totales = resumen.totales(dia, dia)
+    assert totales["ordenes"] == 2
+    assert totales["ventas"] == Decimal("1500")
+    assert totales["pendientes"] == 2
@@ -0,0 +1,25 @@
+from app.utils.smtp import SMTPPool
+
+
+def test_connection_returned_to_a_closed_pool_is_closed(smtp_server):
+    controller, _ = smtp_server
+    pool = SMTPPool(controller.hostname, controller.port, size=2)
+    with pool.connection() as borrowed:
+        with pool.connection() as idle:
+            pass
+        pool.close()  # e.g. the worker switching to new SMTP settings
+        assert idle.sock is None
+        assert borrowed.noop()[0] == 250  # still usable by its borrower
+    assert borrowed.sock is None
+    assert pool._idle.empty()
+
+
+def test_open_pool_reuses_connections(smtp_server):
+    controller, _ = smtp_server
+    pool = SMTPPool(controller.hostname, controller.port, size=1)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    pool.close()
@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Cliente, Descripcion, Orden
+from app.utils import totales
+
+
+@pytest.fixture
+def orden(db, admin):
+    cliente = Cliente(nombre="Cliente")
+    db.session.add(cliente)
+    db.session.flush()
+    orden = Orden(cliente_id=cliente.id, usuario_id=admin.id)
+    db.session.add(orden)
+    db.session.commit()
+    return orden
+
+
+def _post(client, orden_id, *lineas):
+    return client.post(f"/ordenes/{orden_id}/descripciones", json={"descripciones": list(lineas)})
+
+
+def _montos(data):
+    return tuple(Decimal(data[k]) for k in ("precio_neto", "iva", "precio_total"))
+
+
+def test_insert_edit_and_delete_lines(client, db, orden):
+    resp = _post(client, orden.id,
+                 {"texto": "Tarjetas", "cantidad": 3, "precio_unitario": "35"},
+                 {"texto": "Flyers", "cantidad": 2, "precio_unitario": "1000"})
+    assert resp.status_code == 200
+    assert resp.json["nuevas"] == 2
+    assert _montos(resp.json) == (Decimal(2105), Decimal(400), Decimal(2505))  # 399.95 rounds to whole pesos
+
+    tarjetas = Descripcion.query.filter_by(orden_id=orden.id, texto="Tarjetas").one()
+    resp = _post(client, orden.id,
+                 {"id": tarjetas.id, "texto": "Tarjetas", "cantidad": 3, "precio_unitario": "35"},
+                 {"texto": "Afiche", "cantidad": 1, "precio_unitario": "1003"})
+    assert (resp.json["nuevas"], resp.json["editadas"], resp.json["eliminadas"]) == (1, 1, 1)
+    assert _montos(resp.json) == (Decimal(1108), Decimal(211), Decimal(1319))  # 210.52
+    textos = db.session.scalars(select(Descripcion.texto).filter_by(orden_id=orden.id).order_by(Descripcion.texto))
+    assert list(textos) == ["Afiche", "Tarjetas"]
+
+    resp = _post(client, orden.id)
+    assert _montos(resp.json) == (0, 0, 0)
+    assert Descripcion.query.filter_by(orden_id=orden.id).count() == 0
+
+
+def test_line_of_another_order_is_rejected(client, db, orden):
+    otra = Orden(cliente_id=orden.cliente_id, usuario_id=orden.usuario_id)
+    db.session.add(otra)
+    db.session.flush()
+    ajena = Descripcion(orden_id=otra.id, texto="Ajena", cantidad=1, precio_unitario=Decimal(500))
+    db.session.add(ajena)
+    db.session.commit()
+
+    resp = _post(client, orden.id, {"id": ajena.id, "texto": "Mía", "cantidad": 1, "precio_unitario": "1"})
+    assert resp.status_code == 400
+    assert db.session.get(Descripcion, ajena.id).texto == "Ajena"
+    assert Descripcion.query.filter_by(orden_id=orden.id).count() == 0
+
+
+def test_recompute_all_fixes_stale_totals(db, orden):
+    db.session.add(Descripcion(orden_id=orden.id, texto="Tarjetas", cantidad=3, precio_unitario=Decimal(35)))
+    orden.precio_total = Decimal(1)
+    sin_lineas = Orden(cliente_id=orden.cliente_id, usuario_id=orden.usuario_id, precio_total=Decimal(700))
+    db.session.add(sin_lineas)
+    db.session.commit()
+
+    assert totales.recompute_all(chunk_size=1) == 1
+    db.session.expire_all()
+    assert (orden.precio_neto, orden.iva, orden.precio_total) == (105, 20, 125)  # 19.95
+    assert orden.saldo == 125
+    assert sin_lineas.precio_total == 700  # typed totals are kept